@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""Load-test the public API and compare the sync and async request paths.
+
+Uses only the standard library: every simulated client is an asyncio task
+holding one keep-alive HTTP/1.1 connection.
+
+Examples::
+
+    # Hit a running server
+    python scripts/bench_api.py --url http://localhost:8000 --concurrency 64 --duration 15
+
+    # Start the API twice (sync DRF views, then the async views) with the
+    # same workers and report both runs side by side
+    python scripts/bench_api.py --compare --workers 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+API_DIR = ROOT / "services" / "api"
+
+# Both modes run the ASGI app under uvicorn workers, as in production; they
+# differ only in whether /v1/search and /v1/prefixes use the async views.
+MODES = {"sync": "false", "async": "true"}
+
+
+def _paths(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    area_codes = ["212", "305", "415", "646", "702", "713", "818", "917", "972", "206"]
+    paths = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            paths.append(f"/v1/prefixes?{urlencode({'q': rng.choice(area_codes)[:1]})}")
+        else:
+            query = {"area_code": rng.choice(area_codes), "number": f"{rng.randint(0, 9999999):07d}"}
+            paths.append(f"/v1/search?{urlencode(query)}")
+    return paths
+
+
+async def _read_response(reader: asyncio.StreamReader) -> tuple[str, bool]:
+    """Consume one response; return its status code and whether the server closes."""
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    length, chunked, close = 0, False, False
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding":
+            chunked = value == "chunked"
+        elif name == "connection":
+            close = value == "close"
+    if chunked:
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(length)
+    return status_line.split(b" ", 2)[1].decode(), close
+
+
+async def _client(host: str, port: int, paths: list[str], deadline: float, latencies: list[float], errors: list[str]):
+    reader = writer = None
+    index = random.randrange(len(paths))
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+            await writer.drain()
+            status, close = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != "200":
+                errors.append(status)
+            if close:
+                writer.close()
+                reader = writer = None
+        except (OSError, asyncio.IncompleteReadError) as exc:
+            errors.append(type(exc).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url: str, concurrency: int, duration: float, seed: int = 7) -> dict:
+    parts = urlsplit(url)
+    paths = _paths(500, seed)
+    latencies: list[float] = []
+    errors: list[str] = []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(
+        *(_client(parts.hostname, parts.port or 80, paths, deadline, latencies, errors) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000 if latencies else float("nan")
+
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else float("nan"),
+        "errors": len(errors),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(mode: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(
+        {
+            "API_ASYNC_VIEWS": MODES[mode],
+            "PYTHONPATH": os.pathsep.join([str(ROOT), str(API_DIR), env.get("PYTHONPATH", "")]),
+            "DJANGO_SETTINGS_MODULE": "api.settings",
+            "ALLOWED_HOSTS": "localhost,127.0.0.1",
+            # Measure the request path, not the rate limiter.
+            "RATE_LIMITS_PUBLIC": "100000000/s",
+        }
+    )
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "api.asgi:application",
+        "-b",
+        f"127.0.0.1:{port}",
+        "-w",
+        str(workers),
+        "-k",
+        "uvicorn.workers.UvicornWorker",
+        "--log-level",
+        "warning",
+    ]
+    return subprocess.Popen(command, cwd=API_DIR, env=env, start_new_session=True)
+
+
+def _wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"Server on port {port} did not start within {timeout:.0f}s.")
+
+
+def _print(label: str, result: dict) -> None:
+    print(
+        f"{label:>6}: {result['requests']:>7} req  {result['rps']:>8.1f} req/s  "
+        f"p50 {result['p50_ms']:>7.2f} ms  p95 {result['p95_ms']:>7.2f} ms  "
+        f"p99 {result['p99_ms']:>7.2f} ms  errors {result['errors']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of a running API.")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run.")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unmeasured load before each run.")
+    parser.add_argument("--compare", action="store_true", help="Start sync and async servers and benchmark both.")
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn workers per server in --compare mode.")
+    args = parser.parse_args()
+
+    if not args.compare:
+        if args.warmup:
+            asyncio.run(run_load(args.url, args.concurrency, args.warmup))
+        _print("run", asyncio.run(run_load(args.url, args.concurrency, args.duration)))
+        return
+
+    for mode in ("sync", "async"):
+        port = _free_port()
+        server = _start_server(mode, port, args.workers)
+        try:
+            _wait_ready(port)
+            url = f"http://127.0.0.1:{port}"
+            if args.warmup:
+                asyncio.run(run_load(url, args.concurrency, args.warmup))
+            _print(mode, asyncio.run(run_load(url, args.concurrency, args.duration)))
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""Micro-benchmark the public rate-limit check in isolation.
+
+Drives ``PublicRateThrottle`` (sliding-window counters in SQLite) and
+``CachePublicRateThrottle`` (DRF's timestamp lists in the default cache) with
+the same paced load: ``--workers`` processes share ``--rate`` checks per
+second spread over ``--clients`` client addresses, as the worker processes of
+one API host would.  Reports per-check latency percentiles, the rate actually
+sustained and how many requests each store admitted, which shows whether the
+limit held across processes.
+
+Example::
+
+    python scripts/bench_throttle.py --rate 5000 --workers 4 --duration 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+API_DIR = ROOT / "services" / "api"
+
+MODES = {"sqlite": "PublicRateThrottle", "cache": "CachePublicRateThrottle"}
+
+
+def _setup(workdir: str, limit: str) -> None:
+    for path in (ROOT, API_DIR):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api.settings")
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["THROTTLE_DB_PATH"] = os.path.join(workdir, "throttle.sqlite3")
+    os.environ["RATE_LIMITS_PUBLIC"] = limit
+
+    import django
+
+    django.setup()
+
+
+def _worker(
+    mode: str, workdir: str, limit: str, rate: float, duration: float, clients: int, seed: int, results
+) -> None:
+    _setup(workdir, limit)
+    import random
+
+    from django.test import RequestFactory
+
+    from api.phone_numbers import throttles
+
+    throttle_class = getattr(throttles, MODES[mode])
+    rng = random.Random(seed)
+    factory = RequestFactory()
+    requests = [
+        factory.get("/v1/search", REMOTE_ADDR=f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}")
+        for index in range(clients)
+    ]
+
+    latencies, allowed = [], 0
+    interval = 1 / rate
+    start = time.perf_counter()
+    count = int(rate * duration)
+    for sent in range(count):
+        # Open-loop pacing: checks are due on a fixed schedule, late or not.
+        delay = start + sent * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        request = rng.choice(requests)
+        began = time.perf_counter()
+        allowed += throttle_class().allow_request(request, None)
+        latencies.append(time.perf_counter() - began)
+    results.put((latencies, allowed, time.perf_counter() - start))
+
+
+def run(mode: str, args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as workdir:
+        workers = [
+            context.Process(
+                target=_worker,
+                args=(mode, workdir, args.limit, args.rate / args.workers, args.duration, args.clients, seed, results),
+            )
+            for seed in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        collected = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    latencies = sorted(latency for worker_latencies, _, _ in collected for latency in worker_latencies)
+    elapsed = max(worker_elapsed for _, _, worker_elapsed in collected)
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1e6
+
+    return {
+        "checks": len(latencies),
+        "rate": len(latencies) / elapsed,
+        "allowed": sum(allowed for _, allowed, _ in collected),
+        "mean": statistics.fmean(latencies) * 1e6,
+        "p50": percentile(0.50),
+        "p99": percentile(0.99),
+        "max": latencies[-1] * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=5000, help="Offered checks per second across all workers.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run.")
+    parser.add_argument("--workers", type=int, default=4, help="Processes sharing the store.")
+    parser.add_argument("--clients", type=int, default=100, help="Distinct client addresses.")
+    parser.add_argument("--limit", default="100/min", help="Public rate limit applied to every client.")
+    parser.add_argument("--mode", choices=[*MODES, "both"], default="both")
+    args = parser.parse_args()
+
+    for mode in MODES if args.mode == "both" else [args.mode]:
+        result = run(mode, args)
+        print(
+            f"{mode:>6}: {result['checks']} checks at {result['rate']:.0f}/s, {result['allowed']} allowed | "
+            f"mean {result['mean']:.0f}us p50 {result['p50']:.0f}us p99 {result['p99']:.0f}us max {result['max']:.0f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "shared.core.metrics.PrometheusMiddleware",
+    "shared.core.querylog.QueryAccountingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -46,6 +48,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "dashboard.middleware.RequestIDMiddleware",
+    "shared.core.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "dashboard.urls"
@@ -168,13 +171,46 @@ cache_location = os.getenv(
 )
 Path(cache_location).mkdir(parents=True, exist_ok=True)
 
+search_cache_location = os.getenv(
+    "SEARCH_CACHE_DIR",
+    str((BASE_DIR / ".." / ".." / "data" / "cache_search").resolve()),
+)
+Path(search_cache_location).mkdir(parents=True, exist_ok=True)
+SEARCH_CACHE_TIMEOUT = int(os.getenv("SEARCH_CACHE_TIMEOUT", "86400"))
+SEARCH_TOMBSTONE_RETENTION = int(os.getenv("SEARCH_TOMBSTONE_RETENTION", "86400"))
+SEARCH_PACKED_INDEX_PATH = os.getenv(
+    "SEARCH_PACKED_INDEX_PATH",
+    str((BASE_DIR / ".." / ".." / "data" / "number_index.bin").resolve()),
+)
+
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
         "LOCATION": cache_location,
-    }
+    },
+    # Shared by both services: admin writes bump the data versions that key
+    # cached search results in the API.
+    "search": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": search_cache_location,
+        "TIMEOUT": SEARCH_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "10000"))},
+    },
 }
 
+# Bounded in-process LRU in front of each cache (see shared.core.tiered_cache);
+# 0 disables it.
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "1000"))
+CACHE_L1_TIMEOUT = float(os.getenv("CACHE_L1_TIMEOUT", "5"))
+if CACHE_L1_MAX_ENTRIES > 0:
+    CACHES = {
+        alias: {
+            "BACKEND": "shared.core.tiered_cache.TieredCache",
+            "OPTIONS": {"L2": config, "L1_MAX_ENTRIES": CACHE_L1_MAX_ENTRIES, "L1_TIMEOUT": CACHE_L1_TIMEOUT},
+        }
+        for alias, config in CACHES.items()
+    }
+
 RATELIMIT_USE_CACHE = "default"
 LOGIN_RATE_LIMIT = os.getenv("RATE_LIMITS_LOGIN", "10/15m")
 ADMIN_API_RATE_LIMIT = os.getenv("RATE_LIMITS_ADMIN", "120/min")
@@ -199,6 +235,16 @@ LOGGING = {
 
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_SERVICE = "admin"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in {"1", "true", "yes"}
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", str((BASE_DIR / ".." / ".." / "data" / "profiles").resolve()))
+
 SILENCED_SYSTEM_CHECKS = [
     "django_ratelimit.E003",
     "django_ratelimit.W001",
@@ -6,6 +6,7 @@ from .views import auth as auth_views
 from .views import docs as docs_views
 from .views import health as health_views
 from .views import numbers as number_views
+from .views import profiles as profile_views
 from .views import upload as upload_views
 
 urlpatterns = [
@@ -23,8 +24,11 @@ urlpatterns = [
     path("v1/numbers", number_views.NumbersApiView.as_view(), name="api-numbers"),
     path("v1/numbers/<uuid:pk>", number_views.NumberDetailApiView.as_view(), name="api-number-detail"),
     path("v1/numbers/bulk-upload", upload_views.BulkUploadApiView.as_view(), name="api-bulk-upload"),
+    path("v1/profiles", profile_views.ProfileListApiView.as_view(), name="api-profiles"),
+    path("v1/profiles/<str:name>", profile_views.ProfileDownloadApiView.as_view(), name="api-profile-download"),
     path("v1/healthz", health_views.HealthzView.as_view(), name="admin-healthz"),
     path("v1/ready", health_views.ReadyView.as_view(), name="admin-ready"),
+    path("v1/metrics", health_views.MetricsView.as_view(), name="admin-metrics"),
     path("v1/schema/", docs_views.schema_view, name="admin-schema"),
     path("v1/docs/", docs_views.swagger_view, name="admin-swagger"),
 ]
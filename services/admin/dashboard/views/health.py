@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import time
 
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
 from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from shared.core.metrics import render_metrics
 from shared.core.models import Number
 
 
@@ -38,3 +39,12 @@ class ReadyView(APIView):
         except Exception:
             return Response({"ok": False}, status=503)
         return Response({"ok": True})
+
+
+class MetricsView(APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        data, content_type = render_metrics()
+        return HttpResponse(data, content_type=content_type)
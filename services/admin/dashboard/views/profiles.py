@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from django.http import FileResponse, Http404, HttpRequest
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from shared.core.profiling import list_profiles, profile_path
+
+
+class ProfileListApiView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: HttpRequest) -> Response:
+        return Response({"results": list_profiles()})
+
+
+class ProfileDownloadApiView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: HttpRequest, name: str) -> FileResponse:
+        path = profile_path(name)
+        if path is None:
+            raise Http404("Unknown profile.")
+        return FileResponse(path.open("rb"), as_attachment=True, filename=path.name)
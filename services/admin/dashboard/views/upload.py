@@ -18,6 +18,8 @@ from rest_framework.views import APIView
 
 from shared.core.forms import BulkUploadForm, NumberForm
 from shared.core.models import Number
+from shared.core.search_cache import deferred_version_bumps
+from shared.core.stats import deferred_stats_updates
 
 from django.conf import settings
 
@@ -60,7 +62,8 @@ def handle_upload(uploaded_file, dry_run: bool, upsert: bool) -> dict:
     rows = _read_rows(uploaded_file)
     inserted = updated = errors = 0
     error_rows = []
-    with transaction.atomic():
+    # Coalesce search cache invalidation and area code stats into one write per area code.
+    with transaction.atomic(), deferred_version_bumps(), deferred_stats_updates():
         for row in rows:
             data = {
                 "area_code": str(row.get("area_code", "")).strip(),
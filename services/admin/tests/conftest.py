@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import os
 import sys
 from pathlib import Path
@@ -13,6 +14,39 @@ for path in (ROOT, ADMIN_DIR):
         sys.path.insert(0, str(path))
 
 
+def _isolated_files(settings, root: Path) -> dict:
+    """Return settings moving file caches and their broadcast files under ``root``."""
+
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, config in caches.items():
+        options = config.setdefault("OPTIONS", {})
+        if "L2" in options:
+            options["L2"]["LOCATION"] = str(root / f"cache_{alias}")
+            options["BROADCAST_PATH"] = str(root / f"{alias}-broadcast.bin")
+        else:
+            config["LOCATION"] = str(root / f"cache_{alias}")
+    return {"CACHES": caches}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_session_files(tmp_path_factory):
+    """Keep files written while the test database is set up (``createcachetable``) out of ``data/``."""
+
+    from django.conf import settings
+    from django.test import override_settings
+
+    with override_settings(**_isolated_files(settings, tmp_path_factory.mktemp("session"))):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def isolated_files(settings, tmp_path_factory):
+    """Give every test empty caches instead of the developer's ``data/``."""
+
+    for name, value in _isolated_files(settings, tmp_path_factory.mktemp("files")).items():
+        setattr(settings, name, value)
+
+
 @pytest.fixture
 def client():
     from django.test import Client
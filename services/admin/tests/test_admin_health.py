@@ -15,3 +15,11 @@ def test_ready(api_client):
     response = api_client.get("/v1/ready")
     assert response.status_code == 200
     assert response.json()["ok"] is True
+
+
+@pytest.mark.django_db
+def test_metrics(api_client):
+    api_client.get("/v1/healthz")
+    response = api_client.get("/v1/metrics")
+    assert response.status_code == 200
+    assert 'http_responses_total{endpoint="v1/healthz",method="GET",service="admin",status="200"} ' in response.content.decode()
@@ -3,7 +3,7 @@ from __future__ import annotations
 import pytest
 from django.contrib.auth import get_user_model
 
-from shared.core.models import Number
+from shared.core.models import AreaCodeStats, Number
 
 
 @pytest.fixture
@@ -21,9 +21,11 @@ def test_create_update_delete_number(client, admin_user):
     assert response.status_code == 302
     number.refresh_from_db()
     assert number.phone_number == "5559999"
+    assert AreaCodeStats.objects.values_list("area_code", "count", "total_cost").get() == ("212", 1, 150)
     response = client.post("/numbers/action", {"action": "delete", "id": number.id})
     assert response.status_code == 302
     assert Number.objects.count() == 0
+    assert not AreaCodeStats.objects.exists()
 
 
 @pytest.mark.django_db
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import pytest
+from django.contrib.auth import get_user_model
+
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_DIR = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def staff(db):
+    return get_user_model().objects.create_user(username="staff", password="secretpass", is_staff=True)
+
+
+@pytest.fixture
+def user(db):
+    return get_user_model().objects.create_user(username="admin", password="secretpass")
+
+
+def test_staff_requests_with_the_header_are_profiled_listed_and_downloaded(client, profiling, staff):
+    client.login(username="staff", password="secretpass")
+    response = client.get("/numbers", headers={"X-Profile": "1", "X-Request-ID": "abc123"})
+    name = response["X-Profile-Id"]
+    assert name.endswith("-admin-abc123")
+
+    [listed] = client.get("/v1/profiles").json()["results"]
+    assert listed["name"] == name
+    assert listed["request_id"] == "abc123"
+    assert (listed["method"], listed["path"], listed["status"]) == ("GET", "/numbers", 200)
+
+    download = client.get(f"/v1/profiles/{name}")
+    assert download.status_code == 200
+    assert b"".join(download.streaming_content) == (profiling / f"{name}.prof").read_bytes()
+
+
+def test_non_staff_requests_are_not_profiled(client, profiling, user):
+    client.login(username="admin", password="secretpass")
+    response = client.get("/numbers", headers={"X-Profile": "1"})
+    assert "X-Profile-Id" not in response
+    assert not list(profiling.iterdir())
+
+
+def test_profile_endpoints_require_staff(client, profiling, user):
+    client.login(username="admin", password="secretpass")
+    assert client.get("/v1/profiles").status_code == 403
+
+
+@pytest.mark.parametrize("name", ["missing", "1-admin-nope", "..%2Fsettings"])
+def test_unknown_profiles_are_not_found(client, profiling, staff, name):
+    client.login(username="staff", password="secretpass")
+    assert client.get(f"/v1/profiles/{name}").status_code == 404
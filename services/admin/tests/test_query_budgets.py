@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from shared.core.models import Number
+from shared.core.querylog import assert_query_budget
+
+
+@pytest.fixture
+def admin_user(db):
+    return get_user_model().objects.create_user(username="admin", password="secretpass")
+
+
+@pytest.mark.parametrize("rows", [3, 30])
+def test_listing_budgets_do_not_grow_with_rows(api_client, client, admin_user, rows):
+    Number.objects.bulk_create([Number(area_code="212", phone_number=f"555{i:04d}", cost=100) for i in range(rows)])
+
+    api_client.force_authenticate(user=admin_user)
+    assert_query_budget(api_client.get("/v1/numbers"), 2)
+
+    client.login(username="admin", password="secretpass")
+    # Session, user, page count and page rows.
+    assert_query_budget(client.get("/numbers"), 4)
+
+
+@pytest.mark.django_db
+def test_metrics_export_query_counts(api_client):
+    api_client.get("/v1/ready")
+    body = api_client.get("/v1/metrics").content.decode()
+    assert 'db_queries_per_request_count{endpoint="v1/ready",method="GET",service="admin"}' in body
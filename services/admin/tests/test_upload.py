@@ -4,7 +4,7 @@ import pytest
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from shared.core.models import Number
+from shared.core.models import AreaCodeStats, Number
 
 
 @pytest.fixture
@@ -24,6 +24,10 @@ def test_bulk_upload_csv(client, admin_user):
     )
     assert response.status_code == 200
     assert Number.objects.count() == 2
+    assert sorted(AreaCodeStats.objects.values_list("area_code", "count", "total_cost")) == [
+        ("212", 1, 100),
+        ("213", 1, 150),
+    ]
 
 
 @pytest.mark.django_db
@@ -39,3 +43,4 @@ def test_bulk_upload_api(api_client, admin_user):
     assert response.status_code == 200
     data = response.json()
     assert data["inserted"] == 1
+    assert not AreaCodeStats.objects.exists()
@@ -3,14 +3,37 @@ from __future__ import annotations
 import logging
 import uuid
 
-from django.utils.deprecation import MiddlewareMixin
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
 logger = logging.getLogger(__name__)
 
 
-class RequestIDMiddleware(MiddlewareMixin):
+class RequestIDMiddleware:
+    """Attach a request id to the request and echo it in ``X-Request-ID``.
+
+    Works natively in both sync and async stacks, so ASGI requests do not
+    pay a thread hop for it.
+    """
+
+    sync_capable = True
+    async_capable = True
     header = "HTTP_X_REQUEST_ID"
 
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.process_request(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        self.process_request(request)
+        return self.process_response(request, await self.get_response(request))
+
     def process_request(self, request):
         request_id = request.META.get(self.header)
         if not request_id:
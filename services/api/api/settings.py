@@ -38,6 +38,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "shared.core.metrics.PrometheusMiddleware",
+    "shared.core.querylog.QueryAccountingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -47,6 +49,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "api.middleware.RequestIDMiddleware",
+    "shared.core.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "api.urls"
@@ -148,6 +151,14 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CORS_ALLOWED_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ALLOWLIST", "").split(",") if origin.strip()]
 CORS_ALLOW_CREDENTIALS = False
 
+# "sqlite": sliding-window counters in a host-local SQLite file at
+# THROTTLE_DB_PATH; "cache": DRF's timestamp lists in the default cache.
+THROTTLE_STORE = os.getenv("THROTTLE_STORE", "sqlite").lower()
+THROTTLE_DB_PATH = os.getenv(
+    "THROTTLE_DB_PATH",
+    str((BASE_DIR / ".." / ".." / "data" / "throttle.sqlite3").resolve()),
+)
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_RENDERER_CLASSES": [
@@ -157,10 +168,13 @@ REST_FRAMEWORK = {
         "rest_framework.parsers.JSONParser",
     ],
     "DEFAULT_THROTTLE_CLASSES": [
-        "api.phone_numbers.throttles.PublicRateThrottle",
+        "api.phone_numbers.throttles.CachePublicRateThrottle"
+        if THROTTLE_STORE == "cache"
+        else "api.phone_numbers.throttles.PublicRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "public": os.getenv("RATE_LIMITS_PUBLIC", "60/min"),
+        "search_batch": os.getenv("RATE_LIMITS_SEARCH_BATCH", "3/min"),
     },
     "EXCEPTION_HANDLER": "api.utils.exception_handler",
 }
@@ -178,13 +192,41 @@ cache_location = os.getenv(
 )
 Path(cache_location).mkdir(parents=True, exist_ok=True)
 
+search_cache_location = os.getenv(
+    "SEARCH_CACHE_DIR",
+    str((BASE_DIR / ".." / ".." / "data" / "cache_search").resolve()),
+)
+Path(search_cache_location).mkdir(parents=True, exist_ok=True)
+SEARCH_CACHE_TIMEOUT = int(os.getenv("SEARCH_CACHE_TIMEOUT", "86400"))
+
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
         "LOCATION": cache_location,
-    }
+    },
+    # Shared by both services: admin writes bump the data versions that key
+    # cached search results in the API.
+    "search": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": search_cache_location,
+        "TIMEOUT": SEARCH_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "10000"))},
+    },
 }
 
+# Bounded in-process LRU in front of each cache (see shared.core.tiered_cache);
+# 0 disables it.
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "1000"))
+CACHE_L1_TIMEOUT = float(os.getenv("CACHE_L1_TIMEOUT", "5"))
+if CACHE_L1_MAX_ENTRIES > 0:
+    CACHES = {
+        alias: {
+            "BACKEND": "shared.core.tiered_cache.TieredCache",
+            "OPTIONS": {"L2": config, "L1_MAX_ENTRIES": CACHE_L1_MAX_ENTRIES, "L1_TIMEOUT": CACHE_L1_TIMEOUT},
+        }
+        for alias, config in CACHES.items()
+    }
+
 RATELIMIT_USE_CACHE = "default"
 
 LOGGING = {
@@ -214,6 +256,50 @@ CSRF_COOKIE_SECURE = not DEBUG
 CSRF_TRUSTED_ORIGINS = CORS_ALLOWED_ORIGINS
 
 PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_SERVICE = "api"
+METRICS_INVENTORY_INTERVAL = int(os.getenv("METRICS_INVENTORY_INTERVAL", "30"))
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in {"1", "true", "yes"}
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", str((BASE_DIR / ".." / ".." / "data" / "profiles").resolve()))
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "python")
+SEARCH_INDEX_TTL = int(os.getenv("SEARCH_INDEX_TTL", "60"))
+SEARCH_INDEX_BACKGROUND = os.getenv("SEARCH_INDEX_BACKGROUND", "true").lower() in {"1", "true", "yes"}
+SEARCH_WARM_INDEXES = [
+    name.strip()
+    for name in os.getenv(
+        "SEARCH_WARM_INDEXES", "pattern,vanity,number" if SEARCH_BACKEND == "index" else "pattern,vanity"
+    ).split(",")
+    if name.strip()
+]
+SEARCH_VECTORIZE_THRESHOLD = int(os.getenv("SEARCH_VECTORIZE_THRESHOLD", "256"))
+SEARCH_CHUNK_SIZE = int(os.getenv("SEARCH_CHUNK_SIZE", "2000"))
+SEARCH_EXPLAIN_ENABLED = os.getenv("SEARCH_EXPLAIN_ENABLED", "false").lower() in {"1", "true", "yes"}
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "50"))
+SEARCH_RADIUS_MAX_DISTANCE = int(os.getenv("SEARCH_RADIUS_MAX_DISTANCE", "3"))
+SEARCH_RADIUS_MAX_LIMIT = int(os.getenv("SEARCH_RADIUS_MAX_LIMIT", "100"))
+SEARCH_PATTERN_MAX_LIMIT = int(os.getenv("SEARCH_PATTERN_MAX_LIMIT", "100"))
+SEARCH_VANITY_MAX_LIMIT = int(os.getenv("SEARCH_VANITY_MAX_LIMIT", "100"))
+SEARCH_SNAPSHOT_INTERVAL = float(os.getenv("SEARCH_SNAPSHOT_INTERVAL", "5"))
+SEARCH_SNAPSHOT_OVERLAP = float(os.getenv("SEARCH_SNAPSHOT_OVERLAP", "60"))
+SEARCH_TOMBSTONE_RETENTION = int(os.getenv("SEARCH_TOMBSTONE_RETENTION", "86400"))
+PREFIXES_FROM_SNAPSHOT = os.getenv("PREFIXES_FROM_SNAPSHOT", "false").lower() in {"1", "true", "yes"}
+SEARCH_PACKED_INDEX_PATH = os.getenv(
+    "SEARCH_PACKED_INDEX_PATH",
+    str((BASE_DIR / ".." / ".." / "data" / "number_index.bin").resolve()),
+)
+SEARCH_PACKED_CHECK_INTERVAL = float(os.getenv("SEARCH_PACKED_CHECK_INTERVAL", "5"))
+SEARCH_PARALLEL_WORKERS = int(os.getenv("SEARCH_PARALLEL_WORKERS", "0"))
+SEARCH_PARALLEL_THRESHOLD = int(os.getenv("SEARCH_PARALLEL_THRESHOLD", "50000"))
+SEARCH_PARALLEL_MIN_SHARD = int(os.getenv("SEARCH_PARALLEL_MIN_SHARD", "20000"))
+SEARCH_PARALLEL_TIMEOUT = float(os.getenv("SEARCH_PARALLEL_TIMEOUT", "5"))
+SEARCH_PARALLEL_START_METHOD = os.getenv("SEARCH_PARALLEL_START_METHOD", "forkserver")
+# Serve /v1/search and /v1/prefixes from async-native views (run under ASGI).
+API_ASYNC_VIEWS = os.getenv("API_ASYNC_VIEWS", "true").lower() in {"1", "true", "yes"}
 
 SILENCED_SYSTEM_CHECKS = [
     "django_ratelimit.E003",
@@ -0,0 +1,140 @@
+"""Async-native versions of the hot public endpoints.
+
+DRF 3.14 views are sync-only, so under ASGI every request to them runs in a
+worker thread.  These views are plain async Django views that reuse the DRF
+serializers, throttles and the project exception handler, so responses are
+identical to the sync views they replace (see ``API_ASYNC_VIEWS``).
+"""
+
+from __future__ import annotations
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils.http import quote_etag
+from django.views import View
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+
+from shared.core import search_cache, timing
+from shared.core.backends import get_backend
+from shared.core.caching import aget_or_refresh
+from shared.core.models import Number
+from shared.core.pagination import keyset_page
+
+from .serializers import SearchQuerySerializer, SearchResultSerializer
+from .views import (
+    PREFIX_ORDERING,
+    etag_matches,
+    explain_payload,
+    explain_requested,
+    keyset_rows,
+    not_modified,
+    offset_page,
+    prefix_cache_key,
+    prefix_data,
+    prefix_params,
+    prefix_payload,
+    prefix_queryset,
+    prefix_version,
+    radius_search,
+)
+
+
+class AsyncAPIView(View):
+    """Async base view applying the default DRF throttles and error format."""
+
+    throttle_classes = None
+
+    def get_throttles(self):
+        classes = self.throttle_classes if self.throttle_classes is not None else api_settings.DEFAULT_THROTTLE_CLASSES
+        return [throttle() for throttle in classes]
+
+    async def check_throttles(self, request: HttpRequest) -> None:
+        durations = []
+        for throttle in self.get_throttles():
+            if hasattr(throttle, "aallow_request"):
+                allowed = await throttle.aallow_request(request, self)
+            else:
+                allowed = await sync_to_async(throttle.allow_request)(request, self)
+            if not allowed:
+                durations.append(throttle.wait())
+        if durations:
+            durations = [duration for duration in durations if duration is not None]
+            raise Throttled(wait=max(durations, default=None))
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs):
+        try:
+            await self.check_throttles(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(request, exc)
+
+    def handle_exception(self, request: HttpRequest, exc: Exception) -> JsonResponse:
+        drf_response = api_settings.EXCEPTION_HANDLER(exc, {"view": self, "args": (), "kwargs": {}, "request": request})
+        response = JsonResponse(drf_response.data, status=drf_response.status_code)
+        for header, value in drf_response.items():
+            if header.lower() != "content-type":
+                response[header] = value
+        return response
+
+
+class AsyncSearchView(AsyncAPIView):
+    async def get(self, request: HttpRequest) -> JsonResponse:
+        if "max_distance" in request.GET:
+            return JsonResponse(await sync_to_async(radius_search)(request.GET))
+
+        serializer = SearchQuerySerializer(data=request.GET)
+        serializer.is_valid(raise_exception=True)
+        area_code = serializer.validated_data["area_code"]
+        number = serializer.validated_data["number"]
+
+        explain = explain_requested(request)
+
+        with timing.collect() as timings:
+            with timing.stage("search"):
+                if explain:
+                    results = await get_backend().arank(Number.objects.all(), area_code, number, limit=10)
+                else:
+                    results = await search_cache.asearch_related(area_code, number, limit=10)
+            with timing.stage("serialize"):
+                payload = {"results": SearchResultSerializer(results, many=True).data}
+        if explain:
+            payload["explain"] = explain_payload(timings)
+        return JsonResponse(payload, headers={"Server-Timing": timings.server_timing()})
+
+
+class AsyncPrefixListView(AsyncAPIView):
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        limit, offset, query, cursor = prefix_params(request)
+        if settings.PREFIXES_FROM_SNAPSHOT:
+            etag = quote_etag(await sync_to_async(prefix_version)())
+        else:
+            etag = quote_etag(await search_cache.adataset_version())
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        async def compute() -> dict:
+            if settings.PREFIXES_FROM_SNAPSHOT:
+                return await sync_to_async(prefix_data)(query, limit, offset, cursor)
+            qs = prefix_queryset(query)
+            total = await qs.acount()
+            if cursor is None:
+                page = offset_page([row async for row in qs[offset : offset + limit]], total, offset)
+            else:
+                rows = [row async for row in keyset_rows(qs, cursor)[: limit + 1]]
+                page = keyset_page(rows, PREFIX_ORDERING, limit)
+            return prefix_payload(page, total, limit, offset if cursor is None else None)
+
+        fetched = await aget_or_refresh(
+            cache, prefix_cache_key(limit, offset, query, cursor), compute, timeout=60, version=etag
+        )
+        if fetched.version != etag and etag_matches(request, fetched.version):
+            return not_modified(fetched.version)
+        response = JsonResponse(fetched.value)
+        response["ETag"] = fetched.version
+        return response
+
+
+__all__ = ["AsyncAPIView", "AsyncPrefixListView", "AsyncSearchView"]
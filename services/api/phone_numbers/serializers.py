@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+from django.conf import settings
 from rest_framework import serializers
 
 from shared.core.models import Number
-from shared.core.validators import AREA_CODE_REGEX, PHONE_NUMBER_REGEX
+from shared.core.vanity import keypad_digits, max_fuzzy_distance
+from shared.core.validators import AREA_CODE_REGEX, NUMBER_PATTERN_REGEX, PHONE_NUMBER_REGEX
 
 
 class PrefixSerializer(serializers.Serializer):
@@ -11,11 +13,52 @@ class PrefixSerializer(serializers.Serializer):
     count = serializers.IntegerField(min_value=0)
 
 
+class AreaCodeStatsSerializer(serializers.Serializer):
+    area_code = serializers.RegexField(AREA_CODE_REGEX)
+    count = serializers.IntegerField(min_value=0)
+    min_cost = serializers.IntegerField(min_value=0, allow_null=True)
+    avg_cost = serializers.FloatField(allow_null=True)
+    max_cost = serializers.IntegerField(min_value=0, allow_null=True)
+    updated_at = serializers.DateTimeField()
+
+
 class SearchQuerySerializer(serializers.Serializer):
     area_code = serializers.RegexField(AREA_CODE_REGEX)
     number = serializers.RegexField(PHONE_NUMBER_REGEX)
 
 
+class RadiusSearchQuerySerializer(SearchQuerySerializer):
+    max_distance = serializers.IntegerField(min_value=0, max_value=settings.SEARCH_RADIUS_MAX_DISTANCE)
+    limit = serializers.IntegerField(min_value=1, max_value=settings.SEARCH_RADIUS_MAX_LIMIT, default=10)
+    offset = serializers.IntegerField(min_value=0, default=0)
+
+
+class PatternQuerySerializer(serializers.Serializer):
+    pattern = serializers.RegexField(NUMBER_PATTERN_REGEX)
+    limit = serializers.IntegerField(min_value=1, max_value=settings.SEARCH_PATTERN_MAX_LIMIT, default=100)
+    offset = serializers.IntegerField(min_value=0, default=0)
+
+
+class VanityQuerySerializer(serializers.Serializer):
+    word = serializers.RegexField(r"^[A-Za-z0-9]{3,7}$")
+    area_code = serializers.RegexField(AREA_CODE_REGEX, required=False)
+    max_distance = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=settings.SEARCH_VANITY_MAX_LIMIT, default=10)
+    offset = serializers.IntegerField(min_value=0, default=0)
+
+    def validate(self, attrs):
+        allowed = max_fuzzy_distance(len(keypad_digits(attrs["word"])))
+        if attrs["max_distance"] > allowed:
+            raise serializers.ValidationError(
+                {"max_distance": f"Ensure this value is less than or equal to {allowed} for this word."}
+            )
+        return attrs
+
+
+class SearchBatchSerializer(serializers.Serializer):
+    queries = SearchQuerySerializer(many=True, allow_empty=False, max_length=settings.SEARCH_BATCH_MAX_QUERIES)
+
+
 class SearchResultSerializer(serializers.Serializer):
     area_code = serializers.RegexField(AREA_CODE_REGEX)
     phone_number = serializers.RegexField(PHONE_NUMBER_REGEX)
@@ -23,3 +66,41 @@ class SearchResultSerializer(serializers.Serializer):
     cost = serializers.IntegerField(min_value=0)
     similarity_score = serializers.FloatField()
     distance = serializers.IntegerField(min_value=0)
+
+
+class RadiusSearchResultSerializer(serializers.Serializer):
+    results = SearchResultSerializer(many=True)
+    count = serializers.IntegerField(min_value=0)
+    limit = serializers.IntegerField(min_value=1)
+    offset = serializers.IntegerField(min_value=0)
+
+
+class VanityResultSerializer(SearchResultSerializer):
+    match_offset = serializers.IntegerField(min_value=0)
+
+
+class VanitySearchResultSerializer(serializers.Serializer):
+    results = VanityResultSerializer(many=True)
+    count = serializers.IntegerField(min_value=0)
+    limit = serializers.IntegerField(min_value=1)
+    offset = serializers.IntegerField(min_value=0)
+
+
+class PatternMatchSerializer(serializers.Serializer):
+    area_code = serializers.RegexField(AREA_CODE_REGEX)
+    phone_number = serializers.RegexField(PHONE_NUMBER_REGEX)
+    full_number = serializers.CharField()
+    cost = serializers.IntegerField(min_value=0)
+
+
+class PatternSearchResultSerializer(serializers.Serializer):
+    results = PatternMatchSerializer(many=True)
+    count = serializers.IntegerField(min_value=0)
+    limit = serializers.IntegerField(min_value=1)
+    offset = serializers.IntegerField(min_value=0)
+
+
+class SearchBatchResultSerializer(serializers.Serializer):
+    area_code = serializers.RegexField(AREA_CODE_REGEX)
+    number = serializers.RegexField(PHONE_NUMBER_REGEX)
+    results = SearchResultSerializer(many=True)
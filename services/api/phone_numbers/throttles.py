@@ -1,11 +1,95 @@
 from __future__ import annotations
 
+import logging
+import sqlite3
+
+from asgiref.sync import sync_to_async
 from rest_framework.throttling import SimpleRateThrottle
 
+from shared.core.ratelimit import get_throttle_store
+
+logger = logging.getLogger(__name__)
+
 
 class PublicRateThrottle(SimpleRateThrottle):
+    """Sliding-window counter per client in the host-local SQLite store (see ``shared.core.ratelimit``).
+
+    Views doing more work per request set ``throttle_scope`` to be counted
+    against their own rate instead of ``public``.
+    """
+
     scope = "public"
 
+    def use_view_scope(self, view) -> None:
+        scope = getattr(view, "throttle_scope", None)
+        if scope and scope != self.scope:
+            self.scope = scope
+            self.rate = self.get_rate()
+            self.num_requests, self.duration = self.parse_rate(self.rate)
+
     def get_cache_key(self, request, view):
         ident = self.get_ident(request)
         return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view) -> bool:
+        self.use_view_scope(view)
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        try:
+            decision = get_throttle_store().hit(self.key, self.num_requests, self.duration)
+        except sqlite3.Error:
+            # A locked or broken store must not take the API down with it.
+            logger.warning("Throttle store unavailable; allowing request", exc_info=True)
+            return True
+        self.remaining_wait = decision.wait
+        return decision.allowed
+
+    async def aallow_request(self, request, view) -> bool:
+        """Async :meth:`allow_request`, run in a worker thread.
+
+        The SQLite write can wait up to the store's busy timeout for another
+        process's lock, which must not stall the event loop.  It holds no
+        Django connection, so it does not queue behind the thread-sensitive
+        worker.
+        """
+
+        return await sync_to_async(self.allow_request, thread_sensitive=False)(request, view)
+
+    def wait(self):
+        return self.remaining_wait
+
+
+class CachePublicRateThrottle(PublicRateThrottle):
+    """DRF's timestamp list per client in the default cache (``THROTTLE_STORE=cache``).
+
+    For deployments whose workers span hosts and share a cache server.
+    """
+
+    def allow_request(self, request, view) -> bool:
+        self.use_view_scope(view)
+        return SimpleRateThrottle.allow_request(self, request, view)
+
+    async def aallow_request(self, request, view) -> bool:
+        """Async :meth:`allow_request` using the cache's async API."""
+
+        self.use_view_scope(view)
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.history = await self.cache.aget(self.key, [])
+        self.now = self.timer()
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+        if len(self.history) >= self.num_requests:
+            return self.throttle_failure()
+        self.history.insert(0, self.now)
+        await self.cache.aset(self.key, self.history, self.duration)
+        return True
+
+    def wait(self):
+        return SimpleRateThrottle.wait(self)
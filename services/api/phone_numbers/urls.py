@@ -1,12 +1,31 @@
 from __future__ import annotations
 
+from django.conf import settings
 from django.urls import path
 
-from .views import HealthzView, MetricsView, PrefixListView, ReadyView, SearchView
+from .async_views import AsyncPrefixListView, AsyncSearchView
+from .views import (
+    AreaCodeStatsView,
+    HealthzView,
+    MetricsView,
+    PatternSearchView,
+    PrefixListView,
+    ReadyView,
+    SearchBatchView,
+    SearchView,
+    VanitySearchView,
+)
+
+if settings.API_ASYNC_VIEWS:
+    PrefixListView, SearchView = AsyncPrefixListView, AsyncSearchView  # noqa: F811
 
 urlpatterns = [
     path("prefixes", PrefixListView.as_view(), name="prefixes"),
+    path("prefixes/<str:area_code>", AreaCodeStatsView.as_view(), name="prefix-stats"),
     path("search", SearchView.as_view(), name="search"),
+    path("search/batch", SearchBatchView.as_view(), name="search-batch"),
+    path("search/pattern", PatternSearchView.as_view(), name="search-pattern"),
+    path("search/vanity", VanitySearchView.as_view(), name="search-vanity"),
     path("healthz", HealthzView.as_view(), name="healthz"),
     path("ready", ReadyView.as_view(), name="ready"),
     path("metrics", MetricsView.as_view(), name="metrics"),
@@ -3,65 +3,284 @@ from __future__ import annotations
 import logging
 import time
 
+from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Count
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, generate_latest
+from shared.core import search_cache, timing
+from shared.core.backends import get_backend
+from shared.core.caching import get_or_refresh
+from shared.core.metrics import render_metrics, start_inventory_refresh
+from shared.core.models import AreaCodeStats, Number
+from shared.core.pagination import (
+    KeysetPage,
+    encode_cursor,
+    keyset_page,
+    keyset_paginate_sequence,
+    keyset_queryset,
+)
+from shared.core.patterns import get_pattern_index
+from shared.core.search import rank_within_distance
+from shared.core.snapshot import get_number_snapshot
+from shared.core.vanity import get_vanity_index
 
-from shared.core.models import Number
-from shared.core.search import rank_related_numbers
-
-from .serializers import PrefixSerializer, SearchQuerySerializer, SearchResultSerializer
+from .serializers import (
+    AreaCodeStatsSerializer,
+    PatternQuerySerializer,
+    PatternSearchResultSerializer,
+    PrefixSerializer,
+    RadiusSearchQuerySerializer,
+    RadiusSearchResultSerializer,
+    SearchBatchResultSerializer,
+    SearchBatchSerializer,
+    SearchQuerySerializer,
+    SearchResultSerializer,
+    VanityQuerySerializer,
+    VanitySearchResultSerializer,
+)
 
 logger = logging.getLogger(__name__)
 PROCESS_START = time.time()
 
 
+PREFIX_ORDERING = ("-count", "area_code")
+
+
+def prefix_params(request: HttpRequest) -> tuple[int, int, str | None, str | None]:
+    """Parse ``limit``, ``offset``, ``q`` and ``cursor`` for the prefix listing.
+
+    ``cursor`` is ``None`` for offset pagination; an empty ``cursor`` asks
+    for the first keyset page.
+    """
+
+    try:
+        limit = min(max(int(request.GET.get("limit", 100)), 1), 500)
+    except ValueError:
+        limit = 100
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+    except ValueError:
+        offset = 0
+    return limit, offset, request.GET.get("q"), request.GET.get("cursor")
+
+
+def prefix_version() -> str:
+    """Version of the data behind ``/v1/prefixes``, read without a database query."""
+
+    if settings.PREFIXES_FROM_SNAPSHOT:
+        return get_number_snapshot().prefix_version()
+    return search_cache.dataset_version()
+
+
+def etag_matches(request: HttpRequest, etag: str) -> bool:
+    """Weak ``If-None-Match`` comparison, as RFC 9110 prescribes for GET."""
+
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return etags == ["*"] or etag in {tag.removeprefix("W/") for tag in etags}
+
+
+def not_modified(etag: str) -> HttpResponseNotModified:
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    return response
+
+
+def prefix_queryset(query: str | None):
+    # A few hundred maintained rows instead of a GROUP BY over every number.
+    qs = AreaCodeStats.objects.values("area_code", "count")
+    if query:
+        qs = qs.filter(area_code__startswith=query)
+    return qs.order_by(*PREFIX_ORDERING)
+
+
+def keyset_rows(qs, cursor: str):
+    """Order and filter ``qs`` for the page after ``cursor``, turning bad cursors into a 400."""
+
+    try:
+        return keyset_queryset(qs, PREFIX_ORDERING, cursor)
+    except ValueError as exc:
+        raise ValidationError({"cursor": [str(exc)]}) from exc
+
+
+def offset_page(rows: list, total: int, offset: int) -> KeysetPage:
+    # Offset pages also carry a cursor, so clients can switch to keyset paging.
+    more = bool(rows) and offset + len(rows) < total
+    return KeysetPage(items=rows, next_cursor=encode_cursor(rows[-1], PREFIX_ORDERING) if more else None)
+
+
+def database_prefixes(query: str | None, limit: int, offset: int, cursor: str | None) -> tuple[KeysetPage, int]:
+    qs = prefix_queryset(query)
+    total = qs.count()
+    if cursor is None:
+        return offset_page(list(qs[offset : offset + limit]), total, offset), total
+    return keyset_page(list(keyset_rows(qs, cursor)[: limit + 1]), PREFIX_ORDERING, limit), total
+
+
+def snapshot_prefixes(query: str | None, limit: int, offset: int, cursor: str | None = None) -> tuple[KeysetPage, int]:
+    counts = get_number_snapshot().prefix_counts(query)
+    if cursor is None:
+        rows = [{"area_code": area_code, "count": count} for area_code, count in counts[offset : offset + limit]]
+        return offset_page(rows, len(counts), offset), len(counts)
+    rows = [{"area_code": area_code, "count": count} for area_code, count in counts]
+    try:
+        return keyset_paginate_sequence(rows, PREFIX_ORDERING, cursor, limit), len(counts)
+    except ValueError as exc:
+        raise ValidationError({"cursor": [str(exc)]}) from exc
+
+
+def prefix_payload(page: KeysetPage, total: int, limit: int, offset: int | None) -> dict:
+    return {
+        "results": PrefixSerializer(page.items, many=True).data,
+        "count": total,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": page.next_cursor,
+    }
+
+
+def prefix_data(query: str | None, limit: int, offset: int, cursor: str | None) -> dict:
+    if settings.PREFIXES_FROM_SNAPSHOT:
+        page, total = snapshot_prefixes(query, limit, offset, cursor)
+    else:
+        page, total = database_prefixes(query, limit, offset, cursor)
+    return prefix_payload(page, total, limit, offset if cursor is None else None)
+
+
+def prefix_cache_key(limit: int, offset: int, query: str | None, cursor: str | None) -> str:
+    if cursor is not None:
+        return f"prefixes:{limit}:cursor:{cursor}:{query}"
+    return f"prefixes:{limit}:{offset}:{query}"
+
+
+def radius_search(params) -> dict:
+    """Validate a ``max_distance`` query and return one page of matches."""
+
+    serializer = RadiusSearchQuerySerializer(data=params)
+    serializer.is_valid(raise_exception=True)
+    query = serializer.validated_data
+    results, total = rank_within_distance(
+        query["area_code"], query["number"], query["max_distance"], limit=query["limit"], offset=query["offset"]
+    )
+    payload = {"results": results, "count": total, "limit": query["limit"], "offset": query["offset"]}
+    return RadiusSearchResultSerializer(payload).data
+
+
 class PrefixListView(APIView):
-    def get(self, request: HttpRequest) -> Response:
-        try:
-            limit = min(max(int(request.GET.get("limit", 100)), 1), 500)
-        except ValueError:
-            limit = 100
-        try:
-            offset = max(int(request.GET.get("offset", 0)), 0)
-        except ValueError:
-            offset = 0
-        query = request.GET.get("q")
-
-        cache_key = f"prefixes:{limit}:{offset}:{query}"
-        data = cache.get(cache_key)
-        if not data:
-            qs = Number.objects.values("area_code").annotate(count=Count("id"))
-            if query:
-                qs = qs.filter(area_code__startswith=query)
-            qs = qs.order_by("-count", "area_code")
-            sliced = qs[offset : offset + limit]
-            serializer = PrefixSerializer(sliced, many=True)
-            data = {
-                "results": serializer.data,
-                "count": qs.count(),
-                "limit": limit,
-                "offset": offset,
-            }
-            cache.set(cache_key, data, timeout=60)
-        return Response(data)
+    def get(self, request: HttpRequest) -> HttpResponse:
+        limit, offset, query, cursor = prefix_params(request)
+        # Strong ETag from the data version: a match is answered before any query or serialization.
+        etag = quote_etag(prefix_version())
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        # Entries are versioned by the ETag: after a write one request recomputes
+        # while the others keep getting the previous page under its own ETag.
+        fetched = get_or_refresh(
+            cache,
+            prefix_cache_key(limit, offset, query, cursor),
+            lambda: prefix_data(query, limit, offset, cursor),
+            timeout=60,
+            version=etag,
+        )
+        if fetched.version != etag and etag_matches(request, fetched.version):
+            return not_modified(fetched.version)
+        response = Response(fetched.value)
+        response["ETag"] = fetched.version
+        return response
+
+
+class AreaCodeStatsView(APIView):
+    def get(self, request: HttpRequest, area_code: str) -> Response:
+        stats = get_object_or_404(AreaCodeStats, area_code=area_code)
+        return Response(AreaCodeStatsSerializer(stats).data)
+
+
+def explain_requested(request: HttpRequest) -> bool:
+    """Whether the search should bypass the cache and report its stages (``explain=1``)."""
+
+    return settings.SEARCH_EXPLAIN_ENABLED and request.GET.get("explain", "").lower() in {"1", "true", "yes"}
+
+
+def explain_payload(timings: timing.Timings) -> dict:
+    return {"backend": get_backend().name, **timings.explain()}
 
 
 class SearchView(APIView):
     def get(self, request: HttpRequest) -> Response:
+        if "max_distance" in request.GET:
+            return Response(radius_search(request.GET))
+
         serializer = SearchQuerySerializer(data=request.GET)
         serializer.is_valid(raise_exception=True)
         area_code = serializer.validated_data["area_code"]
         number = serializer.validated_data["number"]
+        explain = explain_requested(request)
+
+        with timing.collect() as timings:
+            with timing.stage("search"):
+                if explain:
+                    results = get_backend().rank(Number.objects.all(), area_code, number, limit=10)
+                else:
+                    results = search_cache.search_related(area_code, number, limit=10)
+            with timing.stage("serialize"):
+                payload = {"results": SearchResultSerializer(results, many=True).data}
+        if explain:
+            payload["explain"] = explain_payload(timings)
+        return Response(payload, headers={"Server-Timing": timings.server_timing()})
+
+
+class SearchBatchView(APIView):
+    # One request runs up to SEARCH_BATCH_MAX_QUERIES searches.
+    throttle_scope = "search_batch"
+
+    def post(self, request: HttpRequest) -> Response:
+        serializer = SearchBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queries = [(item["area_code"], item["number"]) for item in serializer.validated_data["queries"]]
+
+        ranked = search_cache.search_related_many(queries, limit=10)
+        batch = [
+            {"area_code": area_code, "number": number, "results": results}
+            for (area_code, number), results in zip(queries, ranked)
+        ]
+        return Response({"results": SearchBatchResultSerializer(batch, many=True).data})
+
+
+class PatternSearchView(APIView):
+    def get(self, request: HttpRequest) -> Response:
+        serializer = PatternQuerySerializer(data=request.GET)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
+
+        results, total = get_pattern_index().search(query["pattern"], limit=query["limit"], offset=query["offset"])
+        payload = {"results": results, "count": total, "limit": query["limit"], "offset": query["offset"]}
+        return Response(PatternSearchResultSerializer(payload).data)
+
+
+class VanitySearchView(APIView):
+    def get(self, request: HttpRequest) -> Response:
+        serializer = VanityQuerySerializer(data=request.GET)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
 
-        results = rank_related_numbers(Number.objects.all(), area_code, number, limit=10)
-        payload = {"results": SearchResultSerializer(results, many=True).data}
-        return Response(payload)
+        results, total = get_vanity_index().search(
+            query["word"],
+            max_distance=query["max_distance"],
+            area_code=query.get("area_code"),
+            limit=query["limit"],
+            offset=query["offset"],
+        )
+        payload = {"results": results, "count": total, "limit": query["limit"], "offset": query["offset"]}
+        return Response(VanitySearchResultSerializer(payload).data)
 
 
 class HealthzView(APIView):
@@ -100,8 +319,6 @@ class MetricsView(APIView):
     throttle_classes = []
 
     def get(self, request: HttpRequest) -> HttpResponse:
-        registry = CollectorRegistry()
-        number_count = Gauge("phone_numbers_total", "Total phone numbers", registry=registry)
-        number_count.set(Number.objects.count())
-        data = generate_latest(registry)
-        return HttpResponse(data, content_type=CONTENT_TYPE_LATEST)
+        start_inventory_refresh()
+        data, content_type = render_metrics()
+        return HttpResponse(data, content_type=content_type)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import os
 import sys
 from pathlib import Path
@@ -18,3 +19,51 @@ def api_client():
     from rest_framework.test import APIClient
 
     return APIClient()
+
+
+def _isolated_files(settings, root: Path) -> dict:
+    """Return settings moving file caches, their broadcast files and the throttle store under ``root``."""
+
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, config in caches.items():
+        options = config.setdefault("OPTIONS", {})
+        if "L2" in options:
+            options["L2"]["LOCATION"] = str(root / f"cache_{alias}")
+            options["BROADCAST_PATH"] = str(root / f"{alias}-broadcast.bin")
+        else:
+            config["LOCATION"] = str(root / f"cache_{alias}")
+    return {"CACHES": caches, "THROTTLE_DB_PATH": str(root / "throttle.sqlite3")}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_session_files(tmp_path_factory):
+    """Keep files written while the test database is set up (``createcachetable``) out of ``data/``."""
+
+    from django.conf import settings
+    from django.test import override_settings
+
+    with override_settings(**_isolated_files(settings, tmp_path_factory.mktemp("session"))):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def isolated_files(settings, tmp_path_factory):
+    """Give every test empty caches and throttle counters instead of the developer's ``data/``."""
+
+    for name, value in _isolated_files(settings, tmp_path_factory.mktemp("files")).items():
+        setattr(settings, name, value)
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes(settings):
+    """Rebuild in-memory indexes inline and from scratch, so they never hold rows from earlier tests."""
+
+    from shared.core.background import reset_indexes
+    from shared.core.snapshot import reset_number_snapshot
+
+    settings.SEARCH_INDEX_BACKGROUND = False
+    reset_number_snapshot()
+    reset_indexes()
+    yield
+    reset_number_snapshot()
+    reset_indexes()
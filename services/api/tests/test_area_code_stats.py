@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+
+from shared.core.models import AreaCodeStats, Number
+from shared.core.stats import deferred_stats_updates, refresh_area_code_stats
+
+
+def _stats() -> dict[str, tuple]:
+    return {
+        stats.area_code: (stats.count, stats.total_cost, stats.min_cost, stats.max_cost)
+        for stats in AreaCodeStats.objects.all()
+    }
+
+
+def _expected() -> dict[str, tuple]:
+    expected: dict[str, list[int]] = {}
+    for number in Number.objects.all():
+        expected.setdefault(number.area_code, []).append(number.cost)
+    return {area_code: (len(costs), sum(costs), min(costs), max(costs)) for area_code, costs in expected.items()}
+
+
+@pytest.mark.django_db
+def test_stats_follow_creates_updates_and_deletes():
+    rng = random.Random(11)
+    numbers = [
+        Number.objects.create(
+            area_code=rng.choice(["212", "415"]), phone_number=f"555{index:04d}", cost=rng.randint(1, 500)
+        )
+        for index in range(40)
+    ]
+    assert _stats() == _expected()
+
+    for number in rng.sample(numbers, 15):
+        number = Number.objects.get(pk=number.pk)
+        number.cost = rng.randint(1, 500)
+        if rng.random() < 0.3:
+            number.area_code = "646"
+        number.save()
+    assert _stats() == _expected()
+
+    for number in rng.sample(numbers, 20):
+        Number.objects.get(pk=number.pk).delete()
+    assert _stats() == _expected()
+
+
+@pytest.mark.django_db
+def test_removing_an_extreme_recomputes_it():
+    cheapest = Number.objects.create(area_code="212", phone_number="5550001", cost=10)
+    Number.objects.create(area_code="212", phone_number="5550002", cost=20)
+    priciest = Number.objects.create(area_code="212", phone_number="5550003", cost=30)
+
+    cheapest.delete()
+    priciest.cost = 15
+    priciest.save()
+
+    stats = AreaCodeStats.objects.get(area_code="212")
+    assert (stats.count, stats.min_cost, stats.max_cost, stats.avg_cost) == (2, 15, 20, 17.5)
+
+
+@pytest.mark.django_db
+def test_last_number_removes_the_row():
+    number = Number.objects.create(area_code="305", phone_number="5550001", cost=10)
+    number.delete()
+    assert not AreaCodeStats.objects.exists()
+
+
+@pytest.mark.django_db
+def test_deferred_updates_apply_at_exit_unless_rolled_back():
+    with transaction.atomic(), deferred_stats_updates():
+        for index in range(20):
+            Number.objects.create(area_code="212", phone_number=f"555{index:04d}", cost=index + 1)
+        assert not AreaCodeStats.objects.exists()
+    assert _stats() == {"212": (20, 210, 1, 20)}
+
+    with transaction.atomic(), deferred_stats_updates():
+        Number.objects.create(area_code="415", phone_number="5550000", cost=1)
+        transaction.set_rollback(True)
+    assert _stats() == {"212": (20, 210, 1, 20)}
+
+
+@pytest.mark.django_db
+def test_reconcile_repairs_drift(capsys):
+    Number.objects.create(area_code="212", phone_number="5550001", cost=10)
+    Number.objects.bulk_create([Number(area_code="415", phone_number="5550001", cost=5)])
+    AreaCodeStats.objects.filter(area_code="212").update(count=7)
+    AreaCodeStats.objects.create(area_code="999", count=1, total_cost=1)
+
+    call_command("reconcile_area_code_stats")
+
+    assert "212, 415, 999" in capsys.readouterr().out
+    assert _stats() == _expected()
+    assert refresh_area_code_stats() == []
+
+
+@pytest.mark.django_db
+def test_prefixes_and_stats_endpoints_read_the_stats_table(api_client):
+    Number.objects.create(area_code="212", phone_number="5550001", cost=10)
+    Number.objects.create(area_code="212", phone_number="5550002", cost=30)
+    Number.objects.create(area_code="415", phone_number="5550001", cost=20)
+
+    data = api_client.get("/v1/prefixes").json()
+    assert data["results"] == [{"area_code": "212", "count": 2}, {"area_code": "415", "count": 1}]
+    assert data["count"] == 2
+
+    response = api_client.get("/v1/prefixes/212")
+    assert response.status_code == 200
+    assert {key: response.json()[key] for key in ("count", "min_cost", "avg_cost", "max_cost")} == {
+        "count": 2,
+        "min_cost": 10,
+        "avg_cost": 20.0,
+        "max_cost": 30,
+    }
+    assert api_client.get("/v1/prefixes/999").status_code == 404
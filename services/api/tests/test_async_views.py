@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import AsyncClient, RequestFactory
+
+from api.phone_numbers.async_views import AsyncPrefixListView, AsyncSearchView
+from api.phone_numbers.throttles import PublicRateThrottle
+from api.phone_numbers.views import PrefixListView, SearchView
+from shared.core import search
+from shared.core.models import Number
+from shared.core.search import arank_related_numbers, rank_related_numbers
+
+
+def _aget(path, params=None, headers=None):
+    async def request():
+        return await AsyncClient().get(path, params or {}, headers=headers)
+
+    return async_to_sync(request)()
+
+
+@pytest.fixture
+def numbers(db):
+    for area_code, number, cost in [
+        ("415", "5551234", 200),
+        ("415", "5551235", 150),
+        ("415", "5552234", 180),
+        ("212", "5551234", 90),
+        ("212", "5559999", 90),
+    ]:
+        Number.objects.create(area_code=area_code, phone_number=number, cost=cost)
+
+
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("/v1/search", {"area_code": "415", "number": "5551234"}),
+        ("/v1/search", {"area_code": "212", "number": "5559998"}),
+        ("/v1/search", {"area_code": "41", "number": "abc"}),
+        ("/v1/prefixes", {}),
+        ("/v1/prefixes", {"q": "4", "limit": "1"}),
+    ],
+)
+def test_async_views_match_sync_views(numbers, path, params):
+    sync_view, async_view = {
+        "/v1/search": (SearchView, AsyncSearchView),
+        "/v1/prefixes": (PrefixListView, AsyncPrefixListView),
+    }[path]
+    expected = sync_view.as_view()(RequestFactory().get(path, params)).render()
+
+    for alias in ("default", "search"):
+        caches[alias].clear()
+    response = async_to_sync(async_view.as_view())(RequestFactory().get(path, params))
+    assert response.status_code == expected.status_code
+    assert json.loads(response.content) == json.loads(expected.content)
+
+
+def test_arank_matches_rank(numbers):
+    for area_code, number in [("415", "5551234"), ("212", "5559998"), ("718", "5551234")]:
+        expected = rank_related_numbers(Number.objects.all(), area_code, number)
+        assert async_to_sync(arank_related_numbers)(Number.objects.all(), area_code, number) == expected
+
+
+def test_arank_scores_off_the_event_loop(numbers, monkeypatch):
+    scored_on = []
+    score_chunk = search._score_chunk
+
+    def recording_score_chunk(*args, **kwargs):
+        scored_on.append(threading.get_ident())
+        return score_chunk(*args, **kwargs)
+
+    monkeypatch.setattr(search, "_score_chunk", recording_score_chunk)
+
+    async def rank():
+        results = await arank_related_numbers(Number.objects.all(), "415", "5551234")
+        return threading.get_ident(), results
+
+    loop_thread, results = async_to_sync(rank)()
+    assert results == rank_related_numbers(Number.objects.all(), "415", "5551234")
+    assert scored_on and loop_thread not in scored_on
+
+
+def test_async_stack_throttles_and_tags_requests(numbers, monkeypatch):
+    monkeypatch.setitem(PublicRateThrottle.THROTTLE_RATES, "public", "2/min")
+    params = {"area_code": "415", "number": "5551234"}
+
+    first = _aget("/v1/search", params, headers={"X-Request-ID": "abc123"})
+    assert first.status_code == 200
+    assert first["X-Request-ID"] == "abc123"
+    assert _aget("/v1/search", params).status_code == 200
+
+    throttled = _aget("/v1/search", params)
+    assert throttled.status_code == 429
+    assert throttled.json()["error"]["code"] == "throttled"
+    assert int(throttled["Retry-After"]) > 0
+    assert throttled["X-Request-ID"]
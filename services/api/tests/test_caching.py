@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+
+from shared.core.caching import CacheEntry, aget_or_refresh, get_or_refresh
+from shared.core.models import Number
+
+
+@pytest.fixture
+def cache():
+    return caches["default"]
+
+
+class Counter:
+    def __init__(self, value=None, delay=0.0):
+        self.calls = 0
+        self.value = value
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+def test_empty_results_are_hits(cache):
+    compute = Counter(value=[])
+    assert get_or_refresh(cache, "k", compute, timeout=60).status == "miss"
+    fetched = get_or_refresh(cache, "k", compute, timeout=60)
+    assert (fetched.value, fetched.status, compute.calls) == ([], "hit", 1)
+
+
+def test_concurrent_misses_are_computed_once(cache):
+    compute = Counter(value=["x"], delay=0.2)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(get_or_refresh(cache, "k", compute, timeout=60)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert compute.calls == 1
+    assert sorted(fetched.status for fetched in results) == ["coalesced"] * 7 + ["miss"]
+    assert all(fetched.value == ["x"] for fetched in results)
+
+
+def test_stale_value_is_served_while_another_worker_refreshes(cache):
+    get_or_refresh(cache, "k", Counter(value="old"), timeout=60, version="v1")
+    # Another worker holds the refresh lock.
+    cache.add("k:lock", "other")
+    compute = Counter(value="new")
+
+    fetched = get_or_refresh(cache, "k", compute, timeout=60, version="v2")
+    assert (fetched.value, fetched.version, fetched.status, compute.calls) == ("old", "v1", "stale", 0)
+
+    cache.delete("k:lock")
+    fetched = get_or_refresh(cache, "k", compute, timeout=60, version="v2")
+    assert (fetched.value, fetched.version, fetched.status) == ("new", "v2", "miss")
+    assert cache.get("k:lock") is None
+
+
+def test_cold_miss_waits_for_the_lock_holder(cache):
+    # Another worker holds the lock and stores its result shortly after.
+    cache.add("k:lock", "other")
+    writer = threading.Timer(
+        0.1, lambda: cache.set("k", CacheEntry(value="theirs", version="", fresh_until=time.time() + 60))
+    )
+    compute = Counter(value="ours")
+
+    writer.start()
+    fetched = get_or_refresh(cache, "k", compute, timeout=60)
+    writer.join()
+
+    assert (fetched.value, fetched.status, compute.calls) == ("theirs", "coalesced", 0)
+    assert cache.get("k:lock") == "other"
+
+
+def test_errors_reach_every_waiter_and_are_not_cached(cache):
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            get_or_refresh(cache, "k", fail, timeout=60)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 3
+    assert get_or_refresh(cache, "k", Counter(value=1), timeout=60).status == "miss"
+
+
+def test_async_misses_are_coalesced(cache):
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return "x"
+
+    async def run():
+        return await asyncio.gather(*(aget_or_refresh(cache, "k", compute, timeout=60) for _ in range(5)))
+
+    results = async_to_sync(run)()
+    assert calls == 1
+    assert sorted(fetched.status for fetched in results) == ["coalesced"] * 4 + ["miss"]
+
+
+@pytest.mark.django_db
+def test_empty_prefix_listing_is_served_from_cache(api_client, django_assert_num_queries):
+    Number.objects.create(area_code="212", phone_number="1234567", cost=99)
+    assert api_client.get("/v1/prefixes", {"q": "9"}).json()["results"] == []
+
+    with django_assert_num_queries(0):
+        assert api_client.get("/v1/prefixes", {"q": "9"}).json()["results"] == []
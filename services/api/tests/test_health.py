@@ -15,3 +15,13 @@ def test_ready(api_client):
     response = api_client.get("/v1/ready")
     assert response.status_code == 200
     assert response.json()["ok"] is True
+
+
+@pytest.mark.django_db
+def test_metrics_record_requests_per_endpoint(api_client):
+    api_client.get("/v1/healthz")
+    body = api_client.get("/v1/metrics").content.decode()
+    assert 'http_request_duration_seconds_bucket{endpoint="v1/healthz",le="0.001",method="GET",service="api"}' in body
+    assert 'http_responses_total{endpoint="v1/healthz",method="GET",service="api",status="200"} ' in body
+    assert 'http_requests_in_progress{method="GET",service="api"} 1.0' in body
+    assert "phone_numbers_total " in body
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
 
-from shared.core.models import Number
+from shared.core.models import AreaCodeStats, Number
+from shared.core.pagination import encode_cursor
+from shared.core.snapshot import reset_number_snapshot
 
 
 @pytest.mark.django_db
@@ -17,3 +22,88 @@ def test_prefixes_endpoint_returns_counts(api_client):
     assert data["count"] == 2
     first = data["results"][0]
     assert first["area_code"] in {"212", "305"}
+
+
+@pytest.fixture
+def area_code_stats(db):
+    # Ties on count exercise the area_code tie-break of the keyset.
+    for index in range(23):
+        AreaCodeStats.objects.create(area_code=f"{200 + index}", count=index % 5 + 1, total_cost=1)
+
+
+def _get(client, params=None, **headers):
+    if isinstance(client, AsyncClient):
+
+        async def request():
+            return await client.get("/v1/prefixes", params or {}, headers=headers)
+
+        return async_to_sync(request)()
+    return client.get("/v1/prefixes", params or {}, headers=headers)
+
+
+@pytest.mark.parametrize("client_class", [APIClient, AsyncClient])
+def test_prefixes_revalidate_without_queries(
+    client_class, db, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    client = client_class()
+    Number.objects.create(area_code="212", phone_number="1234567", cost=99)
+    first = _get(client)
+    etag = first["ETag"]
+    assert first.status_code == 200 and etag.startswith('"')
+
+    with django_assert_num_queries(0):
+        revalidated = _get(client, If_None_Match=f'"stale", W/{etag}')
+    assert revalidated.status_code == 304
+    assert revalidated["ETag"] == etag
+    assert not revalidated.content
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Number.objects.create(area_code="305", phone_number="7654321", cost=149)
+    changed = _get(client, If_None_Match=etag)
+    assert changed.status_code == 200
+    assert changed["ETag"] != etag
+    assert changed.json()["count"] == 2
+
+
+@pytest.mark.parametrize("from_snapshot", [False, True])
+def test_cursor_pages_partition_the_offset_listing(api_client, area_code_stats, settings, from_snapshot):
+    if from_snapshot:
+        for index in range(23):
+            for number in range(index % 5 + 1):
+                Number.objects.create(area_code=f"{200 + index}", phone_number=f"555{number:04d}", cost=1)
+        settings.PREFIXES_FROM_SNAPSHOT = True
+        reset_number_snapshot()
+    expected = api_client.get("/v1/prefixes", {"q": "2"}).json()["results"]
+
+    pages, cursor = [], ""
+    while cursor is not None:
+        data = api_client.get("/v1/prefixes", {"q": "2", "limit": 5, "cursor": cursor}).json()
+        assert data["count"] == 23 and data["offset"] is None
+        pages.append(data["results"])
+        cursor = data["next_cursor"]
+    reset_number_snapshot()
+
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert [row for page in pages for row in page] == expected
+
+
+def test_offset_pages_hand_over_to_cursors(api_client, area_code_stats):
+    offset_page = api_client.get("/v1/prefixes", {"limit": 4, "offset": 4}).json()
+    cursor_page = api_client.get("/v1/prefixes", {"limit": 4, "cursor": offset_page["next_cursor"]}).json()
+
+    assert cursor_page["results"] == api_client.get("/v1/prefixes", {"limit": 4, "offset": 8}).json()["results"]
+    assert api_client.get("/v1/prefixes", {"offset": 20}).json()["next_cursor"] is None
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "%%%",
+        "bm90IGpzb24",
+        encode_cursor({"count": 1}, ["count"]),
+        encode_cursor({"count": "many", "area_code": "212"}, ["-count", "area_code"]),
+    ],
+)
+def test_malformed_cursor_is_rejected(api_client, area_code_stats, cursor):
+    response = api_client.get("/v1/prefixes", {"cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pstats
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+
+from shared.core.models import Number
+
+SEARCH = {"area_code": "415", "number": "5551234"}
+
+
+@pytest.fixture
+def profiling(db, settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_TOKEN = "s3cret"
+    settings.PROFILING_DIR = str(tmp_path)
+    Number.objects.create(area_code="415", phone_number="5551235", cost=100)
+    return tmp_path
+
+
+def test_disabled_profiling_ignores_the_header(api_client, db, settings, tmp_path):
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_TOKEN = "s3cret"
+    response = api_client.get("/v1/search", SEARCH, headers={"X-Profile": "s3cret"})
+    assert "X-Profile-Id" not in response
+    assert not list(tmp_path.iterdir())
+
+
+def test_token_profiles_the_request(api_client, profiling):
+    response = api_client.get("/v1/prefixes/415", headers={"X-Profile": "s3cret", "X-Request-ID": "req/7"})
+    assert response.status_code == 200
+    name = response["X-Profile-Id"]
+    assert name.endswith("-api-req_7")
+
+    stats = pstats.Stats(str(profiling / f"{name}.prof"))
+    assert any(function == "get" and path.endswith("phone_numbers/views.py") for path, _, function in stats.stats)
+    assert (profiling / f"{name}.json").exists()
+
+
+@pytest.mark.parametrize("header", [{}, {"X-Profile": "wrong"}, {"X-Profile": "1"}])
+def test_requests_without_the_token_are_not_profiled(api_client, profiling, header):
+    response = api_client.get("/v1/search", SEARCH, headers=header)
+    assert "X-Profile-Id" not in response
+    assert not list(profiling.iterdir())
+
+
+def test_sampled_requests_are_profiled_and_pruned(api_client, profiling, settings):
+    settings.PROFILING_SAMPLE_RATE = 1.0
+    settings.PROFILING_MAX_FILES = 2
+    names = [api_client.get("/v1/healthz", headers={"X-Request-ID": f"r{i}"})["X-Profile-Id"] for i in range(3)]
+    assert sorted(path.name for path in profiling.glob("*.prof")) == [f"{name}.prof" for name in names[1:]]
+    assert len(list(profiling.glob("*.json"))) == 2
+
+
+def test_async_views_are_profiled(profiling):
+    async def request():
+        return await AsyncClient().get("/v1/search", SEARCH, headers={"X-Profile": "s3cret"})
+
+    response = async_to_sync(request)()
+    assert response.status_code == 200
+    assert (profiling / f"{response['X-Profile-Id']}.prof").exists()
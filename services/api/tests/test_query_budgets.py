@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+
+from shared.core.models import Number
+from shared.core.querylog import assert_query_budget
+
+SEARCH = {"area_code": "415", "number": "5551234"}
+
+# Most queries a cold request to each endpoint may run.  In-memory indexes are
+# built from the inventory snapshot, which reads numbers and tombstones.
+BUDGETS = [
+    ("/v1/search", SEARCH, 2),
+    ("/v1/search", {**SEARCH, "explain": "1"}, 2),
+    ("/v1/search", {**SEARCH, "max_distance": "1"}, 2),
+    ("/v1/search/pattern", {"pattern": "415555????"}, 2),
+    ("/v1/search/vanity", {"word": "CALL"}, 2),
+    ("/v1/prefixes", {}, 2),
+    ("/v1/prefixes/415", {}, 1),
+    ("/v1/healthz", {}, 0),
+    ("/v1/ready", {}, 1),
+]
+
+
+@pytest.fixture
+def numbers(db):
+    for area_code, number in [("415", "5551234"), ("415", "5551235"), ("212", "5551234")]:
+        Number.objects.create(area_code=area_code, phone_number=number, cost=100)
+
+
+@pytest.mark.parametrize("path, params, budget", BUDGETS)
+def test_endpoint_query_budgets(api_client, numbers, settings, path, params, budget):
+    settings.SEARCH_EXPLAIN_ENABLED = True
+    response = api_client.get(path, params)
+    assert response.status_code == 200
+    assert_query_budget(response, budget)
+
+
+def test_cached_responses_run_no_queries(api_client, numbers):
+    for path, params in [("/v1/search", SEARCH), ("/v1/prefixes", {})]:
+        api_client.get(path, params)
+        assert_query_budget(api_client.get(path, params), 0)
+
+
+def test_budget_overruns_fail_with_the_count(api_client, numbers):
+    response = api_client.get("/v1/search", SEARCH)
+    with pytest.raises(AssertionError, match=r"GET /v1/search\?area_code=415&number=5551234 ran 2 queries, budget is 1"):
+        assert_query_budget(response, 1)
+
+
+def test_async_requests_are_accounted(numbers):
+    async def request():
+        return await AsyncClient().get("/v1/search", SEARCH)
+
+    response = async_to_sync(request)()
+    assert response.status_code == 200
+    assert response.asgi_request.db_queries.count == 2
+
+
+def test_slow_queries_are_logged_with_the_request_id(api_client, numbers, settings, caplog):
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    with caplog.at_level(logging.WARNING, logger="shared.core.querylog"):
+        api_client.get("/v1/prefixes/415", headers={"X-Request-ID": "req-42"})
+    [record] = caplog.records
+    assert record.request_id == "req-42"
+    assert record.path == "/v1/prefixes/415"
+    assert "area_code" in record.sql
+    assert record.duration_ms >= 0
+
+
+def test_slow_query_log_is_sampled(api_client, numbers, settings, caplog):
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    settings.SLOW_QUERY_SAMPLE_RATE = 0
+    with caplog.at_level(logging.WARNING, logger="shared.core.querylog"):
+        api_client.get("/v1/prefixes/415")
+    assert not caplog.records
+
+
+def test_query_counts_are_exported_per_endpoint(api_client, numbers):
+    api_client.get("/v1/prefixes/415")
+    body = api_client.get("/v1/metrics").content.decode()
+    assert 'db_queries_per_request_count{endpoint="v1/prefixes/<str:area_code>",method="GET",service="api"}' in body
+    assert 'db_time_per_request_seconds_bucket{endpoint="v1/prefixes/<str:area_code>",' in body
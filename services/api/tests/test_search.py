@@ -26,3 +26,69 @@ def test_search_validation(api_client):
     assert response.status_code == 400
     data = response.json()
     assert "error" in data
+
+
+@pytest.mark.django_db
+def test_streaming_ranking_matches_full_sort(settings):
+    import random
+
+    from shared.core.search import levenshtein_distance, rank_related_numbers, trigram_jaccard
+
+    rng = random.Random(13)
+    rows = {(rng.choice(["415", "212"]), f"555{rng.randint(0, 9999):04d}") for _ in range(300)}
+    Number.objects.bulk_create([Number(area_code=a, phone_number=p, cost=rng.choice([10, 20])) for a, p in rows])
+
+    expected = sorted(
+        Number.objects.filter(area_code="415").exclude(phone_number="5551234"),
+        key=lambda n: (
+            levenshtein_distance("5551234", n.phone_number),
+            -trigram_jaccard("4155551234", n.full_number),
+            n.cost,
+            -n.created_at.timestamp(),
+        ),
+    )[:10]
+
+    settings.SEARCH_CHUNK_SIZE = 7
+    settings.SEARCH_VECTORIZE_THRESHOLD = 10**9
+    results = rank_related_numbers(Number.objects.all(), "415", "5551234", limit=10)
+    assert [item["full_number"] for item in results] == [n.full_number for n in expected]
+
+
+@pytest.mark.django_db
+def test_batch_search_matches_single_searches(api_client):
+    for local in ("5551234", "5551235", "5552234", "5559999", "1234567"):
+        Number.objects.create(area_code="415", phone_number=local, cost=100)
+    Number.objects.create(area_code="212", phone_number="5551234", cost=90)
+    queries = [
+        {"area_code": "415", "number": "5551234"},
+        {"area_code": "212", "number": "0009999"},
+        {"area_code": "415", "number": "1234567"},
+    ]
+
+    response = api_client.post("/v1/search/batch", {"queries": queries}, format="json")
+    assert response.status_code == 200
+    batch = response.json()["results"]
+    assert [(item["area_code"], item["number"]) for item in batch] == [(q["area_code"], q["number"]) for q in queries]
+    for query, item in zip(queries, batch):
+        single = api_client.get("/v1/search", query).json()["results"]
+        assert item["results"] == single
+
+
+@pytest.mark.django_db
+def test_batch_search_reads_each_area_code_once(django_assert_num_queries):
+    from shared.core.search import rank_related_numbers_batch
+
+    Number.objects.bulk_create([Number(area_code="415", phone_number=f"55500{i:02d}", cost=10) for i in range(20)])
+    with django_assert_num_queries(1):
+        results = rank_related_numbers_batch(Number.objects.all(), [("415", "5550001"), ("415", "5559999")], limit=5)
+    assert [len(items) for items in results] == [5, 5]
+
+
+@pytest.mark.django_db
+def test_batch_search_validation(api_client, settings):
+    response = api_client.post("/v1/search/batch", {"queries": []}, format="json")
+    assert response.status_code == 400
+    too_many = [{"area_code": "415", "number": "5551234"}] * (settings.SEARCH_BATCH_MAX_QUERIES + 1)
+    response = api_client.post("/v1/search/batch", {"queries": too_many}, format="json")
+    assert response.status_code == 400
+    assert "error" in response.json()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from shared.core.backends import PythonSearchBackend, available_backends, get_backend
+from shared.core.models import Number
+
+requires_postgres = pytest.mark.skipif(connection.vendor != "postgresql", reason="PostgreSQL backend only")
+requires_sqlite = pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite backend only")
+QUERIES = [("212", "5551234"), ("415", "1230000"), ("718", "5551234"), ("999", "7771234")]
+
+
+def _seed(rng: random.Random) -> None:
+    rows = {(rng.choice(["212", "415", "646"]), f"{rng.choice(['555', '123'])}{rng.randint(0, 9999):04d}") for _ in range(500)}
+    rows |= {("718", "5551234"), ("718", "0001234"), ("917", "7771234")}
+    Number.objects.bulk_create(
+        [Number(area_code=area, phone_number=local, cost=rng.choice([49, 99])) for area, local in sorted(rows)]
+    )
+
+
+def test_backend_registry():
+    assert {"python", "index", "postgres", "sqlite"} <= set(available_backends())
+    assert isinstance(get_backend("python"), PythonSearchBackend)
+    assert isinstance(get_backend("shared.core.backends.PythonSearchBackend"), PythonSearchBackend)
+    with pytest.raises(ImproperlyConfigured):
+        get_backend("does-not-exist")
+
+
+@pytest.mark.django_db
+def test_search_view_uses_configured_backend(api_client, settings):
+    Number.objects.create(area_code="415", phone_number="5551235", cost=150)
+    settings.SEARCH_BACKEND = "index"
+    indexed = api_client.get("/v1/search", {"area_code": "415", "number": "5551234"}).json()
+    settings.SEARCH_BACKEND = "python"
+    caches["search"].clear()
+    assert api_client.get("/v1/search", {"area_code": "415", "number": "5551234"}).json() == indexed
+
+
+@requires_postgres
+@pytest.mark.django_db
+@pytest.mark.parametrize("area_code,number", QUERIES)
+def test_postgres_backend_matches_python_backend(area_code, number):
+    _seed(random.Random(29))
+    queryset = Number.objects.all()
+    expected = get_backend("python").rank(queryset, area_code, number, limit=10)
+    assert get_backend("postgres").rank(queryset, area_code, number, limit=10) == expected
+
+
+@requires_sqlite
+@pytest.mark.django_db
+@pytest.mark.parametrize("area_code,number", QUERIES)
+def test_sqlite_backend_matches_python_backend(area_code, number, django_assert_num_queries):
+    _seed(random.Random(31))
+    queryset = Number.objects.all()
+    expected = get_backend("python").rank(queryset, area_code, number, limit=10)
+    with django_assert_num_queries(1):
+        assert get_backend("sqlite").rank(queryset, area_code, number, limit=10) == expected
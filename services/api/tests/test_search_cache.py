@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import pytest
+
+from shared.core import search_cache
+from shared.core.models import Number
+
+
+def _search(api_client, area_code="415", number="5551234"):
+    response = api_client.get("/v1/search", {"area_code": area_code, "number": number})
+    assert response.status_code == 200
+    return [item["full_number"] for item in response.json()["results"]]
+
+
+@pytest.mark.django_db
+def test_search_results_are_cached(api_client, django_assert_num_queries):
+    Number.objects.create(area_code="415", phone_number="5551235", cost=150)
+    before = search_cache.stats.snapshot()
+
+    assert _search(api_client) == ["4155551235"]
+    with django_assert_num_queries(0):
+        assert _search(api_client) == ["4155551235"]
+
+    after = search_cache.stats.snapshot()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+@pytest.mark.django_db
+def test_writes_invalidate_old_and_new_keys(api_client, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        number = Number.objects.create(area_code="415", phone_number="5551235", cost=150)
+        Number.objects.create(area_code="212", phone_number="5559999", cost=99)
+    assert _search(api_client) == ["4155551235"]
+    assert _search(api_client, "212", "5559998") == ["2125559999"]
+
+    # Moving a row must refresh results for both its old and its new area code.
+    number = Number.objects.get(pk=number.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        number.area_code = "212"
+        number.save()
+    assert _search(api_client) == []
+    assert _search(api_client, "212", "5559998") == ["2125559999", "2125551235"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        number.delete()
+    assert _search(api_client, "212", "5559998") == ["2125559999"]
+
+
+@pytest.mark.django_db
+def test_deferred_version_bumps_coalesce(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        with search_cache.deferred_version_bumps():
+            for suffix in range(5):
+                Number.objects.create(area_code="415", phone_number=f"555000{suffix}", cost=10)
+    assert len(callbacks) == 1
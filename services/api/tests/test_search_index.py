@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import random
+import threading
+
+import pytest
+
+from shared.core import background, snapshot as snapshot_module
+from shared.core.background import BackgroundIndex
+from shared.core.index import BKTree, NumberIndex, TrigramIndex, get_number_index
+from shared.core.models import Number
+from shared.core.search import levenshtein_distance, rank_related_numbers, trigram_jaccard
+
+
+def _seed_numbers(count: int, area_codes: list[str]) -> None:
+    rng = random.Random(7)
+    seen = set()
+    numbers = []
+    while len(numbers) < count:
+        area_code = rng.choice(area_codes)
+        local = f"{rng.randint(0, 9999999):07d}"
+        if (area_code, local) in seen:
+            continue
+        seen.add((area_code, local))
+        numbers.append(Number(area_code=area_code, phone_number=local, cost=rng.choice([49, 99, 149])))
+    Number.objects.bulk_create(numbers)
+
+
+def test_bk_tree_nearest_matches_brute_force():
+    rng = random.Random(3)
+    keys = {f"{rng.randint(0, 9999999):07d}" for _ in range(500)}
+    tree = BKTree()
+    for key in keys:
+        tree.add(key, None)
+
+    query = "5551234"
+    found = tree.nearest(query, 10)
+    distances = sorted(levenshtein_distance(query, key) for key in keys)
+    boundary = distances[9]
+    assert sorted(distance for distance, _, _ in found) == [d for d in distances if d <= boundary]
+    assert {key for _, key, _ in tree.search(query, 3)} == {key for key in keys if levenshtein_distance(query, key) <= 3}
+
+
+def test_bk_tree_contains_keys_stored_with_none():
+    tree = BKTree()
+    tree.add("5551234", None)
+    tree.add("5551235", 0)
+
+    assert "5551234" in tree
+    assert "5551235" in tree
+    assert "5551236" not in tree
+    assert tree.get("5551236", "missing") == "missing"
+
+
+def test_trigram_index_similarity_matches_trigram_jaccard():
+    index = TrigramIndex(["4155551234", "2125551234"])
+
+    assert len(index) == 2
+    assert index.add("4155551234") == 0
+    assert index.similarity("4155551234", "2125551234") == trigram_jaccard("4155551234", "2125551234")
+    assert index.similarity("4155551234", "9999999999") == trigram_jaccard("4155551234", "9999999999")
+
+
+def test_trigram_index_similar_matches_brute_force():
+    rng = random.Random(9)
+    values = {f"{rng.choice(['212', '415'])}{rng.randint(0, 9999999):07d}" for _ in range(2000)}
+    index = TrigramIndex(values)
+
+    query = "4155551234"
+    for threshold in (0.0, 0.2, 0.4):
+        expected = sorted(
+            ((trigram_jaccard(query, value), value) for value in values if trigram_jaccard(query, value) >= threshold),
+            key=lambda item: (-item[0], item[1]),
+        )
+        if threshold == 0.0:
+            expected = [item for item in expected if item[0] > 0]
+        assert index.similar(query, limit=15, min_similarity=threshold) == expected[:15]
+
+
+@pytest.mark.django_db
+def test_number_index_matches_python_ranking():
+    _seed_numbers(400, ["212", "305", "415"])
+    Number.objects.create(area_code="999", phone_number="5551234", cost=10)
+    Number.objects.create(area_code="212", phone_number="0001234", cost=10)
+    index = NumberIndex.from_queryset(Number.objects.all())
+
+    queries = [("212", "5551234"), ("415", "0000000"), ("999", "5551234"), ("646", "7771234")]
+    for area_code, number in queries:
+        expected = rank_related_numbers(Number.objects.all(), area_code, number, limit=10)
+        assert index.rank(area_code, number, limit=10) == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("seed", range(6))
+def test_number_index_breaks_exact_ties_like_python_ranking(seed):
+    rng = random.Random(seed)
+    local_numbers = {f"556{rng.randint(0, 99):02d}{rng.randint(0, 99):02d}" for _ in range(60)}
+    rows = [(area_code, local) for area_code in ("415", "212") for local in local_numbers]
+    rows += [("718", "5560020"), ("305", "1110020")]
+    Number.objects.bulk_create([Number(area_code=area_code, phone_number=local, cost=50) for area_code, local in rows])
+    Number.objects.update(created_at=Number.objects.earliest("created_at").created_at)
+    index = NumberIndex.from_queryset(Number.objects.all())
+
+    for area_code, number in [("415", "5560020"), ("718", "5560021")]:
+        expected = rank_related_numbers(Number.objects.all(), area_code, number, limit=10)
+        assert index.rank(area_code, number, limit=10) == expected
+
+
+@pytest.mark.django_db
+def test_search_endpoint_uses_index(api_client, settings):
+    settings.SEARCH_BACKEND = "index"
+    Number.objects.create(area_code="415", phone_number="5551234", cost=200)
+    Number.objects.create(area_code="415", phone_number="5551235", cost=150)
+    Number.objects.create(area_code="212", phone_number="5551234", cost=90)
+
+    response = api_client.get("/v1/search", {"area_code": "415", "number": "5551234"})
+    assert response.status_code == 200
+    assert [item["full_number"] for item in response.json()["results"]] == ["2125551234", "4155551235"]
+    assert len(get_number_index()) == 3
+
+
+def test_background_index_serves_the_previous_value_while_rebuilding(settings, monkeypatch):
+    settings.SEARCH_INDEX_BACKGROUND = True
+    snapshots = iter(["first", "second", "second"])
+    monkeypatch.setattr(snapshot_module, "refresh_number_snapshot", lambda: next(snapshots))
+    release = threading.Event()
+    builds = []
+
+    def build(snapshot):
+        if builds:
+            release.wait(5)
+        builds.append(snapshot)
+        return f"index of {snapshot}"
+
+    holder = BackgroundIndex("test-background", build)
+    assert holder.get() == "index of first"
+
+    holder.invalidate()
+    assert holder.get() == "index of first"
+    assert holder.get() == "index of first"
+    release.set()
+    holder._thread.join(5)
+    assert holder.get() == "index of second"
+    assert builds == ["first", "second"]
+
+    # A poll that returns the same snapshot does not rebuild.
+    holder.invalidate()
+    holder.get()
+    holder._thread.join(5)
+    assert builds == ["first", "second"]
+
+
+def test_failed_rebuild_keeps_the_invalidation(settings, monkeypatch):
+    settings.SEARCH_INDEX_BACKGROUND = True
+    monkeypatch.setattr(background, "RETRY_DELAY", 0)
+    snapshots = iter(["first", "second", "second"])
+    monkeypatch.setattr(snapshot_module, "refresh_number_snapshot", lambda: next(snapshots))
+    builds = []
+
+    def build(snapshot):
+        builds.append(snapshot)
+        if len(builds) == 2:
+            raise RuntimeError("database unavailable")
+        return f"index of {snapshot}"
+
+    holder = BackgroundIndex("test-retry", build)
+    holder.get()
+    holder.invalidate()
+    assert holder.get() == "index of first"
+    holder._thread.join(5)
+    # The failed rebuild left the invalidation pending, so the next read retries.
+    assert holder.get() == "index of first"
+    holder._thread.join(5)
+    assert holder.get() == "index of second"
+    assert builds == ["first", "second", "second"]
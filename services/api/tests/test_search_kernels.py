@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import itertools
+import random
+
+from shared.core.search import (
+    LevenshteinPattern,
+    bitset_jaccard,
+    levenshtein_bitparallel,
+    levenshtein_distance,
+    trigram_bitset,
+    trigram_jaccard,
+    trigram_set,
+)
+
+
+def test_bitparallel_matches_dynamic_programming():
+    rng = random.Random(17)
+    pairs = [("", ""), ("", "5551234"), ("5551234", ""), ("5551234", "5551234")]
+    pairs += [
+        (
+            "".join(rng.choice("0125") for _ in range(rng.randint(0, 10))),
+            "".join(rng.choice("0125") for _ in range(rng.randint(0, 10))),
+        )
+        for _ in range(2000)
+    ]
+    for a, b in pairs:
+        assert levenshtein_bitparallel(a, b) == levenshtein_distance(a, b)
+
+
+def test_pattern_reuse_and_max_distance_bound():
+    pattern = LevenshteinPattern("5551234")
+    for digits in itertools.islice(itertools.product("512", repeat=7), 500):
+        candidate = "".join(digits)
+        exact = levenshtein_distance("5551234", candidate)
+        assert pattern.distance(candidate) == exact
+        for bound in range(4):
+            assert pattern.distance(candidate, max_distance=bound) == min(exact, bound + 1)
+
+
+def test_trigram_bitsets_match_set_jaccard():
+    rng = random.Random(23)
+    values = [f"{rng.choice(['212', '415'])}{rng.randint(0, 9999999):07d}" for _ in range(300)]
+    values += ["4155555555", "4155551234"]
+    for a, b in zip(values, reversed(values)):
+        assert bitset_jaccard(trigram_bitset(a), trigram_bitset(b)) == trigram_jaccard(a, b)
+    for length in range(3, 11):
+        value = "".join(rng.choice("0123456789") for _ in range(length))
+        assert trigram_bitset(value) == sum(1 << int(trigram) for trigram in trigram_set(value))
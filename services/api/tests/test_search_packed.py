@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+from django.core.management import call_command
+
+from shared.core.models import Number
+from shared.core.packed import PackedIndexError, get_packed_index, open_packed_index, reset_packed_index
+from shared.core.search import rank_related_numbers
+from shared.core.snapshot import NumberSnapshot
+
+QUERIES = [("212", "5551234"), ("415", "1230000"), ("718", "5551234"), ("999", "7771234")]
+
+
+@pytest.mark.django_db
+def test_packed_index_matches_database_path(tmp_path):
+    rng = random.Random(5)
+    rows = {(rng.choice(["212", "415", "646"]), f"{rng.choice(['555', '123'])}{rng.randint(0, 9999):04d}") for _ in range(300)}
+    rows |= {("718", "5551234"), ("718", "0001234"), ("917", "7771234"), ("305", "0001234")}
+    Number.objects.bulk_create(
+        [Number(area_code=area, phone_number=local, cost=rng.choice([49, 99])) for area, local in sorted(rows)]
+    )
+    path = tmp_path / "numbers.bin"
+    call_command("build_number_index", output=str(path))
+
+    packed = open_packed_index(path)
+    assert len(packed) == len(rows)
+    assert packed.prefix_counts() == NumberSnapshot.build().prefix_counts()
+    for area_code, number in QUERIES:
+        assert packed.rank(area_code, number) == rank_related_numbers(Number.objects.all(), area_code, number)
+
+
+@pytest.mark.django_db
+def test_search_view_remaps_replaced_file(api_client, settings, tmp_path):
+    settings.SEARCH_BACKEND = "packed"
+    settings.SEARCH_PACKED_INDEX_PATH = str(tmp_path / "numbers.bin")
+    settings.SEARCH_PACKED_CHECK_INTERVAL = 0
+    reset_packed_index()
+    Number.objects.create(area_code="415", phone_number="5551235", cost=150)
+    call_command("build_number_index")
+
+    def search():
+        return [item["full_number"] for item in api_client.get("/v1/search", {"area_code": "415", "number": "5551234"}).json()["results"]]
+
+    assert search() == ["4155551235"]
+    Number.objects.create(area_code="415", phone_number="5551236", cost=150)
+    assert search() == ["4155551235"]
+    call_command("build_number_index")
+    assert search() == ["4155551236", "4155551235"]
+    reset_packed_index()
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / "numbers.bin"
+    path.write_bytes(b"not an index" * 10)
+    with pytest.raises(PackedIndexError):
+        open_packed_index(path)
+    with pytest.raises(PackedIndexError):
+        open_packed_index(tmp_path / "missing.bin")
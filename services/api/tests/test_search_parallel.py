@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from shared.core import parallel
+from shared.core.models import Number
+from shared.core.search import rank_related_numbers
+from shared.core.stats import refresh_area_code_stats
+
+
+@pytest.fixture
+def sharded(settings):
+    settings.SEARCH_PARALLEL_WORKERS = 2
+    settings.SEARCH_PARALLEL_THRESHOLD = 100
+    settings.SEARCH_PARALLEL_MIN_SHARD = 50
+    yield settings
+    parallel.shutdown_pool()
+
+
+def _seed_dense_area_code() -> set:
+    rng = random.Random(3)
+    locals_ = {f"{rng.choice(['555', '556'])}{rng.randint(0, 9999):04d}" for _ in range(600)}
+    Number.objects.bulk_create(
+        [Number(area_code="212", phone_number=local, cost=rng.choice([49, 99])) for local in sorted(locals_)]
+    )
+    refresh_area_code_stats(["212"])
+    return locals_
+
+
+@pytest.mark.django_db
+def test_sharded_ranking_matches_in_process(sharded, caplog, django_assert_max_num_queries):
+    locals_ = _seed_dense_area_code()
+    Number.objects.create(area_code="718", phone_number="0001234", cost=10)
+
+    for area_code, number in [("212", "5551234"), ("212", sorted(locals_)[7]), ("718", "5551234")]:
+        sharded.SEARCH_PARALLEL_WORKERS = 2
+        got = rank_related_numbers(Number.objects.all(), area_code, number)
+        sharded.SEARCH_PARALLEL_WORKERS = 0
+        assert got == rank_related_numbers(Number.objects.all(), area_code, number)
+    assert parallel._pool is not None
+    assert "Sharded search" not in caplog.text
+    # The area code size comes from its stats row, not a COUNT.
+    with django_assert_max_num_queries(2):
+        parallel.rank_sharded(Number.objects.all(), "212", "5551234")
+
+
+@pytest.mark.django_db
+def test_slow_shards_fall_back_to_in_process(sharded, caplog):
+    _seed_dense_area_code()
+    sharded.SEARCH_PARALLEL_TIMEOUT = 0
+
+    assert parallel.rank_sharded(Number.objects.all(), "212", "5551234") is None
+    assert "Sharded search timed out" in caplog.text
+
+
+@pytest.mark.django_db
+def test_small_area_codes_stay_in_process(sharded):
+    Number.objects.create(area_code="212", phone_number="5551235", cost=10)
+    assert parallel.rank_sharded(Number.objects.all(), "212", "5551234") is None
+    assert parallel._pool is None
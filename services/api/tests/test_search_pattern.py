@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import random
+import re
+
+import pytest
+
+from shared.core import patterns
+from shared.core.models import Number
+from shared.core.patterns import PatternIndex, invalidate_pattern_index, parse_pattern
+
+
+def _rows(count: int) -> list[tuple[str, str, int, float]]:
+    rng = random.Random(17)
+    rows = {(rng.choice(["212", "213", "415", "646"]), f"55{rng.randint(0, 99999):05d}") for _ in range(count)}
+    return [(area_code, local, rng.choice([49, 99]), 0.0) for area_code, local in rows]
+
+
+def _brute_force(rows, pattern: str) -> list[str]:
+    regex = re.compile(parse_pattern(pattern).replace("?", "."))
+    return sorted(f"{area_code}{local}" for area_code, local, _, _ in rows if regex.fullmatch(f"{area_code}{local}"))
+
+
+@pytest.mark.parametrize("pattern", ["212-55?-??00", "21?-???-???0", "??????????", "?1?5?????7", "999-???-????"])
+def test_pattern_index_matches_brute_force(monkeypatch, pattern):
+    # Small segments so matches span several of them.
+    monkeypatch.setattr(patterns, "SEGMENT_ROWS", 64)
+    rows = _rows(1500)
+    index = PatternIndex(rows)
+    expected = _brute_force(rows, pattern)
+
+    results, total = index.search(pattern, limit=len(rows))
+
+    assert total == len(expected)
+    assert [row["full_number"] for row in results] == expected
+
+
+def test_pattern_pages_partition_the_full_result(monkeypatch):
+    monkeypatch.setattr(patterns, "SEGMENT_ROWS", 64)
+    index = PatternIndex(_rows(1500))
+    full, total = index.search("2??-???-???0", limit=10_000)
+
+    pages = []
+    for offset in range(0, total, 9):
+        page, page_total = index.search("2??-???-???0", limit=9, offset=offset)
+        assert page_total == total
+        pages.extend(page)
+
+    assert pages == full
+    assert index.search("2??-???-???0", limit=9, offset=total) == ([], total)
+
+
+def test_fixed_prefix_limits_the_segments_searched(monkeypatch):
+    monkeypatch.setattr(patterns, "SEGMENT_ROWS", 64)
+    rows = _rows(1500)
+    index = PatternIndex(rows)
+    matched = []
+    match = patterns._Segment.match
+    monkeypatch.setattr(patterns._Segment, "match", lambda segment, fixed: matched.append(segment) or match(segment, fixed))
+
+    results, total = index.search("212-55?-??00", limit=len(rows))
+    assert [row["full_number"] for row in results] == _brute_force(rows, "212-55?-??00")
+    assert 0 < len(matched) <= len(index._segments) // 4 + 1
+
+    matched.clear()
+    index.search("?12-55?-??00")
+    assert len(matched) == len(index._segments)
+
+
+@pytest.mark.parametrize("pattern", ["212-55?-??0", "21a5551234", "212-555-12345"])
+def test_parse_pattern_rejects_malformed_masks(pattern):
+    with pytest.raises(ValueError):
+        parse_pattern(pattern)
+
+
+@pytest.mark.django_db
+def test_pattern_endpoint(api_client):
+    for area_code, local, cost in [
+        ("212", "5510000", 10),
+        ("212", "5591200", 20),
+        ("212", "5601200", 30),
+        ("415", "5510000", 40),
+    ]:
+        Number.objects.create(area_code=area_code, phone_number=local, cost=cost)
+
+    response = api_client.get("/v1/search/pattern", {"pattern": "212-55?-??00", "limit": 1, "offset": 1})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [{"area_code": "212", "phone_number": "5591200", "full_number": "2125591200", "cost": 20}],
+        "count": 2,
+        "limit": 1,
+        "offset": 1,
+    }
+
+
+@pytest.mark.django_db
+def test_pattern_index_follows_writes(api_client):
+    invalidate_pattern_index()
+    assert api_client.get("/v1/search/pattern", {"pattern": "?????????7"}).json()["count"] == 0
+
+    Number.objects.create(area_code="305", phone_number="5550007", cost=10)
+
+    assert api_client.get("/v1/search/pattern", {"pattern": "?????????7"}).json()["count"] == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{"pattern": "212-55?-??0"}, {"pattern": "2125551234", "limit": 0}, {}])
+def test_pattern_endpoint_validation(api_client, params):
+    assert api_client.get("/v1/search/pattern", params).status_code == 400
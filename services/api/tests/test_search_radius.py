@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from shared.core import patterns
+from shared.core.models import Number
+from shared.core.patterns import PatternIndex, invalidate_pattern_index
+from shared.core.search import (
+    LevenshteinPattern,
+    levenshtein_distance,
+    rank_within_distance,
+    ranking_key,
+    trigram_jaccard,
+)
+
+
+@pytest.fixture
+def inventory(db):
+    rng = random.Random(21)
+    rows = {(rng.choice(["212", "305", "415", "646"]), f"555{rng.randint(0, 9999):04d}") for _ in range(600)}
+    rows |= {("415", "5551234"), ("212", "5551234"), ("999", "5551239")}
+    Number.objects.bulk_create(
+        [Number(area_code=area_code, phone_number=local, cost=rng.choice([49, 99])) for area_code, local in rows]
+    )
+    invalidate_pattern_index()
+    yield
+    invalidate_pattern_index()
+
+
+def _brute_force(area_code: str, number: str, max_distance: int) -> list[tuple[str, str, int]]:
+    matches = []
+    for candidate in Number.objects.exclude(area_code=area_code, phone_number=number):
+        distance = levenshtein_distance(number, candidate.phone_number)
+        if distance <= max_distance:
+            similarity = trigram_jaccard(f"{area_code}{number}", candidate.full_number)
+            key = ranking_key(distance, similarity, candidate.cost, candidate.created_at.timestamp())
+            matches.append((key + (candidate.area_code, candidate.phone_number), candidate))
+    matches.sort(key=lambda item: item[0])
+    return [(number.area_code, number.phone_number, key[0]) for key, number in matches]
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2])
+def test_radius_matches_brute_force_across_area_codes(inventory, max_distance):
+    expected = _brute_force("415", "5551234", max_distance)
+
+    results, total = rank_within_distance("415", "5551234", max_distance, limit=len(expected) + 1)
+
+    assert total == len(expected)
+    assert [(row["area_code"], row["phone_number"], row["distance"]) for row in results] == expected
+    assert {row["area_code"] for row in results} - {"415"}
+
+
+@pytest.mark.parametrize("radius", [0, 1, 2, 3])
+def test_within_distance_filter_is_exact_and_prunes(monkeypatch, radius):
+    monkeypatch.setattr(patterns, "SEGMENT_ROWS", 256)
+    rng = random.Random(radius)
+    locals_ = {f"{rng.randint(0, 9999999):07d}" for _ in range(3000)}
+    # Neighbours of the query at every distance, including shifted digits.
+    locals_ |= {"5551234", "5551235", "5512345", "0555123", "5155123", "5541230", "4551324"}
+    rows = [(rng.choice(["212", "415"]), local, 49, 0.0) for local in locals_]
+    verified = []
+
+    class CountingPattern(LevenshteinPattern):
+        def distance(self, text):
+            verified.append(text)
+            return super().distance(text)
+
+    monkeypatch.setattr(patterns, "LevenshteinPattern", CountingPattern)
+    found = sorted((distance, row[1]) for distance, row in PatternIndex(rows).within_distance("5551234", radius))
+
+    expected = sorted(
+        (levenshtein_distance("5551234", local), local)
+        for local in locals_
+        if levenshtein_distance("5551234", local) <= radius
+    )
+    assert found == expected
+    assert len(verified) < len(locals_) // 10
+
+
+def test_radius_pages_partition_the_full_result(inventory):
+    full, total = rank_within_distance("415", "5551234", 2, limit=1000)
+
+    pages = []
+    for offset in range(0, total, 7):
+        page, page_total = rank_within_distance("415", "5551234", 2, limit=7, offset=offset)
+        assert page_total == total
+        pages.extend(page)
+
+    assert pages == full
+    assert rank_within_distance("415", "5551234", 2, limit=7, offset=total) == ([], total)
+
+
+def test_radius_endpoint(inventory, api_client):
+    response = api_client.get(
+        "/v1/search", {"area_code": "415", "number": "5551234", "max_distance": 1, "limit": 5, "offset": 2}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    expected = _brute_force("415", "5551234", 1)
+    assert data["count"] == len(expected)
+    assert (data["limit"], data["offset"]) == (5, 2)
+    assert [(row["area_code"], row["phone_number"], row["distance"]) for row in data["results"]] == expected[2:7]
+
+
+@pytest.mark.parametrize("params", [{"max_distance": 9}, {"max_distance": 1, "limit": 0}, {"max_distance": "x"}])
+def test_radius_endpoint_validation(inventory, api_client, params):
+    response = api_client.get("/v1/search", {"area_code": "415", "number": "5551234", **params})
+
+    assert response.status_code == 400
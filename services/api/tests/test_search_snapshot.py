@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import random
+import threading
+from datetime import timedelta
+
+import pytest
+from django.core.cache import caches
+
+from shared.core.models import Number, NumberTombstone
+from shared.core.search import rank_related_numbers
+from shared.core import snapshot as snapshot_module
+from shared.core.snapshot import NumberSnapshot, get_number_snapshot, reset_number_snapshot
+
+QUERIES = [("212", "5551234"), ("415", "1230000"), ("718", "5551234"), ("999", "7771234")]
+
+
+@pytest.mark.django_db
+def test_snapshot_ranking_matches_database_path():
+    rng = random.Random(11)
+    rows = {(rng.choice(["212", "415", "646"]), f"{rng.choice(['555', '123'])}{rng.randint(0, 9999):04d}") for _ in range(400)}
+    rows |= {("718", "5551234"), ("718", "0001234"), ("917", "7771234"), ("305", "0001234")}
+    Number.objects.bulk_create(
+        [Number(area_code=area, phone_number=local, cost=rng.choice([49, 99])) for area, local in sorted(rows)]
+    )
+
+    snapshot = NumberSnapshot.build()
+    assert len(snapshot) == len(rows)
+    for area_code, number in QUERIES:
+        expected = rank_related_numbers(Number.objects.all(), area_code, number, limit=10)
+        assert snapshot.rank(area_code, number, limit=10) == expected
+
+
+@pytest.mark.django_db
+def test_snapshot_refresh_applies_upserts_and_tombstones(settings):
+    # No overlap, so only area codes written after the build are re-read.
+    settings.SEARCH_SNAPSHOT_OVERLAP = 0
+    moved = Number.objects.create(area_code="415", phone_number="5551234", cost=10)
+    deleted = Number.objects.create(area_code="415", phone_number="5550000", cost=20)
+    Number.objects.create(area_code="212", phone_number="5551111", cost=30)
+    snapshot = NumberSnapshot.build()
+    untouched = snapshot.areas["212"]
+
+    moved = Number.objects.get(pk=moved.pk)
+    moved.area_code = "646"
+    moved.save()
+    Number.objects.get(pk=deleted.pk).delete()
+    Number.objects.create(area_code="305", phone_number="5552222", cost=40)
+    assert NumberTombstone.objects.count() == 2
+
+    refreshed = snapshot.refreshed()
+    assert refreshed.prefix_counts() == [("212", 1), ("305", 1), ("646", 1)]
+    assert refreshed.areas["212"] is untouched
+    assert snapshot.prefix_counts() == [("415", 2), ("212", 1)]
+    assert refreshed.refreshed().prefix_counts() == refreshed.prefix_counts()
+
+
+@pytest.mark.django_db
+def test_snapshot_refresh_of_idle_inventory_does_not_rebuild(settings, monkeypatch):
+    settings.SEARCH_TOMBSTONE_RETENTION = 3600
+    Number.objects.create(area_code="415", phone_number="5551234", cost=10)
+    # The data watermark is far older than the tombstone retention.
+    Number.objects.update(updated_at=snapshot_module._utcnow() - timedelta(days=3))
+    snapshot = NumberSnapshot.build()
+
+    builds = []
+    build = NumberSnapshot.build.__func__
+    monkeypatch.setattr(NumberSnapshot, "build", classmethod(lambda cls: builds.append(1) or build(cls)))
+    start = snapshot_module._utcnow()
+    for minutes in (10, 20, 30):
+        monkeypatch.setattr(snapshot_module, "_utcnow", lambda minutes=minutes: start + timedelta(minutes=minutes))
+        assert snapshot.refreshed() is snapshot
+    assert builds == []
+
+    # Only a gap between polls longer than the retention forces a rebuild.
+    monkeypatch.setattr(snapshot_module, "_utcnow", lambda: start + timedelta(hours=2))
+    assert snapshot.refreshed().prefix_counts() == [("415", 1)]
+    assert builds == [1]
+
+
+@pytest.mark.django_db
+def test_snapshot_refresh_ignores_rows_reread_by_the_overlap(settings):
+    settings.SEARCH_SNAPSHOT_OVERLAP = 60
+    Number.objects.create(area_code="415", phone_number="5551234", cost=10)
+    snapshot = NumberSnapshot.build()
+    assert snapshot.refreshed() is snapshot
+
+    Number.objects.create(area_code="415", phone_number="5551235", cost=10)
+    refreshed = snapshot.refreshed()
+    assert refreshed.prefix_counts() == [("415", 2)]
+    assert refreshed.refreshed() is refreshed
+
+
+@pytest.mark.django_db
+def test_prefixes_from_snapshot(api_client, settings):
+    Number.objects.create(area_code="415", phone_number="5551234", cost=10)
+    Number.objects.create(area_code="415", phone_number="5551235", cost=10)
+    Number.objects.create(area_code="212", phone_number="5551234", cost=10)
+    expected = api_client.get("/v1/prefixes", {"q": "4"}).json()
+
+    settings.PREFIXES_FROM_SNAPSHOT = True
+    reset_number_snapshot()
+    caches["default"].clear()
+    assert api_client.get("/v1/prefixes", {"q": "4"}).json() == expected
+    reset_number_snapshot()
+
+
+def test_snapshot_is_polled_off_the_request_path(settings, monkeypatch):
+    settings.SEARCH_INDEX_BACKGROUND = True
+    settings.SEARCH_SNAPSHOT_INTERVAL = 0
+    first, second = NumberSnapshot({}, None), NumberSnapshot({}, None)
+    monkeypatch.setattr(NumberSnapshot, "build", classmethod(lambda cls: first))
+    release = threading.Event()
+    monkeypatch.setattr(snapshot_module._holder, "_build", lambda snapshot: release.wait(5) and second)
+
+    assert get_number_snapshot() is first
+    # The poll is running and blocked; readers keep the current snapshot.
+    assert get_number_snapshot() is first
+    release.set()
+    snapshot_module._holder._thread.join(5)
+    assert get_number_snapshot() is second
+    snapshot_module._holder._thread.join(5)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+
+from api.phone_numbers.async_views import AsyncSearchView
+from shared.core import timing
+from shared.core.models import Number
+
+QUERY = {"area_code": "415", "number": "5551234"}
+
+
+@pytest.fixture
+def numbers(db):
+    for area_code, number in [("415", "5551234"), ("415", "5551235"), ("415", "5552234"), ("212", "5551234")]:
+        Number.objects.create(area_code=area_code, phone_number=number, cost=100)
+
+
+@pytest.fixture
+def explain_enabled(settings):
+    settings.SEARCH_EXPLAIN_ENABLED = True
+
+
+def _stages(response) -> list[str]:
+    return [entry.split(";")[0] for entry in response["Server-Timing"].split(", ")]
+
+
+def test_server_timing_reports_pipeline_stages_on_a_miss_only(api_client, numbers):
+    miss = api_client.get("/v1/search", QUERY)
+    assert _stages(miss) == ["query_area_code", "query_fallback", "score", "search", "serialize"]
+    assert all(float(entry.split("dur=")[1]) >= 0 for entry in miss["Server-Timing"].split(", "))
+
+    hit = api_client.get("/v1/search", QUERY)
+    assert _stages(hit) == ["search", "serialize"]
+    assert hit.json() == miss.json()
+    assert "explain" not in hit.json()
+
+
+def test_explain_bypasses_the_cache_and_lists_stages(api_client, numbers, explain_enabled):
+    expected = api_client.get("/v1/search", QUERY).json()["results"]
+
+    data = api_client.get("/v1/search", {**QUERY, "explain": "1"}).json()
+    assert data["results"] == expected
+    assert data["explain"]["backend"] == "python"
+    assert data["explain"]["candidates"] == {"area_code": 2, "fallback": 1}
+    assert set(data["explain"]["stages_ms"]) == {"query_area_code", "query_fallback", "score", "search", "serialize"}
+
+
+def test_explain_can_be_disabled(api_client, numbers, settings):
+    settings.SEARCH_EXPLAIN_ENABLED = False
+    assert "explain" not in api_client.get("/v1/search", {**QUERY, "explain": "1"}).json()
+
+
+def test_async_view_explains_the_same_candidates(numbers, explain_enabled):
+    request = RequestFactory().get("/v1/search", {**QUERY, "explain": "true"})
+    response = async_to_sync(AsyncSearchView.as_view())(request)
+    explain = json.loads(response.content)["explain"]
+    assert explain["candidates"] == {"area_code": 2, "fallback": 1}
+    assert _stages(response) == ["query_area_code", "query_fallback", "score", "search", "serialize"]
+
+
+def test_stages_are_recorded_in_histograms(api_client, numbers, explain_enabled):
+    api_client.get("/v1/search", {**QUERY, "explain": "1"})
+    body = api_client.get("/v1/metrics").content.decode()
+    assert 'search_stage_duration_seconds_count{stage="score"}' in body
+    assert 'search_candidates_bucket{le="10.0",source="area_code"}' in body
+
+
+def test_stages_outside_a_collection_are_free():
+    with timing.stage("search"):
+        timing.count("area_code", 3)
+    with timing.collect() as timings:
+        with timing.stage("search"):
+            pass
+        with timing.stage("search"):
+            timing.count("area_code", 3)
+    assert list(timings.stages) == ["search"]
+    assert timings.candidates == {"area_code": 3}
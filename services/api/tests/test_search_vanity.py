@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from shared.core.models import Number
+from shared.core.search import LevenshteinPattern, levenshtein_distance, ranking_key, trigram_jaccard
+from shared.core.vanity import VanityIndex, keypad_digits
+
+
+def _rows(count: int) -> list[tuple[str, str, int, float]]:
+    rng = random.Random(29)
+    rows = {(rng.choice(["212", "415", "646"]), f"{rng.randint(0, 9999999):07d}") for _ in range(count)}
+    # Plant exact and near vanity matches for FLOWERS (3569377) and CAT (228).
+    rows |= {("415", "3569377"), ("212", "3569376"), ("646", "1356937"), ("212", "5552280"), ("415", "2281234")}
+    return [(area_code, local, rng.choice([49, 99]), float(rng.randint(0, 10**6))) for area_code, local in rows]
+
+
+def _brute_force(rows, digits: str, max_distance: int, area_code=None) -> list[tuple[str, str, int]]:
+    matches = []
+    for row_area_code, local, cost, created_ts in rows:
+        if area_code is not None and row_area_code != area_code:
+            continue
+        distance = min(
+            levenshtein_distance(digits, local[start:end])
+            for start in range(len(local) + 1)
+            for end in range(start, len(local) + 1)
+        )
+        if distance <= max_distance:
+            key = ranking_key(distance, trigram_jaccard(digits, local), cost, created_ts)
+            matches.append((key + (row_area_code, local), distance))
+    matches.sort()
+    return [(key[4], key[5], distance) for key, distance in matches]
+
+
+def test_keypad_digits():
+    assert keypad_digits("FLOWERS") == "3569377"
+    assert keypad_digits("call4u") == "225548"
+    with pytest.raises(ValueError):
+        keypad_digits("NO-WAY")
+
+
+def test_substring_distance_matches_brute_force():
+    rng = random.Random(5)
+    for _ in range(300):
+        pattern = "".join(rng.choice("0123") for _ in range(rng.randint(1, 5)))
+        text = "".join(rng.choice("0123") for _ in range(7))
+        expected = min(
+            levenshtein_distance(pattern, text[start:end]) for start in range(8) for end in range(start, 8)
+        )
+        assert LevenshteinPattern(pattern).substring_distance(text) == expected
+
+
+def test_reversed_substring_match_finds_the_first_best_start():
+    rng = random.Random(7)
+    for _ in range(300):
+        pattern = "".join(rng.choice("0123") for _ in range(rng.randint(1, 5)))
+        text = "".join(rng.choice("0123") for _ in range(7))
+        distances = {
+            start: min(levenshtein_distance(pattern, text[start:end]) for end in range(start, 8)) for start in range(8)
+        }
+        best = min(distances.values())
+        distance, end = LevenshteinPattern(pattern[::-1]).substring_match(text[::-1])
+        assert distance == best
+        assert len(text) - end == min(start for start, value in distances.items() if value == best)
+
+
+@pytest.mark.parametrize("word, max_distance", [("FLOWERS", 0), ("FLOWERS", 1), ("CAT", 0), ("355555", 1)])
+def test_vanity_index_matches_brute_force(word, max_distance):
+    rows = _rows(3000)
+    index = VanityIndex(rows)
+
+    results, total = index.search(word, max_distance=max_distance, limit=len(rows))
+
+    expected = _brute_force(rows, keypad_digits(word), max_distance)
+    assert total == len(expected)
+    assert [(row["area_code"], row["phone_number"], row["distance"]) for row in results] == expected
+
+
+def test_vanity_index_filters_area_code_and_paginates():
+    rows = _rows(3000)
+    index = VanityIndex(rows)
+    expected = _brute_force(rows, "3569377", 1, area_code="212")
+
+    page, total = index.search("FLOWERS", max_distance=1, area_code="212", limit=1, offset=1)
+
+    assert total == len(expected)
+    assert [(row["area_code"], row["phone_number"], row["distance"]) for row in page] == expected[1:2]
+
+
+def test_vanity_index_rejects_unprunable_fuzziness():
+    with pytest.raises(ValueError):
+        VanityIndex(_rows(10)).search("CAT", max_distance=1)
+
+
+@pytest.mark.django_db
+def test_vanity_endpoint(api_client):
+    Number.objects.create(area_code="415", phone_number="3569377", cost=500)
+    Number.objects.create(area_code="415", phone_number="1356937", cost=100)
+    Number.objects.create(area_code="212", phone_number="3569377", cost=100)
+
+    response = api_client.get("/v1/search/vanity", {"word": "flowers", "area_code": "415", "max_distance": 1})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 2
+    assert [(row["full_number"], row["distance"], row["match_offset"]) for row in data["results"]] == [
+        ("4153569377", 0, 0),
+        ("4151356937", 1, 1),
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{"word": "CAT", "max_distance": 1}, {"word": "HI"}, {"word": "FLOWERS!"}, {}])
+def test_vanity_endpoint_validation(api_client, params):
+    assert api_client.get("/v1/search/vanity", params).status_code == 400
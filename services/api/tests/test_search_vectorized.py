@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from shared.core.models import Number
+from shared.core.search import levenshtein_distance, rank_related_numbers, trigram_jaccard
+
+np = pytest.importorskip("numpy")
+
+from shared.core import vectorized  # noqa: E402
+
+
+def test_batch_kernels_match_scalar_implementations():
+    rng = random.Random(11)
+    locals_ = [f"{rng.randint(0, 9999999):07d}" for _ in range(300)]
+    fulls = [f"{rng.choice(['212', '415', '555'])}{local}" for local in locals_]
+
+    distances = vectorized.batch_levenshtein("5551234", vectorized.encode_digits(locals_))
+    assert distances.tolist() == [levenshtein_distance("5551234", value) for value in locals_]
+
+    similarity = vectorized.batch_trigram_jaccard("4155551234", vectorized.encode_digits(fulls))
+    assert similarity.tolist() == [trigram_jaccard("4155551234", value) for value in fulls]
+
+
+@pytest.mark.django_db
+def test_vectorized_ranking_matches_python_ranking(settings):
+    rng = random.Random(5)
+    rows = {(rng.choice(["212", "415"]), f"{rng.randint(0, 9999999):07d}") for _ in range(600)}
+    Number.objects.bulk_create(
+        [Number(area_code=area, phone_number=local, cost=rng.choice([49, 99])) for area, local in rows]
+    )
+
+    settings.SEARCH_VECTORIZE_THRESHOLD = 10**9
+    expected = rank_related_numbers(Number.objects.all(), "415", "5551234", limit=10)
+    settings.SEARCH_VECTORIZE_THRESHOLD = 1
+    assert rank_related_numbers(Number.objects.all(), "415", "5551234", limit=10) == expected
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+
+from api.phone_numbers.throttles import CachePublicRateThrottle, PublicRateThrottle
+from shared.core.ratelimit import SlidingWindowStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SlidingWindowStore(str(tmp_path / "throttle.sqlite3"))
+
+
+def _allowed(store, key, count, now, limit=10, duration=60):
+    return sum(store.hit(key, limit, duration, now=now).allowed for _ in range(count))
+
+
+def test_sliding_window_weights_the_previous_window(store):
+    assert _allowed(store, "a", 15, now=600) == 10
+    denied = store.hit("a", 10, 60, now=610)
+    assert not denied.allowed
+    # A full window admits requests again as soon as it becomes the previous one.
+    assert denied.wait == pytest.approx(50)
+
+    # Halfway through the next window the previous ten count as five.
+    assert _allowed(store, "a", 10, now=690) == 5
+    assert _allowed(store, "b", 15, now=690) == 10
+    # Two windows later nothing is left.
+    assert _allowed(store, "a", 15, now=780) == 10
+
+
+def test_wait_is_when_the_next_request_passes(store):
+    _allowed(store, "a", 10, now=630)
+    _allowed(store, "a", 5, now=672)
+    denied = store.hit("a", 10, 60, now=672)
+    assert not denied.allowed
+    assert not store.hit("a", 10, 60, now=672 + denied.wait - 0.5).allowed
+    assert store.hit("a", 10, 60, now=672 + denied.wait + 0.01).allowed
+
+
+def _worker(path, count, results):
+    store = SlidingWindowStore(path)
+    results.put(sum(store.hit("shared", 100, 3600).allowed for _ in range(count)))
+
+
+def test_counts_are_consistent_across_processes(store):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_worker, args=(store.path, 60, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sum(results.get() for _ in workers) == 100
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("throttle_class", [PublicRateThrottle, CachePublicRateThrottle])
+def test_public_endpoints_are_throttled(api_client, monkeypatch, settings, throttle_class):
+    monkeypatch.setitem(PublicRateThrottle.THROTTLE_RATES, "public", "2/min")
+    monkeypatch.setattr("api.phone_numbers.views.SearchView.throttle_classes", [throttle_class])
+    params = {"area_code": "415", "number": "5551234"}
+
+    assert [api_client.get("/v1/search", params).status_code for _ in range(3)] == [200, 200, 429]
+    assert int(api_client.get("/v1/search", params)["Retry-After"]) > 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("throttle_class", [PublicRateThrottle, CachePublicRateThrottle])
+def test_batch_search_has_its_own_rate(api_client, monkeypatch, throttle_class):
+    monkeypatch.setitem(PublicRateThrottle.THROTTLE_RATES, "public", "2/min")
+    monkeypatch.setitem(PublicRateThrottle.THROTTLE_RATES, "search_batch", "1/min")
+    monkeypatch.setattr("api.phone_numbers.views.SearchBatchView.throttle_classes", [throttle_class])
+    monkeypatch.setattr("api.phone_numbers.views.SearchView.throttle_classes", [throttle_class])
+    body = {"queries": [{"area_code": "415", "number": f"555123{digit}"} for digit in range(5)]}
+
+    batches = [api_client.post("/v1/search/batch", body, format="json").status_code for _ in range(2)]
+    assert batches == [200, 429]
+    # Batches do not use up the single-search allowance.
+    assert api_client.get("/v1/search", {"area_code": "415", "number": "5551234"}).status_code == 200
+
+
+def test_async_checks_hit_the_store_off_the_event_loop(store, monkeypatch):
+    hit_on = []
+    hit = store.hit
+    monkeypatch.setattr(store, "hit", lambda *args: hit_on.append(threading.get_ident()) or hit(*args))
+    monkeypatch.setattr("api.phone_numbers.throttles.get_throttle_store", lambda: store)
+    request = RequestFactory().get("/v1/search")
+
+    async def check():
+        return threading.get_ident(), await PublicRateThrottle().aallow_request(request, view=None)
+
+    loop_thread, allowed = async_to_sync(check)()
+    assert allowed
+    assert hit_on and loop_thread not in hit_on
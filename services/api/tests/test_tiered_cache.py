@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from shared.core.tiered_cache import TieredCache
+
+
+def _cache(location, **options) -> TieredCache:
+    l2 = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": str(location)}
+    return TieredCache("", {"OPTIONS": {"L2": l2, **options}})
+
+
+@pytest.fixture
+def location(tmp_path):
+    return tmp_path
+
+
+def test_reads_are_served_from_l1(location):
+    cache = _cache(location)
+    cache.set("key", {"a": 1})
+
+    assert cache.get("key") == {"a": 1}
+    assert cache.get("key") == {"a": 1}
+    assert async_to_sync(cache.aget)("key") == {"a": 1}
+
+    stats = cache.stats.snapshot()
+    assert (stats["l1_hits"], stats["l1_misses"], stats["l2_hits"]) == (2, 1, 1)
+    assert stats["l1_hit_ratio"] == pytest.approx(2 / 3)
+
+
+def test_writes_from_another_worker_invalidate_l1(location):
+    reader, writer = _cache(location), _cache(location)
+    writer.set("key", "old")
+    assert reader.get("key") == "old"
+    assert reader.get("missing") is None
+
+    writer.set("key", "new")
+    assert writer.add("missing", "added")
+    assert reader.get_many(["key", "missing"]) == {"key": "new", "missing": "added"}
+
+    writer.delete("key")
+    assert reader.get("key", "gone") == "gone"
+    writer.set("key", "back")
+    writer.clear()
+    assert reader.get("key") is None
+
+
+def test_cached_values_are_copies(location):
+    cache = _cache(location)
+    cache.set("history", [1])
+    cache.get("history").append(2)
+    assert cache.get("history") == [1]
+
+
+def test_l1_is_bounded_and_expires(location):
+    cache = _cache(location, L1_MAX_ENTRIES=2)
+    cache.set_many({"a": 1, "b": 2, "c": 3})
+    for key in ("a", "b", "c", "a"):
+        cache.get(key)
+    assert cache.stats.snapshot()["l1_hits"] == 0
+    assert len(cache._l1) == 2
+
+    expiring = _cache(location, L1_TIMEOUT=0)
+    expiring.get("a")
+    expiring.get("a")
+    assert expiring.stats.snapshot()["l1_hits"] == 0
+
+
+@pytest.mark.django_db
+def test_metrics_report_tier_hit_ratios(api_client):
+    api_client.get("/v1/prefixes")
+    api_client.get("/v1/prefixes")
+    body = api_client.get("/v1/metrics").content.decode()
+    assert 'cache_tier_hit_ratio{cache="default",tier="l1"}' in body
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Number
+from .models import AreaCodeStats, Number
 
 
 @admin.register(Number)
@@ -10,3 +10,20 @@ class NumberAdmin(admin.ModelAdmin):
     list_filter = ("area_code",)
     ordering = ("area_code", "phone_number")
     readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(AreaCodeStats)
+class AreaCodeStatsAdmin(admin.ModelAdmin):
+    list_display = ("area_code", "count", "min_cost", "avg_cost", "max_cost", "updated_at")
+    search_fields = ("area_code",)
+    ordering = ("-count", "area_code")
+
+    # Maintained from the number inventory; see ``manage.py reconcile_area_code_stats``.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
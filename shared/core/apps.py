@@ -7,5 +7,6 @@ class CoreConfig(AppConfig):
     verbose_name = "Shared Core"
 
     def ready(self) -> None:
-        # Import signal modules or other setup hooks if needed later.
+        from . import signals  # noqa: F401
+
         return super().ready()
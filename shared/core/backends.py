@@ -0,0 +1,321 @@
+"""Pluggable engines for ranking related numbers.
+
+``SEARCH_BACKEND`` selects the engine used by the public search endpoint.
+It is either a registered name (``"python"``, ``"index"``, ``"snapshot"``,
+``"packed"``, ``"postgres"``, ``"sqlite"``) or a dotted path to a :class:`SearchBackend`
+subclass.  Every backend returns the same payloads, in the same order, as
+:func:`shared.core.search.rank_related_numbers`.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import F, FloatField, Func, IntegerField, QuerySet, Value
+from django.db.models.functions import Concat
+from django.utils.module_loading import import_string
+
+from .models import Number
+from .search import (
+    CANDIDATE_FIELDS,
+    arank_related_numbers,
+    rank_related_numbers,
+    rank_related_numbers_batch,
+    ranking_key,
+    result_payload,
+)
+
+DEFAULT_BACKEND = "python"
+
+
+class SearchBackend:
+    """Base class for related-number ranking engines."""
+
+    name = ""
+    # Whether results may be stored in the versioned search cache.  Backends
+    # answering from periodically refreshed in-memory state must opt out:
+    # they can lag behind a version bump and would cache stale results under
+    # the new version.
+    cacheable = True
+
+    def rank(
+        self,
+        queryset: QuerySet[Number],
+        query_area_code: str,
+        query_phone_number: str,
+        limit: int = 10,
+    ) -> List[dict]:
+        raise NotImplementedError
+
+    def rank_many(
+        self,
+        queryset: QuerySet[Number],
+        queries: Sequence[Tuple[str, str]],
+        limit: int = 10,
+    ) -> List[List[dict]]:
+        """Rank several ``(area_code, phone_number)`` queries, in input order."""
+
+        return [self.rank(queryset, area_code, number, limit=limit) for area_code, number in queries]
+
+    async def arank(
+        self,
+        queryset: QuerySet[Number],
+        query_area_code: str,
+        query_phone_number: str,
+        limit: int = 10,
+    ) -> List[dict]:
+        """Async :meth:`rank`; runs the sync implementation in a worker thread by default."""
+
+        return await sync_to_async(self.rank)(queryset, query_area_code, query_phone_number, limit=limit)
+
+
+_registry: Dict[str, Type[SearchBackend]] = {}
+_instances: Dict[str, SearchBackend] = {}
+
+
+def register_backend(name: str) -> Callable[[Type[SearchBackend]], Type[SearchBackend]]:
+    """Class decorator registering a backend under ``name``."""
+
+    def decorator(cls: Type[SearchBackend]) -> Type[SearchBackend]:
+        cls.name = name
+        _registry[name] = cls
+        _instances.pop(name, None)
+        return cls
+
+    return decorator
+
+
+def get_backend(name: Optional[str] = None) -> SearchBackend:
+    """Return the (cached) backend instance for ``name`` or ``SEARCH_BACKEND``."""
+
+    name = name or getattr(settings, "SEARCH_BACKEND", DEFAULT_BACKEND)
+    backend = _instances.get(name)
+    if backend is not None:
+        return backend
+    cls = _registry.get(name)
+    if cls is None:
+        try:
+            cls = import_string(name)
+        except ImportError as exc:
+            raise ImproperlyConfigured(f"Unknown search backend '{name}'.") from exc
+    backend = _instances[name] = cls()
+    return backend
+
+
+def available_backends() -> List[str]:
+    return sorted(_registry)
+
+
+@register_backend("python")
+class PythonSearchBackend(SearchBackend):
+    """Stream candidates from the database and score them in-process."""
+
+    def rank(self, queryset, query_area_code, query_phone_number, limit=10):
+        return rank_related_numbers(queryset, query_area_code, query_phone_number, limit=limit)
+
+    def rank_many(self, queryset, queries, limit=10):
+        return rank_related_numbers_batch(queryset, queries, limit=limit)
+
+    async def arank(self, queryset, query_area_code, query_phone_number, limit=10):
+        if getattr(settings, "SEARCH_PARALLEL_WORKERS", 0) > 0:
+            # The process pool is driven from a thread.
+            return await super().arank(queryset, query_area_code, query_phone_number, limit=limit)
+        return await arank_related_numbers(queryset, query_area_code, query_phone_number, limit=limit)
+
+
+@register_backend("index")
+class IndexSearchBackend(SearchBackend):
+    """Answer from the in-memory BK-tree index over the whole inventory.
+
+    The index covers every ``Number`` row, so queryset filters are ignored.
+    """
+
+    cacheable = False
+
+    def rank(self, queryset, query_area_code, query_phone_number, limit=10):
+        from .index import get_number_index
+
+        return get_number_index().rank(query_area_code, query_phone_number, limit=limit)
+
+
+@register_backend("snapshot")
+class SnapshotSearchBackend(SearchBackend):
+    """Answer from the incrementally refreshed in-process column snapshot.
+
+    The snapshot covers every ``Number`` row, so queryset filters are ignored.
+    """
+
+    cacheable = False
+
+    def rank(self, queryset, query_area_code, query_phone_number, limit=10):
+        from .snapshot import get_number_snapshot
+
+        return get_number_snapshot().rank(query_area_code, query_phone_number, limit=limit)
+
+
+@register_backend("packed")
+class PackedSearchBackend(SearchBackend):
+    """Answer from the memory-mapped file written by ``build_number_index``.
+
+    Every worker maps the same file, so the index is held once in the page
+    cache.  It reflects the inventory as of the last build, and queryset
+    filters are ignored.
+    """
+
+    cacheable = False
+
+    def rank(self, queryset, query_area_code, query_phone_number, limit=10):
+        from .packed import get_packed_index
+
+        return get_packed_index().rank(query_area_code, query_phone_number, limit=limit)
+
+
+class Levenshtein(Func):
+    """``fuzzystrmatch.levenshtein`` (unit costs, same as ``levenshtein_distance``)."""
+
+    function = "levenshtein"
+    output_field = IntegerField()
+
+
+class TrigramJaccard(Func):
+    """Digit-trigram Jaccard similarity.
+
+    Installed by migration ``0002`` on PostgreSQL and registered on every
+    SQLite connection by :mod:`shared.core.signals`.  ``pg_trgm.similarity``
+    pads words with blanks, which yields different scores, so ranking uses
+    this function to stay identical to :func:`shared.core.search.trigram_jaccard`.
+    """
+
+    function = "core_trigram_jaccard"
+    output_field = FloatField()
+
+
+@register_backend("postgres")
+class PostgresSearchBackend(SearchBackend):
+    """Score and order candidates inside PostgreSQL.
+
+    Requires the ``fuzzystrmatch`` and ``pg_trgm`` extensions created by
+    migration ``0002``.  Scoring and ``ORDER BY ... LIMIT`` run in SQL, so only
+    ``limit`` rows are returned.  The last-four fallback uses the trigram GIN
+    index on ``phone_number`` for its ``LIKE '%1234'`` filter.
+    """
+
+    fields = ("area_code", "phone_number", "cost", "created_at", "distance", "similarity")
+
+    def _scored(self, queryset, query_area_code, query_phone_number):
+        return queryset.annotate(
+            distance=Levenshtein(F("phone_number"), Value(query_phone_number)),
+            similarity=TrigramJaccard(
+                Concat(F("area_code"), F("phone_number")), Value(f"{query_area_code}{query_phone_number}")
+            ),
+        )
+
+    def rank(self, queryset, query_area_code, query_phone_number, limit=10):
+        if limit <= 0:
+            return []
+        primary = list(
+            self._scored(
+                queryset.with_area_code(query_area_code).exclude(
+                    area_code=query_area_code, phone_number=query_phone_number
+                ),
+                query_area_code,
+                query_phone_number,
+            )
+            .order_by("distance", "-similarity", "cost", "-created_at", "area_code", "phone_number")
+            .values_list(*self.fields)[:limit]
+        )
+        rows = primary
+        if len(primary) < limit:
+            # The whole area code fits in ``primary``; add the last-four
+            # fallback exactly as the Python backend does and rank in-process.
+            extra = (
+                self._scored(
+                    queryset.exclude(area_code=query_area_code).with_last_four(query_phone_number[-4:]),
+                    query_area_code,
+                    query_phone_number,
+                )
+                .order_by("area_code", "phone_number")
+                .values_list(*self.fields)[: limit * 5 - len(primary)]
+            )
+            rows = sorted(
+                primary + list(extra),
+                key=lambda row: ranking_key(row[4], row[5], row[2], row[3].timestamp()),
+            )
+        return [
+            result_payload(area_code, phone_number, cost, distance, similarity)
+            for area_code, phone_number, cost, _, distance, similarity in rows[:limit]
+        ]
+
+
+@register_backend("sqlite")
+class SQLiteSearchBackend(SearchBackend):
+    """Filter, score, order and limit candidates in a single SQLite statement.
+
+    ``levenshtein`` and ``core_trigram_jaccard`` are registered as
+    deterministic SQL functions on every SQLite connection, so no model
+    instances or Python-side candidate lists are built.  The trailing ``tier``,
+    ``area_code`` and ``phone_number`` sort keys reproduce the arrival order
+    the Python backend uses to break exact ties.
+    """
+
+    sql = """
+        WITH base AS ({base}),
+        primary_rows AS (
+            SELECT area_code, phone_number, cost, created_at, 0 AS tier
+            FROM base WHERE area_code = %s AND phone_number <> %s
+        ),
+        primary_count AS (SELECT count(*) AS n FROM primary_rows),
+        extra_rows AS (
+            SELECT area_code, phone_number, cost, created_at, 1 AS tier
+            FROM base
+            WHERE area_code <> %s AND phone_number LIKE %s AND (SELECT n FROM primary_count) < %s
+            ORDER BY area_code, phone_number
+            LIMIT max(%s * 5 - (SELECT n FROM primary_count), 0)
+        ),
+        candidates AS (SELECT * FROM primary_rows UNION ALL SELECT * FROM extra_rows)
+        SELECT area_code, phone_number, cost,
+               levenshtein(%s, phone_number) AS distance,
+               core_trigram_jaccard(%s, area_code || phone_number) AS similarity
+        FROM candidates
+        ORDER BY distance, similarity DESC, cost, created_at DESC, tier, area_code, phone_number
+        LIMIT %s
+    """
+
+    def rank(self, queryset, query_area_code, query_phone_number, limit=10):
+        if limit <= 0:
+            return []
+        base_sql, base_params = queryset.order_by().values_list(*CANDIDATE_FIELDS).query.sql_with_params()
+        params = (
+            *base_params,
+            query_area_code,
+            query_phone_number,
+            query_area_code,
+            f"%{query_phone_number[-4:]}",
+            limit,
+            limit,
+            query_phone_number,
+            f"{query_area_code}{query_phone_number}",
+            limit,
+        )
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(self.sql.format(base=base_sql), params)
+            rows = cursor.fetchall()
+        return [result_payload(*row) for row in rows]
+
+
+__all__ = [
+    "SearchBackend",
+    "PythonSearchBackend",
+    "IndexSearchBackend",
+    "PostgresSearchBackend",
+    "SQLiteSearchBackend",
+    "SnapshotSearchBackend",
+    "PackedSearchBackend",
+    "available_backends",
+    "get_backend",
+    "register_backend",
+]
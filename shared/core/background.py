@@ -0,0 +1,169 @@
+"""Process-wide search indexes, rebuilt and swapped off the request path.
+
+The in-memory search structures are derived from the whole inventory, and
+rebuilding one takes seconds on a large table.  :class:`BackgroundIndex`
+holds one of them:
+
+* the first read builds it, or waits for the warm-up build already running
+  (see :func:`warm_indexes`);
+* once it is ``SEARCH_INDEX_TTL`` seconds old, or a write invalidated it,
+  readers keep getting the current value while a single background thread
+  rebuilds it and publishes the new one with a reference swap;
+* every build starts from a freshly polled
+  :class:`~shared.core.snapshot.NumberSnapshot` rather than a table scan, and
+  is skipped when the poll found no change.
+
+The snapshot itself is kept by a holder of the same kind, which polls the
+database every ``SEARCH_SNAPSHOT_INTERVAL`` seconds.
+
+With ``SEARCH_INDEX_BACKGROUND`` off, stale values are rebuilt inline by the
+reading thread instead.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Generic, Iterable, Optional, TypeVar
+
+from django.conf import settings
+from django.db import connections
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .snapshot import NumberSnapshot
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Seconds before a failed background rebuild for a pending invalidation is retried.
+RETRY_DELAY = 5.0
+
+_holders: Dict[str, "BackgroundIndex"] = {}
+
+
+class BackgroundIndex(Generic[T]):
+    """Holder for one index built by ``build`` from the inventory snapshot."""
+
+    def __init__(self, name: str, build: Callable[["NumberSnapshot"], T]) -> None:
+        self.name = name
+        self._build = build
+        self._value: Optional[T] = None
+        self._source: Optional["NumberSnapshot"] = None
+        self._checked_at = 0.0
+        self._retry_at = 0.0
+        # Invalidations requested, and how many of them the current value covers.
+        self._invalidations = 0
+        self._covered = 0
+        self._build_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        _holders[name] = self
+
+    def get(self) -> T:
+        """Return the current value, building it only if there is none yet."""
+
+        value = self._value
+        if value is None:
+            with self._build_lock:
+                if self._value is None:
+                    self._refresh()
+                return self._value
+        now = time.monotonic()
+        if (self._invalidations != self._covered and now >= self._retry_at) or now - self._checked_at >= self.ttl():
+            if getattr(settings, "SEARCH_INDEX_BACKGROUND", True):
+                self.start()
+            else:
+                return self.refresh()
+        return value
+
+    def ttl(self) -> float:
+        """Seconds after which the value is checked for changes again."""
+
+        return getattr(settings, "SEARCH_INDEX_TTL", 60)
+
+    def refresh(self) -> T:
+        """Rebuild now, waiting for a rebuild already in progress, and return the value."""
+
+        with self._build_lock:
+            self._refresh()
+            return self._value
+
+    def start(self) -> None:
+        """Rebuild in a background thread unless one is already running."""
+
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-index", daemon=True)
+            self._thread.start()
+
+    def invalidate(self) -> None:
+        """Mark the value stale so the next read starts a rebuild.
+
+        The mark stays until a rebuild started after it succeeds; a failed
+        background rebuild is retried ``RETRY_DELAY`` seconds later.  A
+        rebuild that polls before the writing transaction commits misses
+        the write; it is picked up by the next poll, ``SEARCH_INDEX_TTL``
+        seconds later at the latest.
+        """
+
+        self._invalidations += 1
+
+    def reset(self) -> None:
+        """Drop the value so the next read builds it from scratch."""
+
+        self._value = None
+        self._source = None
+
+    def _refresh(self) -> None:
+        invalidations = self._invalidations
+        started = time.perf_counter()
+        value = self._rebuilt()
+        if value is not self._value:
+            self._value = value
+            logger.debug("Built the %s index in %.2fs", self.name, time.perf_counter() - started)
+        self._covered = invalidations
+        self._checked_at = time.monotonic()
+
+    def _rebuilt(self) -> T:
+        """Return the next value, or the current one when the snapshot has not changed."""
+
+        from .snapshot import refresh_number_snapshot
+
+        snapshot = refresh_number_snapshot()
+        if self._value is not None and snapshot is self._source:
+            return self._value
+        value = self._build(snapshot)
+        self._source = snapshot
+        return value
+
+    def _run(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Rebuilding the %s index failed; keeping the previous one", self.name)
+            self._checked_at = time.monotonic()
+            self._retry_at = self._checked_at + RETRY_DELAY
+        finally:
+            # The thread's database connection is never reused.
+            connections.close_all()
+
+
+def warm_indexes(names: Optional[Iterable[str]] = None) -> None:
+    """Start building the named indexes (default ``SEARCH_WARM_INDEXES``) in the background."""
+
+    # Importing the modules registers their holders.
+    from . import index, patterns, snapshot, vanity  # noqa: F401
+
+    for name in getattr(settings, "SEARCH_WARM_INDEXES", ()) if names is None else names:
+        _holders[name].start()
+
+
+def reset_indexes() -> None:
+    for holder in _holders.values():
+        holder.reset()
+
+
+__all__ = ["BackgroundIndex", "reset_indexes", "warm_indexes"]
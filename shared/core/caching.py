@@ -0,0 +1,219 @@
+"""Stampede-safe read-through caching.
+
+:func:`get_or_refresh` wraps ``cache.get`` / compute / ``cache.set`` so that
+an expiring entry does not make every concurrent request recompute it:
+
+* values are stored in a :class:`CacheEntry` envelope, so an empty result
+  is a hit like any other instead of a miss;
+* an entry is fresh for ``timeout`` seconds and only when its ``version``
+  matches the caller's, but is kept ``stale_timeout`` seconds longer.  A
+  request that finds it stale takes a lock with ``cache.add`` and refreshes
+  it while every other request, in any worker, keeps getting the stale
+  value;
+* with nothing to serve, identical computations in one worker are
+  coalesced (single flight) and other workers wait for the lock holder's
+  result instead of starting their own.
+
+:func:`aget_or_refresh` is the same for async views, coalescing within the
+event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+# Lock holders that die are replaced after this long.
+LOCK_TIMEOUT = 10
+_POLL_INTERVAL = 0.02
+_MAX_POLL_INTERVAL = 0.2
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    value: Any
+    version: str
+    fresh_until: float
+
+    def is_fresh(self, version: str) -> bool:
+        return self.version == version and time.time() < self.fresh_until
+
+
+class Fetched(NamedTuple):
+    """A value read through the cache, with the version it was computed at.
+
+    ``status`` is ``"hit"``, ``"stale"`` (served while another request
+    refreshes it), ``"coalesced"`` (computed by a concurrent request) or
+    ``"miss"`` (computed by this call).
+    """
+
+    value: Any
+    version: str
+    status: str
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[Fetched] = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[Tuple[int, str], _Flight] = {}
+_flights_lock = threading.Lock()
+_aflights: Dict[Tuple[int, int, str], "asyncio.Future[Fetched]"] = {}
+
+
+def _entry(cache, key: str) -> Optional[CacheEntry]:
+    entry = cache.get(key)
+    return entry if isinstance(entry, CacheEntry) else None
+
+
+def _store(cache, key: str, value: Any, version: str, timeout: float, stale_timeout: Optional[float]) -> CacheEntry:
+    entry = CacheEntry(value=value, version=version, fresh_until=time.time() + timeout)
+    cache.set(key, entry, timeout=timeout + (timeout if stale_timeout is None else stale_timeout))
+    return entry
+
+
+def get_or_refresh(
+    cache,
+    key: str,
+    compute: Callable[[], Any],
+    timeout: float,
+    version: str = "",
+    stale_timeout: Optional[float] = None,
+) -> Fetched:
+    """Return the cached value for ``key``, computing it at most once across concurrent callers.
+
+    ``version`` identifies the data the value is derived from; an entry
+    computed at another version is served only as stale.  ``stale_timeout``
+    (default: ``timeout``) is how long an expired entry may still be served.
+    """
+
+    entry = _entry(cache, key)
+    if entry is not None and entry.is_fresh(version):
+        return Fetched(entry.value, entry.version, "hit")
+
+    flight_key = (id(cache), key)
+    with _flights_lock:
+        flight = _flights.get(flight_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[flight_key] = _Flight()
+    if not leader:
+        if entry is not None:
+            return Fetched(entry.value, entry.version, "stale")
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result._replace(status="coalesced")
+
+    try:
+        flight.result = _refresh(cache, key, compute, timeout, version, stale_timeout, entry)
+        return flight.result
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[flight_key]
+        flight.done.set()
+
+
+def _refresh(cache, key, compute, timeout, version, stale_timeout, entry: Optional[CacheEntry]) -> Fetched:
+    lock_key, token = f"{key}:lock", uuid.uuid4().hex
+    locked = cache.add(lock_key, token, timeout=LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return Fetched(entry.value, entry.version, "stale")
+        # Another worker is computing it: wait for its result rather than duplicating the work.
+        interval, deadline = _POLL_INTERVAL, time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            interval = min(interval * 2, _MAX_POLL_INTERVAL)
+            waited = _entry(cache, key)
+            if waited is not None and waited.is_fresh(version):
+                return Fetched(waited.value, waited.version, "coalesced")
+    try:
+        return Fetched(_store(cache, key, compute(), version, timeout, stale_timeout).value, version, "miss")
+    finally:
+        if locked and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+async def _aentry(cache, key: str) -> Optional[CacheEntry]:
+    entry = await cache.aget(key)
+    return entry if isinstance(entry, CacheEntry) else None
+
+
+async def _astore(cache, key, value, version, timeout, stale_timeout) -> CacheEntry:
+    entry = CacheEntry(value=value, version=version, fresh_until=time.time() + timeout)
+    await cache.aset(key, entry, timeout=timeout + (timeout if stale_timeout is None else stale_timeout))
+    return entry
+
+
+async def aget_or_refresh(
+    cache,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    timeout: float,
+    version: str = "",
+    stale_timeout: Optional[float] = None,
+) -> Fetched:
+    """Async :func:`get_or_refresh`; ``compute`` is a coroutine function."""
+
+    entry = await _aentry(cache, key)
+    if entry is not None and entry.is_fresh(version):
+        return Fetched(entry.value, entry.version, "hit")
+
+    flight_key = (id(asyncio.get_running_loop()), id(cache), key)
+    flight = _aflights.get(flight_key)
+    if flight is not None:
+        if entry is not None:
+            return Fetched(entry.value, entry.version, "stale")
+        return (await asyncio.shield(flight))._replace(status="coalesced")
+
+    flight = _aflights[flight_key] = asyncio.get_running_loop().create_future()
+    try:
+        result = await _arefresh(cache, key, compute, timeout, version, stale_timeout, entry)
+    except asyncio.CancelledError:
+        flight.cancel()
+        raise
+    except BaseException as exc:
+        flight.set_exception(exc)
+        # Nobody may be waiting; don't let asyncio report the exception as unretrieved.
+        flight.exception()
+        raise
+    else:
+        flight.set_result(result)
+        return result
+    finally:
+        del _aflights[flight_key]
+
+
+async def _arefresh(cache, key, compute, timeout, version, stale_timeout, entry: Optional[CacheEntry]) -> Fetched:
+    lock_key, token = f"{key}:lock", uuid.uuid4().hex
+    locked = await cache.aadd(lock_key, token, timeout=LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return Fetched(entry.value, entry.version, "stale")
+        interval, deadline = _POLL_INTERVAL, time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, _MAX_POLL_INTERVAL)
+            waited = await _aentry(cache, key)
+            if waited is not None and waited.is_fresh(version):
+                return Fetched(waited.value, waited.version, "coalesced")
+    try:
+        value = await compute()
+        return Fetched((await _astore(cache, key, value, version, timeout, stale_timeout)).value, version, "miss")
+    finally:
+        if locked and await cache.aget(lock_key) == token:
+            await cache.adelete(lock_key)
+
+
+__all__ = ["CacheEntry", "Fetched", "LOCK_TIMEOUT", "aget_or_refresh", "get_or_refresh"]
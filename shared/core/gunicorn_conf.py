@@ -0,0 +1,35 @@
+"""Gunicorn hooks for Prometheus multiprocess mode and index warm-up.
+
+Load with ``gunicorn -c python:shared.core.gunicorn_conf ...``.  Metric files
+left by a previous run are removed at startup, and the live-only gauges of
+a worker that exits are dropped, so in-flight counts do not stick.  Each
+worker starts building the indexes listed in ``SEARCH_WARM_INDEXES`` as soon
+as it has loaded the application.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+
+
+def on_starting(server) -> None:
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+
+
+def child_exit(server, worker) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker) -> None:
+    from shared.core.background import warm_indexes
+
+    warm_indexes()
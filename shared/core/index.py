@@ -0,0 +1,336 @@
+"""In-memory metric index over the number inventory.
+
+The default search path filters ``Number`` rows by area code and scores every
+candidate in Python.  For dense area codes that means materialising tens of
+thousands of model instances per request.  :class:`NumberIndex` keeps a
+Burkhard-Keller tree per area code so the nearest numbers can be found by
+walking only the branches that may still beat the current k-th result.
+
+The process-wide index is built from the inventory snapshot by a
+:class:`~shared.core.background.BackgroundIndex`, so requests never wait for
+a rebuild once the first one has finished.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from array import array
+from typing import TYPE_CHECKING, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from django.db.models import QuerySet
+
+from .background import BackgroundIndex
+from .models import Number
+from .search import (
+    LevenshteinPattern,
+    bitset_jaccard,
+    levenshtein_bitparallel,
+    ranking_key,
+    result_payload,
+    trigram_bitset,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .snapshot import NumberSnapshot
+
+V = TypeVar("V")
+
+# (area_code, phone_number, cost, created_at timestamp)
+IndexRow = Tuple[str, str, int, float]
+
+_MISSING = object()
+
+
+class BKTree(Generic[V]):
+    """Burkhard-Keller tree keyed by strings under Levenshtein distance.
+
+    Nodes are stored as ``[key, value, children]`` lists, ``children`` mapping
+    the edge distance to the child node, to keep per-node overhead small.
+    Queries compile a :class:`LevenshteinPattern` once and reuse it for every
+    node they visit.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self) -> None:
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def add(self, key: str, value: V) -> None:
+        """Insert ``key``; an existing entry for the same key is replaced."""
+
+        if self._root is None:
+            self._root = [key, value, {}]
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = levenshtein_bitparallel(key, node[0])
+            if distance == 0:
+                node[1] = value
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, value, {}]
+                self._size += 1
+                return
+            node = child
+
+    def get(self, key: str, default: Optional[V] = None) -> Optional[V]:
+        measure = LevenshteinPattern(key).distance
+        node = self._root
+        while node is not None:
+            distance = measure(node[0])
+            if distance == 0:
+                return node[1]
+            node = node[2].get(distance)
+        return default
+
+    def items(self) -> Iterable[Tuple[str, V]]:
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            yield node[0], node[1]
+            stack.extend(node[2].values())
+
+    def search(self, query: str, radius: int) -> List[Tuple[int, str, V]]:
+        """Return every ``(distance, key, value)`` within ``radius`` of ``query``."""
+
+        measure = LevenshteinPattern(query).distance
+        found: List[Tuple[int, str, V]] = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = measure(node[0])
+            if distance <= radius:
+                found.append((distance, node[0], node[1]))
+            low, high = distance - radius, distance + radius
+            stack.extend(child for edge, child in node[2].items() if low <= edge <= high)
+        return found
+
+    def nearest(self, query: str, k: int, exclude: Optional[str] = None) -> List[Tuple[int, str, V]]:
+        """Return the ``k`` nearest entries plus every entry tied with the k-th.
+
+        Ties at the boundary distance are kept so callers can apply their own
+        secondary ordering and still get an exact top-k.  ``exclude`` skips a
+        single key (typically the query itself).
+        """
+
+        if k <= 0 or self._root is None:
+            return []
+        measure = LevenshteinPattern(query).distance
+        found: List[Tuple[int, str, V]] = []
+        counts: Dict[int, int] = {}
+        radius = float("inf")
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = measure(node[0])
+            if distance <= radius and node[0] != exclude:
+                found.append((distance, node[0], node[1]))
+                counts[distance] = counts.get(distance, 0) + 1
+                radius = _kth_distance(counts, k, radius)
+            # Push far edges first so the closest branch is explored next and
+            # the radius shrinks as early as possible.
+            children = sorted(node[2].items(), key=lambda item: -abs(item[0] - distance))
+            stack.extend(child for edge, child in children if abs(edge - distance) <= radius)
+        return [entry for entry in found if entry[0] <= radius]
+
+
+def _kth_distance(counts: Dict[int, int], k: int, current: float) -> float:
+    total = 0
+    for distance in sorted(counts):
+        total += counts[distance]
+        if total >= k:
+            return min(distance, current)
+    return current
+
+
+class TrigramIndex:
+    """Precomputed trigram bitsets and trigram-to-row posting lists.
+
+    Full numbers are ten digits, so every trigram is one of 1000 values.  Each
+    stored number keeps its trigram set as a bitset, which turns Jaccard
+    similarity into two popcounts, and each trigram keeps the rows containing
+    it so similar numbers can be found without a full scan.
+    """
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self._values: List[str] = []
+        self._bitsets: List[int] = []
+        self._rows: Dict[str, int] = {}
+        self._postings: List[array] = [array("I") for _ in range(1000)]
+        for value in values:
+            self.add(value)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, value: str) -> int:
+        row = self._rows.get(value)
+        if row is not None:
+            return row
+        row = len(self._values)
+        bits = trigram_bitset(value)
+        self._values.append(value)
+        self._bitsets.append(bits)
+        self._rows[value] = row
+        for code in _bit_positions(bits):
+            self._postings[code].append(row)
+        return row
+
+    def bitset(self, value: str) -> int:
+        """Return the stored bitset for ``value``, computing it if unknown."""
+
+        row = self._rows.get(value)
+        return self._bitsets[row] if row is not None else trigram_bitset(value)
+
+    def similarity(self, a: str, b: str) -> float:
+        return bitset_jaccard(self.bitset(a), self.bitset(b))
+
+    def similar(self, query: str, limit: int = 10, min_similarity: float = 0.0) -> List[Tuple[float, str]]:
+        """Return up to ``limit`` ``(similarity, value)`` pairs, most similar first.
+
+        Any value reaching ``min_similarity`` must share at least
+        ``ceil(min_similarity * |query trigrams|)`` trigrams with the query, so
+        only the rarest posting lists that can still supply such a value are
+        read (prefix filtering); the survivors are verified with bitsets.
+        """
+
+        query_bits = trigram_bitset(query)
+        codes = sorted(_bit_positions(query_bits), key=lambda code: len(self._postings[code]))
+        required = max(1, math.ceil(min_similarity * len(codes) - 1e-9))
+        rows = set()
+        for code in codes[: len(codes) - required + 1]:
+            rows.update(self._postings[code])
+        scored = []
+        for row in rows:
+            similarity = bitset_jaccard(query_bits, self._bitsets[row])
+            if similarity >= min_similarity and self._values[row] != query:
+                scored.append((similarity, self._values[row]))
+        return heapq.nsmallest(limit, scored, key=lambda item: (-item[0], item[1]))
+
+
+def _bit_positions(bits: int) -> Iterable[int]:
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class NumberIndex:
+    """Per-area-code BK-trees, a last-four lookup table and a :class:`TrigramIndex`.
+
+    :meth:`rank` reproduces :func:`shared.core.search.rank_related_numbers`
+    exactly, including the last-four fallback for sparse area codes.
+    """
+
+    def __init__(self, rows: Iterable[IndexRow] = ()) -> None:
+        self._trees: Dict[str, BKTree[Tuple[int, float]]] = {}
+        self._by_last_four: Dict[str, List[IndexRow]] = {}
+        self.trigrams = TrigramIndex()
+        for area_code, phone_number, cost, created_ts in rows:
+            self.trigrams.add(f"{area_code}{phone_number}")
+            tree = self._trees.get(area_code)
+            if tree is None:
+                tree = self._trees[area_code] = BKTree()
+            tree.add(phone_number, (cost, created_ts))
+            self._by_last_four.setdefault(phone_number[-4:], []).append((area_code, phone_number, cost, created_ts))
+        # The fallback walks rows in the default model ordering.
+        for bucket in self._by_last_four.values():
+            bucket.sort()
+
+    def __len__(self) -> int:
+        return sum(len(tree) for tree in self._trees.values())
+
+    @classmethod
+    def from_queryset(cls, queryset: QuerySet[Number], chunk_size: int = 5000) -> "NumberIndex":
+        rows = queryset.order_by().values_list("area_code", "phone_number", "cost", "created_at")
+        return cls(
+            (area_code, phone_number, cost, created_at.timestamp())
+            for area_code, phone_number, cost, created_at in rows.iterator(chunk_size=chunk_size)
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "NumberSnapshot") -> "NumberIndex":
+        return cls(snapshot.rows())
+
+    def rank(self, query_area_code: str, query_phone_number: str, limit: int = 10) -> List[dict]:
+        """Return related numbers ranked exactly like ``rank_related_numbers``."""
+
+        tree = self._trees.get(query_area_code)
+        available = len(tree) if tree is not None else 0
+        if tree is not None and query_phone_number in tree:
+            available -= 1
+
+        candidates: List[Tuple[str, str, int, float]] = []
+        distances: List[int] = []
+        if available >= limit:
+            for distance, phone_number, (cost, created_ts) in tree.nearest(
+                query_phone_number, limit, exclude=query_phone_number
+            ):
+                candidates.append((query_area_code, phone_number, cost, created_ts))
+                distances.append(distance)
+        else:
+            if tree is not None:
+                candidates.extend(
+                    (query_area_code, phone_number, cost, created_ts)
+                    for phone_number, (cost, created_ts) in tree.items()
+                    if phone_number != query_phone_number
+                )
+            for row in self._by_last_four.get(query_phone_number[-4:], ()):
+                if len(candidates) >= limit * 5:
+                    break
+                if row[0] != query_area_code:
+                    candidates.append(row)
+            measure = LevenshteinPattern(query_phone_number).distance
+            distances = [measure(row[1]) for row in candidates]
+
+        query_bits = self.trigrams.bitset(f"{query_area_code}{query_phone_number}")
+        scored = []
+        for (area_code, phone_number, cost, created_ts), distance in zip(candidates, distances):
+            similarity = bitset_jaccard(query_bits, self.trigrams.bitset(f"{area_code}{phone_number}"))
+            # Exact ties follow the Python backend's arrival order: the query's
+            # area code first, then the fallback rows, each in model order.
+            tier = area_code != query_area_code
+            key = ranking_key(distance, similarity, cost, created_ts) + (tier, area_code, phone_number)
+            scored.append((key, cost, similarity))
+        scored.sort()
+        return [
+            result_payload(key[5], key[6], cost, key[0], similarity) for key, cost, similarity in scored[:limit]
+        ]
+
+
+_holder: BackgroundIndex[NumberIndex] = BackgroundIndex("number", NumberIndex.from_snapshot)
+
+
+def get_number_index() -> NumberIndex:
+    """Return the process-wide index.
+
+    Writes made in this process mark it stale through signals; writes from
+    other processes (e.g. the admin service) are picked up once
+    ``SEARCH_INDEX_TTL`` seconds have passed.  Either way the rebuild runs in
+    the background and the previous index is served until it is done.
+    """
+
+    return _holder.get()
+
+
+def invalidate_number_index() -> None:
+    _holder.invalidate()
+
+
+__all__ = [
+    "BKTree",
+    "NumberIndex",
+    "TrigramIndex",
+    "get_number_index",
+    "invalidate_number_index",
+]
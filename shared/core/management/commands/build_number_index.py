@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from shared.core.packed import packed_index_path, write_packed_index
+from shared.core.snapshot import NumberSnapshot
+
+
+class Command(BaseCommand):
+    help = "Write the number inventory to the packed index file mapped by the 'packed' search backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Destination file (defaults to SEARCH_PACKED_INDEX_PATH).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["output"] or packed_index_path()
+        rows = write_packed_index(NumberSnapshot.build(), path)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} numbers to {path}."))
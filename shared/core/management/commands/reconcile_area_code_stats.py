@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from shared.core.search_cache import bump_dataset_version
+from shared.core.stats import refresh_area_code_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-area-code statistics table from the number inventory, repairing any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "area_codes",
+            nargs="*",
+            help="Area codes to reconcile (defaults to all of them).",
+        )
+
+    def handle(self, *args, **options):
+        changed = refresh_area_code_stats(options["area_codes"] or None)
+        if changed:
+            bump_dataset_version()
+            self.stdout.write(self.style.WARNING(f"Repaired {len(changed)} area codes: {', '.join(changed)}."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Area code stats are up to date."))
@@ -6,6 +6,8 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 
 from shared.core.models import Number
+from shared.core.search_cache import bump_versions
+from shared.core.stats import refresh_area_code_stats
 
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "ChangeMeNow!2025"
@@ -51,4 +53,7 @@ class Command(BaseCommand):
             cost = random.choice([49, 79, 99, 149, 199, 249, 299, 349, 399, 499])
             numbers.append(Number(area_code=area, phone_number=local, cost=cost))
         Number.objects.bulk_create(numbers, batch_size=50)
+        # bulk_create sends no signals.
+        bump_versions((number.area_code, number.phone_number) for number in numbers)
+        refresh_area_code_stats({number.area_code for number in numbers})
         self.stdout.write(f"Inserted {len(numbers)} sample numbers.")
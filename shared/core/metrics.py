@@ -0,0 +1,270 @@
+"""Prometheus instrumentation shared by both services.
+
+:class:`PrometheusMiddleware` records, per service and route, a request
+latency histogram, a counter of responses by status and a gauge of requests
+in flight.  Routes are labelled with their URL pattern (``v1/numbers/<uuid:pk>``)
+rather than the path, which keeps the label set bounded.
+
+Under gunicorn every worker has its own metric values.  When
+``PROMETHEUS_MULTIPROC_DIR`` is set, prometheus_client writes them to files
+in that directory and :func:`render_metrics` aggregates the files of all
+workers, so any worker can answer a scrape (see ``shared/core/gunicorn_conf.py``
+for the hooks that clean the directory up).  Counters local to one process,
+such as cache hit counts, are reported for the process serving the scrape.
+
+Gauges that need a query, like the inventory size, are refreshed by a
+background thread (:func:`start_inventory_refresh`) instead of on every
+scrape.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.models import Sum
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+UNMATCHED = "<unmatched>"
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from the request entering the middleware stack to the response leaving it",
+    ["service", "method", "endpoint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+RESPONSES = Counter(
+    "http_responses",
+    "Responses sent, by status code",
+    ["service", "method", "endpoint", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled",
+    ["service", "method"],
+    multiprocess_mode="livesum",
+)
+SEARCH_STAGE_SECONDS = Histogram(
+    "search_stage_duration_seconds",
+    "Time spent in each stage of a related-number search (see shared.core.timing)",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+SEARCH_CANDIDATES = Histogram(
+    "search_candidates",
+    "Candidate rows read per related-number search, by source",
+    ["source"],
+    buckets=(0, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000),
+)
+DB_QUERIES = Histogram(
+    "db_queries_per_request",
+    "SQL queries run while handling one request (see shared.core.querylog)",
+    ["service", "method", "endpoint"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000),
+)
+DB_TIME = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent in SQL queries while handling one request",
+    ["service", "method", "endpoint"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+INVENTORY = Gauge(
+    "phone_numbers_total",
+    "Total phone numbers, refreshed in the background",
+    multiprocess_mode="livemax",
+)
+
+
+def method_label(request) -> str:
+    return request.method if request.method in METHODS else "other"
+
+
+def endpoint_label(request) -> str:
+    """URL pattern the request was routed to, once URL resolution has run."""
+
+    match = getattr(request, "resolver_match", None)
+    return match.route if match is not None else UNMATCHED
+
+
+class PrometheusMiddleware:
+    """Record latency, status and concurrency metrics for every request.
+
+    Native in both sync and async stacks; list it first in ``MIDDLEWARE`` so
+    the timings include the rest of the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.service = getattr(settings, "METRICS_SERVICE", "django")
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        method, started = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.labels(self.service, method).dec()
+        self._end(request, method, started, response.status_code)
+        return response
+
+    async def __acall__(self, request):
+        method, started = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.labels(self.service, method).dec()
+        self._end(request, method, started, response.status_code)
+        return response
+
+    def _begin(self, request) -> Tuple[str, float]:
+        method = method_label(request)
+        REQUESTS_IN_PROGRESS.labels(self.service, method).inc()
+        return method, time.perf_counter()
+
+    def _end(self, request, method: str, started: float, status: int) -> None:
+        endpoint = endpoint_label(request)
+        REQUEST_LATENCY.labels(self.service, method, endpoint).observe(time.perf_counter() - started)
+        RESPONSES.labels(self.service, method, endpoint, str(status)).inc()
+
+
+class ProcessStatsCollector:
+    """Cache hit counters of the process serving the scrape."""
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        # Lets the registry check names without importing the cache modules.
+        yield GaugeMetricFamily("search_cache_hits", "")
+        yield GaugeMetricFamily("search_cache_misses", "")
+        yield GaugeMetricFamily("cache_tier_lookups", "", labels=["cache", "tier", "outcome"])
+        yield GaugeMetricFamily("cache_tier_hit_ratio", "", labels=["cache", "tier"])
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        from django.core.cache import caches
+
+        from .search_cache import stats as search_stats
+        from .tiered_cache import TierStats
+
+        counts = search_stats.snapshot()
+        for outcome in ("hits", "misses"):
+            yield GaugeMetricFamily(
+                f"search_cache_{outcome}", f"Search result cache {outcome} in this process", value=counts[outcome]
+            )
+
+        lookups = GaugeMetricFamily(
+            "cache_tier_lookups", "Two-tier cache lookups in this process", labels=["cache", "tier", "outcome"]
+        )
+        hit_ratio = GaugeMetricFamily(
+            "cache_tier_hit_ratio", "Two-tier cache hit ratio in this process", labels=["cache", "tier"]
+        )
+        for alias in settings.CACHES:
+            tier_stats = getattr(caches[alias], "stats", None)
+            if not isinstance(tier_stats, TierStats):
+                continue
+            snapshot = tier_stats.snapshot()
+            for tier in ("l1", "l2"):
+                lookups.add_metric([alias, tier, "hit"], snapshot[f"{tier}_hits"])
+                lookups.add_metric([alias, tier, "miss"], snapshot[f"{tier}_misses"])
+                hit_ratio.add_metric([alias, tier], snapshot[f"{tier}_hit_ratio"])
+        yield lookups
+        yield hit_ratio
+
+
+_process_collector = ProcessStatsCollector()
+if not MULTIPROC_DIR:
+    REGISTRY.register(_process_collector)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the exposition text and its content type."""
+
+    if not MULTIPROC_DIR:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_process_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def refresh_inventory() -> None:
+    from .models import AreaCodeStats
+
+    INVENTORY.set(AreaCodeStats.objects.aggregate(total=Sum("count"))["total"] or 0)
+
+
+_refresher: Optional[threading.Thread] = None
+_refresher_lock = threading.Lock()
+
+
+def start_inventory_refresh() -> None:
+    """Set the inventory gauge now and keep refreshing it every ``METRICS_INVENTORY_INTERVAL`` seconds.
+
+    Idempotent; the first call (normally the first scrape) pays for one query.
+    """
+
+    global _refresher
+    if _refresher is not None:
+        return
+    with _refresher_lock:
+        if _refresher is not None:
+            return
+        refresh_inventory()
+        _refresher = threading.Thread(target=_refresh_loop, name="inventory-metrics", daemon=True)
+        _refresher.start()
+
+
+def _refresh_loop() -> None:
+    interval = getattr(settings, "METRICS_INVENTORY_INTERVAL", 30)
+    while True:
+        time.sleep(interval)
+        try:
+            refresh_inventory()
+        except Exception:  # pragma: no cover - keep the thread alive through database hiccups
+            logger.warning("Could not refresh the inventory gauge", exc_info=True)
+        finally:
+            # Do not hold a connection between refreshes.
+            connection.close()
+
+
+__all__ = [
+    "DB_QUERIES",
+    "DB_TIME",
+    "INVENTORY",
+    "PrometheusMiddleware",
+    "REQUESTS_IN_PROGRESS",
+    "REQUEST_LATENCY",
+    "RESPONSES",
+    "SEARCH_CANDIDATES",
+    "SEARCH_STAGE_SECONDS",
+    "endpoint_label",
+    "method_label",
+    "render_metrics",
+    "start_inventory_refresh",
+]
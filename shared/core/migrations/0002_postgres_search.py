@@ -0,0 +1,49 @@
+"""PostgreSQL extensions, functions and indexes used by the ``postgres`` search backend.
+
+Every operation is a no-op on other database vendors.
+"""
+
+from django.db import migrations
+
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS fuzzystrmatch",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION core_trigram_jaccard(a text, b text) RETURNS double precision
+    LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+        WITH ta AS (
+            SELECT DISTINCT substr(a, i, 3) AS t FROM generate_series(1, greatest(length(a) - 2, 1)) AS i
+        ), tb AS (
+            SELECT DISTINCT substr(b, i, 3) AS t FROM generate_series(1, greatest(length(b) - 2, 1)) AS i
+        )
+        SELECT (SELECT count(*) FROM ta JOIN tb USING (t))::double precision
+            / greatest((SELECT count(*) FROM (SELECT t FROM ta UNION SELECT t FROM tb) AS u), 1)
+    $$
+    """,
+    "CREATE INDEX IF NOT EXISTS core_number_phone_trgm_idx ON core_number USING gin (phone_number gin_trgm_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS core_number_phone_trgm_idx",
+    "DROP FUNCTION IF EXISTS core_trigram_jaccard(text, text)",
+]
+
+
+def _run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
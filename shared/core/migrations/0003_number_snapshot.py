@@ -0,0 +1,24 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_postgres_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NumberTombstone",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("area_code", models.CharField(max_length=3)),
+                ("phone_number", models.CharField(max_length=7)),
+                ("deleted_at", models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="number",
+            index=models.Index(fields=["updated_at"], name="core_number_updated_idx"),
+        ),
+    ]
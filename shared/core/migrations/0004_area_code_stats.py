@@ -0,0 +1,48 @@
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+import shared.core.validators
+
+
+def populate_stats(apps, schema_editor):
+    Number = apps.get_model("core", "Number")
+    AreaCodeStats = apps.get_model("core", "AreaCodeStats")
+    rows = (
+        Number.objects.order_by()
+        .values("area_code")
+        .annotate(count=Count("id"), total_cost=Sum("cost"), min_cost=Min("cost"), max_cost=Max("cost"))
+    )
+    AreaCodeStats.objects.bulk_create([AreaCodeStats(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_number_snapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AreaCodeStats",
+            fields=[
+                (
+                    "area_code",
+                    models.CharField(
+                        max_length=3,
+                        primary_key=True,
+                        serialize=False,
+                        validators=[shared.core.validators.area_code_validator],
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("total_cost", models.PositiveBigIntegerField(default=0)),
+                ("min_cost", models.PositiveIntegerField(blank=True, null=True)),
+                ("max_cost", models.PositiveIntegerField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "area code stats",
+                "ordering": ["-count", "area_code"],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -51,15 +51,70 @@ class Number(TimestampedModel):
             models.Index(fields=["area_code"]),
             models.Index(fields=["phone_number"]),
             models.Index(fields=["area_code", "phone_number"]),
+            models.Index(fields=["updated_at"], name="core_number_updated_idx"),
         ]
         ordering = ["area_code", "phone_number"]
 
     def __str__(self) -> str:  # pragma: no cover - human readable
         return f"({self.area_code}) {self.phone_number}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored key so a write that changes it can invalidate
+        # cached search results for the old value as well as the new one.
+        if "area_code" in instance.__dict__ and "phone_number" in instance.__dict__:
+            instance._loaded_key = (instance.area_code, instance.phone_number)
+            # Area code statistics need the stored cost to apply a delta.
+            if "cost" in instance.__dict__:
+                instance._loaded_cost = instance.cost
+        return instance
+
     @property
     def full_number(self) -> str:
         return f"{self.area_code}{self.phone_number}"
 
 
-__all__ = ["Number", "TimestampedModel"]
+class NumberTombstone(models.Model):
+    """Key of a deleted or re-keyed ``Number``.
+
+    Incremental snapshot refreshes only see rows that still exist, so removals
+    are recorded here and pruned after ``SEARCH_TOMBSTONE_RETENTION`` seconds.
+    """
+
+    area_code = models.CharField(max_length=3)
+    phone_number = models.CharField(max_length=7)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self) -> str:  # pragma: no cover - human readable
+        return f"({self.area_code}) {self.phone_number} deleted {self.deleted_at:%Y-%m-%d %H:%M:%S}"
+
+
+class AreaCodeStats(models.Model):
+    """Inventory statistics of one area code, maintained by :mod:`shared.core.stats`.
+
+    Rows exist only for area codes that currently hold numbers.
+    ``total_cost`` is stored instead of the average so that every write
+    applies as an exact delta.
+    """
+
+    area_code = models.CharField(max_length=3, primary_key=True, validators=[area_code_validator])
+    count = models.PositiveIntegerField(default=0)
+    total_cost = models.PositiveBigIntegerField(default=0)
+    min_cost = models.PositiveIntegerField(null=True, blank=True)
+    max_cost = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-count", "area_code"]
+        verbose_name_plural = "area code stats"
+
+    def __str__(self) -> str:  # pragma: no cover - human readable
+        return f"{self.area_code}: {self.count} numbers"
+
+    @property
+    def avg_cost(self) -> float | None:
+        return self.total_cost / self.count if self.count else None
+
+
+__all__ = ["AreaCodeStats", "Number", "NumberTombstone", "TimestampedModel"]
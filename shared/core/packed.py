@@ -0,0 +1,192 @@
+"""Packed, memory-mapped number index shared by every worker on a host.
+
+``manage.py build_number_index`` writes the inventory to a single binary file;
+each worker maps it read-only, so all of them share one page-cache copy and
+start answering without loading anything.  The file is laid out as
+(little-endian)::
+
+    header   magic "NUMINDEX", format version u32, area count u32,
+             row count u64, watermark (epoch seconds of the newest write) f64
+    table    per area code, sorted: code 3 bytes, pad 1, first row u32, rows u32
+    columns  local numbers u32[rows], costs u32[rows], created f64[rows],
+             last-four keys u64[rows]
+
+Rows are grouped by area code and sorted by local number within a group; the
+column sections are 8-byte aligned so they can be cast in place.  Rebuilds
+write a temporary file next to the target and ``os.replace`` it, and readers
+notice the new inode on their next check.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Optional, Tuple
+
+from django.conf import settings
+
+from .snapshot import AreaColumns, NumberSnapshot
+
+MAGIC = b"NUMINDEX"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQd")
+TABLE_ENTRY = struct.Struct("<3sxII")
+
+
+class PackedIndexError(ValueError):
+    """Raised when a packed index file is missing, truncated or of another format."""
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _layout(area_count: int, row_count: int) -> Tuple[int, int, int, int, int]:
+    numbers = _align(HEADER.size + TABLE_ENTRY.size * area_count)
+    costs = numbers + 4 * row_count
+    created = _align(costs + 4 * row_count)
+    by_suffix = created + 8 * row_count
+    return numbers, costs, created, by_suffix, by_suffix + 8 * row_count
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_packed_index(snapshot: NumberSnapshot, path) -> int:
+    """Write ``snapshot`` to ``path`` atomically and return the number of rows."""
+
+    path = Path(path)
+    area_codes = sorted(snapshot.areas)
+    numbers, costs, created, by_suffix = array("I"), array("I"), array("d"), array("Q")
+    table = []
+    for area_code in area_codes:
+        columns = snapshot.areas[area_code]
+        table.append(TABLE_ENTRY.pack(area_code.encode("ascii"), len(numbers), len(columns)))
+        numbers.extend(columns.numbers)
+        costs.extend(columns.costs)
+        created.extend(columns.created)
+        by_suffix.extend(columns.by_suffix)
+
+    watermark = snapshot.watermark.timestamp() if snapshot.watermark is not None else 0.0
+    offsets = _layout(len(area_codes), len(numbers))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", delete=False)
+    try:
+        with handle:
+            handle.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(area_codes), len(numbers), watermark))
+            handle.write(b"".join(table))
+            for offset, column in zip(offsets, (numbers, costs, created, by_suffix)):
+                handle.write(b"\0" * (offset - handle.tell()))
+                handle.write(_little_endian(column))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(handle.name, 0o644)
+        os.replace(handle.name, path)
+    except BaseException:
+        Path(handle.name).unlink(missing_ok=True)
+        raise
+    return len(numbers)
+
+
+def open_packed_index(path) -> NumberSnapshot:
+    """Map ``path`` read-only and return a snapshot whose columns are views into it."""
+
+    if sys.byteorder != "little":
+        raise PackedIndexError("Packed number indexes can only be mapped on little-endian hosts.")
+    try:
+        with open(path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as exc:
+        raise PackedIndexError(f"Cannot map packed number index '{path}': {exc}") from exc
+
+    if len(mapped) < HEADER.size:
+        raise PackedIndexError(f"'{path}' is not a packed number index.")
+    magic, version, area_count, row_count, watermark = HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise PackedIndexError(f"'{path}' is not a packed number index.")
+    if version != FORMAT_VERSION:
+        raise PackedIndexError(f"'{path}' has format version {version}; expected {FORMAT_VERSION}.")
+    offsets = _layout(area_count, row_count)
+    if len(mapped) < offsets[-1]:
+        raise PackedIndexError(f"'{path}' is truncated.")
+
+    view = memoryview(mapped)
+    numbers = view[offsets[0] : offsets[1]].cast("I")
+    costs = view[offsets[1] : offsets[1] + 4 * row_count].cast("I")
+    created = view[offsets[2] : offsets[3]].cast("d")
+    by_suffix = view[offsets[3] : offsets[4]].cast("Q")
+    areas = {}
+    for position in range(area_count):
+        code, start, count = TABLE_ENTRY.unpack_from(mapped, HEADER.size + position * TABLE_ENTRY.size)
+        end = start + count
+        areas[code.decode("ascii")] = AreaColumns.from_buffers(
+            numbers[start:end], costs[start:end], created[start:end], by_suffix[start:end]
+        )
+    return NumberSnapshot(areas, datetime.fromtimestamp(watermark, tz=dt_timezone.utc) if watermark else None)
+
+
+def packed_index_path() -> Path:
+    return Path(getattr(settings, "SEARCH_PACKED_INDEX_PATH", "number_index.bin"))
+
+
+_packed: Optional[NumberSnapshot] = None
+_packed_identity: Optional[Tuple[int, int, int]] = None
+_checked_at = 0.0
+_packed_lock = threading.Lock()
+
+
+def get_packed_index() -> NumberSnapshot:
+    """Return the mapped index, re-mapping it when the file has been replaced.
+
+    The file is stat-ed at most every ``SEARCH_PACKED_CHECK_INTERVAL``
+    seconds.  A replaced file is only unmapped once the last view into the
+    old mapping is released, so in-flight requests are unaffected.
+    """
+
+    global _packed, _packed_identity, _checked_at
+    interval = getattr(settings, "SEARCH_PACKED_CHECK_INTERVAL", 5)
+    if _packed is not None and time.monotonic() - _checked_at < interval:
+        return _packed
+    with _packed_lock:
+        if _packed is None or time.monotonic() - _checked_at >= interval:
+            path = packed_index_path()
+            try:
+                stat = os.stat(path)
+            except OSError as exc:
+                raise PackedIndexError(
+                    f"Packed number index '{path}' not found; run 'manage.py build_number_index'."
+                ) from exc
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if _packed is None or identity != _packed_identity:
+                _packed = open_packed_index(path)
+                _packed_identity = identity
+            _checked_at = time.monotonic()
+        return _packed
+
+
+def reset_packed_index() -> None:
+    global _packed, _packed_identity
+    _packed = _packed_identity = None
+
+
+__all__ = [
+    "FORMAT_VERSION",
+    "PackedIndexError",
+    "get_packed_index",
+    "open_packed_index",
+    "packed_index_path",
+    "reset_packed_index",
+    "write_packed_index",
+]
@@ -1,9 +1,24 @@
-"""Pagination utilities for Django views and APIs."""
+"""Pagination utilities for Django views and APIs.
 
+Besides page numbers and limit/offset, listings can be paginated by keyset:
+the client sends back an opaque cursor holding the ordering values of the
+last row it received, and the next page is the first ``limit`` rows after
+that position.  The database seeks straight to it through the ordering
+index, so page 1000 costs the same as page 1, and rows inserted or removed
+between requests do not shift later pages.  The ordering must be total, so
+its last field has to be unique.
+"""
+
+import base64
+import binascii
+import json
+from bisect import bisect_right
 from dataclasses import dataclass
-from typing import Iterable, List, Sequence, Tuple
+from functools import cmp_to_key
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
 
 from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
 from django.http import HttpRequest
 
 
@@ -28,4 +43,108 @@ def limit_offset_paginate(items: Iterable[dict], limit: int, offset: int) -> Pag
     return PaginationResult(items=sliced, total=len(items_list), limit=limit, offset=offset)
 
 
-__all__ = ["paginate", "PaginationResult", "limit_offset_paginate"]
+@dataclass(slots=True)
+class KeysetPage:
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def _value(row: Any, name: str) -> Any:
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def encode_cursor(row: Any, ordering: Sequence[str]) -> str:
+    """Return the cursor pointing just after ``row`` for ``ordering`` (e.g. ``("-count", "area_code")``)."""
+
+    values = [_value(row, term.lstrip("-")) for term in ordering]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: Sequence[str]) -> List[Any]:
+    """Return the ordering values held by ``cursor``; raise ``ValueError`` if it is malformed."""
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("Malformed cursor.") from exc
+    if (
+        not isinstance(values, list)
+        or len(values) != len(ordering)
+        or not all(isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values)
+    ):
+        raise ValueError("Malformed cursor.")
+    return values
+
+
+def keyset_queryset(queryset: QuerySet, ordering: Sequence[str], cursor: Optional[str]) -> QuerySet:
+    """Order ``queryset`` by ``ordering`` and keep the rows after ``cursor``.
+
+    An empty or ``None`` cursor starts from the first row.  Raises
+    ``ValueError`` for cursors that do not fit the ordering.
+    """
+
+    queryset = queryset.order_by(*ordering)
+    if not cursor:
+        return queryset
+    values = decode_cursor(cursor, ordering)
+    # (a, b) after (x, y) is  a > x  OR  a = x AND b > y, with < for descending terms.
+    after = Q()
+    for position, term in enumerate(ordering):
+        lookup = "lt" if term.startswith("-") else "gt"
+        equal = {ordering[index].lstrip("-"): values[index] for index in range(position)}
+        after |= Q(**equal, **{f"{term.lstrip('-')}__{lookup}": values[position]})
+    try:
+        return queryset.filter(after)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Malformed cursor.") from exc
+
+
+def keyset_page(rows: Sequence[Any], ordering: Sequence[str], limit: int) -> KeysetPage:
+    """Build a page from up to ``limit + 1`` rows read from :func:`keyset_queryset`."""
+
+    items = list(rows[:limit])
+    has_more = len(rows) > limit
+    return KeysetPage(items=items, next_cursor=encode_cursor(items[-1], ordering) if has_more else None)
+
+
+def keyset_paginate(queryset: QuerySet, ordering: Sequence[str], cursor: Optional[str], limit: int) -> KeysetPage:
+    return keyset_page(list(keyset_queryset(queryset, ordering, cursor)[: limit + 1]), ordering, limit)
+
+
+def keyset_paginate_sequence(
+    items: Sequence[Any], ordering: Sequence[str], cursor: Optional[str], limit: int
+) -> KeysetPage:
+    """:func:`keyset_paginate` for rows already sorted by ``ordering`` in memory."""
+
+    start = 0
+    if cursor:
+        values = decode_cursor(cursor, ordering)
+
+        def compare(left: Sequence[Any], right: Sequence[Any]) -> int:
+            for term, a, b in zip(ordering, left, right):
+                if a != b:
+                    try:
+                        before = a < b if not term.startswith("-") else a > b
+                    except TypeError as exc:
+                        raise ValueError("Malformed cursor.") from exc
+                    return -1 if before else 1
+            return 0
+
+        key = cmp_to_key(compare)
+        names = [term.lstrip("-") for term in ordering]
+        start = bisect_right(items, key(values), key=lambda row: key([_value(row, name) for name in names]))
+    return keyset_page(items[start : start + limit + 1], ordering, limit)
+
+
+__all__ = [
+    "KeysetPage",
+    "PaginationResult",
+    "decode_cursor",
+    "encode_cursor",
+    "keyset_page",
+    "keyset_paginate",
+    "keyset_paginate_sequence",
+    "keyset_queryset",
+    "limit_offset_paginate",
+    "paginate",
+]
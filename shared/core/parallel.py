@@ -0,0 +1,222 @@
+"""Sharded related-number scoring on a persistent process pool.
+
+Scoring a dense area code is CPU-bound and runs on one core per request.
+When ``SEARCH_PARALLEL_WORKERS`` is set and the query's area code holds at
+least ``SEARCH_PARALLEL_THRESHOLD`` rows (according to its
+:class:`~shared.core.models.AreaCodeStats` row, a primary-key read instead
+of a ``COUNT``), :func:`rank_sharded` packs the
+candidates into one shared-memory block of columns (uint32 local numbers,
+uint32 costs, float64 created timestamps), has every worker score a slice of
+it and merges the per-shard top-k.  Only the block name and slice bounds are
+sent to the workers, and only ``limit`` results per shard come back.  A
+search whose shards have not all returned within ``SEARCH_PARALLEL_TIMEOUT``
+seconds is scored in-process instead.
+
+The pool belongs to the server process, so a host runs
+``SEARCH_PARALLEL_WORKERS`` scoring processes per gunicorn worker; size the
+two together against the number of cores.
+
+Workers are started with ``SEARCH_PARALLEL_START_METHOD`` (``forkserver`` by
+default, so they never fork a threaded server process) and set Django up
+from ``DJANGO_SETTINGS_MODULE`` once; they never touch the database.  Worker
+processes import this module before Django is set up, so it must not import
+models (or :mod:`shared.core.search`) at module level.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import multiprocessing
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone as dt_timezone
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from django.conf import settings
+
+if TYPE_CHECKING:  # pragma: no cover
+    from django.db.models import QuerySet
+
+    from .models import Number
+    from .search import RankedNumber
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker() -> None:
+    import django
+
+    django.setup()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(getattr(settings, "SEARCH_PARALLEL_START_METHOD", "forkserver"))
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.SEARCH_PARALLEL_WORKERS,
+                mp_context=context,
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _columns(buffer, rows: int):
+    numbers = buffer[: 4 * rows].cast("I")
+    costs = buffer[4 * rows : 8 * rows].cast("I")
+    created = buffer[8 * rows : 16 * rows].cast("d")
+    return numbers, costs, created
+
+
+def _score_shard(
+    name: str,
+    rows: int,
+    start: int,
+    stop: int,
+    query_area_code: str,
+    query_phone_number: str,
+    limit: int,
+    chunk_size: int,
+    vectorize_threshold: int,
+) -> List[Tuple[int, "RankedNumber"]]:
+    """Score rows ``[start, stop)`` of the shared block; runs in a pool worker."""
+
+    from .search import LevenshteinPattern, _score_chunk, _TopK
+
+    # Workers share the parent's resource tracker, which already tracks the
+    # block; the parent unlinks it once every shard has returned.
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        numbers, costs, created = _columns(block.buf, rows)
+        try:
+            pattern = LevenshteinPattern(query_phone_number)
+            top = _TopK(limit)
+            for offset in range(start, stop, chunk_size):
+                end = min(offset + chunk_size, stop)
+                chunk = [
+                    (
+                        query_area_code,
+                        f"{numbers[row]:07d}",
+                        costs[row],
+                        datetime.fromtimestamp(created[row], tz=dt_timezone.utc),
+                    )
+                    for row in range(offset, end)
+                ]
+                _score_chunk(top, chunk, offset, query_area_code, query_phone_number, pattern, vectorize_threshold)
+            return top.entries()
+        finally:
+            numbers.release()
+            costs.release()
+            created.release()
+    finally:
+        block.close()
+
+
+def rank_sharded(
+    queryset: "QuerySet[Number]",
+    query_area_code: str,
+    query_phone_number: str,
+    limit: int = 10,
+) -> Optional[List[dict]]:
+    """Rank across the process pool, or return ``None`` to score in-process.
+
+    ``None`` is returned for area codes below the threshold (which includes
+    every query that needs the last-four fallback) and when the pool fails.
+    """
+
+    from .models import AreaCodeStats
+    from .search import _payloads, _TopK, ranking_key
+
+    threshold = max(getattr(settings, "SEARCH_PARALLEL_THRESHOLD", 50000), limit)
+    stored = AreaCodeStats.objects.filter(area_code=query_area_code).values_list("count", flat=True).first()
+    if stored is None or stored < threshold:
+        return None
+    primary = queryset.with_area_code(query_area_code).exclude(
+        area_code=query_area_code, phone_number=query_phone_number
+    )
+
+    numbers, costs, created = array("I"), array("I"), array("d")
+    chunk_size = getattr(settings, "SEARCH_CHUNK_SIZE", 2000)
+    for phone_number, cost, created_at in primary.values_list("phone_number", "cost", "created_at").iterator(
+        chunk_size=chunk_size
+    ):
+        numbers.append(int(phone_number))
+        costs.append(cost)
+        created.append(created_at.timestamp())
+    rows = len(numbers)
+    if rows < threshold:
+        # A filtered queryset or a stale count.
+        return None
+
+    block = shared_memory.SharedMemory(create=True, size=16 * rows)
+    try:
+        columns = _columns(block.buf, rows)
+        for view, values in zip(columns, (numbers, costs, created)):
+            view[:] = values
+            view.release()
+
+        shards = min(
+            settings.SEARCH_PARALLEL_WORKERS,
+            max(1, math.ceil(rows / getattr(settings, "SEARCH_PARALLEL_MIN_SHARD", 20000))),
+        )
+        bounds = [(rows * index // shards, rows * (index + 1) // shards) for index in range(shards)]
+        vectorize_threshold = getattr(settings, "SEARCH_VECTORIZE_THRESHOLD", 256)
+        try:
+            pool = _get_pool()
+            futures = [
+                pool.submit(
+                    _score_shard,
+                    block.name,
+                    rows,
+                    start,
+                    stop,
+                    query_area_code,
+                    query_phone_number,
+                    limit,
+                    chunk_size,
+                    vectorize_threshold,
+                )
+                for start, stop in bounds
+            ]
+            done, pending = wait(futures, timeout=getattr(settings, "SEARCH_PARALLEL_TIMEOUT", 5))
+            if pending:
+                # The slow shards keep their workers busy until they finish;
+                # their results are dropped.
+                for future in pending:
+                    future.cancel()
+                logger.warning("Sharded search timed out; scoring in-process")
+                return None
+            partials = [future.result() for future in futures]
+        except (BrokenProcessPool, OSError) as exc:
+            logger.warning("Sharded search failed; scoring in-process", exc_info=exc)
+            shutdown_pool()
+            return None
+    finally:
+        block.close()
+        block.unlink()
+
+    top = _TopK(limit)
+    for partial in partials:
+        for sequence, item in partial:
+            key = ranking_key(item.distance, item.similarity_score, item.cost, item.created_at.timestamp())
+            top.push(key, sequence, item)
+    return _payloads(top)
+
+
+__all__ = ["rank_sharded", "shutdown_pool"]
@@ -0,0 +1,272 @@
+"""Positional wildcard search over full ten-digit numbers.
+
+A pattern such as ``212-55?-??00`` fixes some digit positions and leaves the
+others open.  ``with_last_four`` style ``LIKE`` filters cannot use an index for
+that, so :class:`PatternIndex` keeps one bitmap per (position, digit) pair:
+bit ``i`` of bitmap ``(p, d)`` is set when row ``i`` has digit ``d`` at
+position ``p``.  A pattern resolves to the bitwise AND of the bitmaps of its
+fixed positions, and the set bits of the result are the matching rows.
+
+Rows are sorted by full number and split into segments of
+``SEGMENT_ROWS`` rows, each with its own bitmaps.  The digits a pattern fixes
+before its first wildcard bound the matching numbers to one contiguous run
+of rows, so only the segments overlapping that run are ANDed; a pattern
+starting with a wildcard still ANDs every segment, at a cost linear in the
+inventory (one machine word per 64 rows and fixed position).  A page of
+matches is located with popcounts and only the bits of the segments it
+covers are enumerated.
+
+The same bitmaps answer radius queries (:meth:`PatternIndex.within_distance`)
+over local numbers, which all have seven digits.  An alignment of two
+equal-length strings within ``k`` edits uses as many insertions as
+deletions, ``m <= k // 2`` of each, so every query digit it keeps appears in
+the candidate at most ``m`` positions away, and it drops at most ``k - m``
+query digits.  A row is therefore only verified when, for some ``m``, at
+least ``7 - (k - m)`` query digits occur within ``m`` positions of their
+own; the per-row counts are kept in bit-sliced form, a few bitwise
+operations per segment.  On uniformly spread numbers that leaves about 3%
+of the rows to verify at ``k = 3`` and 0.4% at ``k = 2``.
+
+The process-wide index is rebuilt from the inventory snapshot in the
+background (see :mod:`shared.core.background`).
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple
+
+from django.db.models import QuerySet
+
+from .background import BackgroundIndex
+from .models import Number
+from .search import LevenshteinPattern
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .snapshot import NumberSnapshot
+
+DIGITS = 10
+POSITIONS = 10
+AREA_CODE_DIGITS = 3
+LOCAL_DIGITS = POSITIONS - AREA_CODE_DIGITS
+WILDCARD = "?"
+SEGMENT_ROWS = 1 << 16
+
+_LOCAL = 10**LOCAL_DIGITS
+_SEPARATORS = re.compile(r"[-\s]")
+# Translation tables turning a column of digits into a binary string per digit.
+_BIT_TABLES = [
+    str.maketrans({str(other): "1" if other == digit else "0" for other in range(DIGITS)}) for digit in range(DIGITS)
+]
+
+
+def parse_pattern(pattern: str) -> str:
+    """Strip separators and return the ten-character mask, or raise ``ValueError``."""
+
+    mask = _SEPARATORS.sub("", pattern)
+    if len(mask) != POSITIONS or any(char != WILDCARD and not "0" <= char <= "9" for char in mask):
+        raise ValueError("Patterns must cover ten positions, each a digit or '?'.")
+    return mask
+
+
+class _Segment:
+    __slots__ = ("size", "all", "bitmaps")
+
+    def __init__(self, full_numbers: List[str]) -> None:
+        self.size = len(full_numbers)
+        self.all = (1 << self.size) - 1
+        self.bitmaps: List[int] = []
+        # Row 0 is the least significant bit, hence the reversal.
+        for column in zip(*reversed(full_numbers)):
+            digits = "".join(column)
+            self.bitmaps.extend(int(digits.translate(table), 2) for table in _BIT_TABLES)
+
+    def match(self, fixed: List[int]) -> int:
+        bits = self.all
+        for bitmap in fixed:
+            bits &= self.bitmaps[bitmap]
+            if not bits:
+                break
+        return bits
+
+    def near(self, local: str, radius: int) -> int:
+        """Return the rows whose local number may be within ``radius`` edits of ``local``."""
+
+        found = 0
+        for indels in range(radius // 2 + 1):
+            kept = []
+            for index, char in enumerate(local):
+                bits = 0
+                for position in range(max(index - indels, 0), min(index + indels, LOCAL_DIGITS - 1) + 1):
+                    bits |= self.bitmaps[(AREA_CODE_DIGITS + position) * DIGITS + int(char)]
+                kept.append(bits)
+            found |= _at_least(kept, len(local) - (radius - indels), self.all)
+        return found
+
+
+def _at_least(bitmaps: List[int], threshold: int, everything: int) -> int:
+    """Return the rows set in at least ``threshold`` of ``bitmaps``."""
+
+    if threshold <= 0:
+        return everything
+    # planes[level] holds bit ``level`` of every row's count.
+    planes: List[int] = []
+    for bits in bitmaps:
+        for level, plane in enumerate(planes):
+            planes[level], bits = plane ^ bits, plane & bits
+            if not bits:
+                break
+        if bits:
+            planes.append(bits)
+    # Compare each count with ``threshold``, most significant bit first.
+    greater, equal = 0, everything
+    for level in reversed(range(max(len(planes), threshold.bit_length()))):
+        plane = planes[level] if level < len(planes) else 0
+        if threshold >> level & 1:
+            equal &= plane
+        else:
+            greater |= equal & plane
+            equal &= ~plane
+    return greater | equal
+
+
+def _set_bits(bits: int, skip: int, take: int) -> List[int]:
+    """Return the positions of set bits ``skip .. skip + take``, lowest first."""
+
+    binary = bin(bits)[:1:-1]
+    positions = []
+    position = binary.find("1")
+    while position != -1 and len(positions) < skip + take:
+        positions.append(position)
+        position = binary.find("1", position + 1)
+    return positions[skip:]
+
+
+class PatternIndex:
+    """Position x digit bitmaps over every number, in ``(area_code, phone_number)`` order.
+
+    Rows are ``(area_code, phone_number, cost, created_at timestamp)``.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, int, float]] = ()) -> None:
+        ordered = sorted(
+            (f"{area_code}{phone_number}", cost, created_ts) for area_code, phone_number, cost, created_ts in rows
+        )
+        full_numbers = [full_number for full_number, _, _ in ordered]
+        self._numbers = array("Q", map(int, full_numbers))
+        self._costs = array("I", (cost for _, cost, _ in ordered))
+        self._created = array("d", (created_ts for _, _, created_ts in ordered))
+        self._segments = [
+            _Segment(full_numbers[start : start + SEGMENT_ROWS]) for start in range(0, len(full_numbers), SEGMENT_ROWS)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    @classmethod
+    def from_queryset(cls, queryset: QuerySet[Number], chunk_size: int = 5000) -> "PatternIndex":
+        # Already in index order, which makes the sort in ``__init__`` a single pass.
+        rows = queryset.order_by("area_code", "phone_number").values_list(
+            "area_code", "phone_number", "cost", "created_at"
+        )
+        return cls(
+            (area_code, phone_number, cost, created_at.timestamp())
+            for area_code, phone_number, cost, created_at in rows.iterator(chunk_size=chunk_size)
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "NumberSnapshot") -> "PatternIndex":
+        return cls(snapshot.rows())
+
+    def _segment_range(self, mask: str) -> range:
+        """Return the segments that can hold numbers starting with the mask's fixed prefix."""
+
+        prefix = mask.split(WILDCARD, 1)[0]
+        if not prefix:
+            return range(len(self._segments))
+        scale = 10 ** (POSITIONS - len(prefix))
+        start = bisect_left(self._numbers, int(prefix) * scale)
+        stop = bisect_left(self._numbers, (int(prefix) + 1) * scale)
+        if start == stop:
+            return range(0)
+        return range(start // SEGMENT_ROWS, (stop - 1) // SEGMENT_ROWS + 1)
+
+    def search(self, pattern: str, limit: int = 100, offset: int = 0) -> Tuple[List[dict], int]:
+        """Return one page of numbers matching ``pattern`` and the number of matches."""
+
+        mask = parse_pattern(pattern)
+        fixed = [position * DIGITS + int(char) for position, char in enumerate(mask) if char != WILDCARD]
+        page: List[dict] = []
+        total = 0
+        for index in self._segment_range(mask):
+            bits = self._segments[index].match(fixed)
+            count = bits.bit_count()
+            if count and len(page) < limit and total + count > offset:
+                skip = max(offset - total, 0)
+                for row in _set_bits(bits, skip, limit - len(page)):
+                    page.append(self._payload(index * SEGMENT_ROWS + row))
+            total += count
+        return page, total
+
+    def within_distance(self, phone_number: str, radius: int) -> Iterator[Tuple[int, Tuple[str, str, int, float]]]:
+        """Yield ``(distance, row)`` for every number whose local part is within ``radius`` edits.
+
+        Rows passing the bitmap filter are verified with the bit-parallel
+        kernel, once per distinct local number.
+        """
+
+        measure = LevenshteinPattern(phone_number).distance
+        distances: Dict[int, int] = {}
+        for index, segment in enumerate(self._segments):
+            bits = segment.near(phone_number, radius)
+            for row in _set_bits(bits, 0, bits.bit_count()):
+                row += index * SEGMENT_ROWS
+                full_number = self._numbers[row]
+                local = full_number % _LOCAL
+                distance = distances.get(local)
+                if distance is None:
+                    distance = distances[local] = measure(f"{local:07d}")
+                if distance <= radius:
+                    yield distance, (
+                        f"{full_number // _LOCAL:03d}",
+                        f"{local:07d}",
+                        self._costs[row],
+                        self._created[row],
+                    )
+
+    def _payload(self, row: int) -> dict:
+        full_number = f"{self._numbers[row]:010d}"
+        return {
+            "area_code": full_number[:3],
+            "phone_number": full_number[3:],
+            "full_number": full_number,
+            "cost": self._costs[row],
+        }
+
+
+_holder: BackgroundIndex[PatternIndex] = BackgroundIndex("pattern", PatternIndex.from_snapshot)
+
+
+def get_pattern_index() -> PatternIndex:
+    """Return the process-wide pattern index.
+
+    Maintained like :func:`shared.core.index.get_number_index`: rebuilt in
+    the background after local writes or every ``SEARCH_INDEX_TTL`` seconds.
+    """
+
+    return _holder.get()
+
+
+def invalidate_pattern_index() -> None:
+    _holder.invalidate()
+
+
+__all__ = [
+    "PatternIndex",
+    "WILDCARD",
+    "get_pattern_index",
+    "invalidate_pattern_index",
+    "parse_pattern",
+]
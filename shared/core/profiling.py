@@ -0,0 +1,182 @@
+"""On-demand ``cProfile`` runs of individual requests.
+
+With ``PROFILING_ENABLED`` set, :class:`ProfilingMiddleware` profiles a
+request when
+
+* it carries an ``X-Profile`` header and comes from a staff user (session
+  authentication) or the header value equals ``PROFILING_TOKEN``, for
+  services without staff sessions such as the public API; or
+* it is picked by ``PROFILING_SAMPLE_RATE``, a fraction of all requests.
+
+The stats are written in ``pstats`` format to ``PROFILING_DIR`` as
+``<timestamp>-<service>-<request id>.prof``, next to a ``.json`` file with
+the request line, status and duration.  The file name is returned in the
+``X-Profile-Id`` response header.  Only the newest ``PROFILING_MAX_FILES``
+profiles are kept.  The admin service lists and serves the directory, so
+both services should share it.
+
+Disabled, the middleware removes itself from the stack at startup and costs
+nothing.  One request per process is profiled at a time; ``cProfile`` only
+sees the thread it runs on, so for async views it records the event loop
+thread (other requests' coroutines included, ``sync_to_async`` work not).
+"""
+
+from __future__ import annotations
+
+import cProfile
+import hmac
+import json
+import logging
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+HEADER = "HTTP_X_PROFILE"
+PROFILE_SUFFIX = ".prof"
+_NAME = re.compile(r"^\d+-[a-z]+-[A-Za-z0-9_-]{1,64}$")
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]")
+
+# cProfile installs a per-thread hook and an async request shares its
+# thread with others, so profiles are taken one at a time.
+_busy = threading.Lock()
+
+
+def profile_dir() -> Path:
+    return Path(getattr(settings, "PROFILING_DIR", "profiles"))
+
+
+def profile_path(name: str) -> Optional[Path]:
+    """Path of the stored profile ``name``, or ``None`` if the name is invalid or unknown."""
+
+    if not _NAME.match(name):
+        return None
+    path = profile_dir() / f"{name}{PROFILE_SUFFIX}"
+    return path if path.is_file() else None
+
+
+def list_profiles() -> List[dict]:
+    """Metadata of the stored profiles, newest first."""
+
+    profiles = []
+    for meta_path in sorted(profile_dir().glob("*.json"), reverse=True):
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            continue
+        if profile_path(meta.get("name", "")) is not None:
+            profiles.append(meta)
+    return profiles
+
+
+def _prune(directory: Path, keep: int) -> None:
+    for stale in sorted(directory.glob(f"*{PROFILE_SUFFIX}"), reverse=True)[keep:]:
+        stale.unlink(missing_ok=True)
+        stale.with_suffix(".json").unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Run selected requests under ``cProfile`` and store the stats.
+
+    List it after ``AuthenticationMiddleware`` and ``RequestIDMiddleware``;
+    the profile covers the middleware after it and the view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.service = getattr(settings, "METRICS_SERVICE", "django")
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+        self.token = getattr(settings, "PROFILING_TOKEN", "")
+        self.max_files = getattr(settings, "PROFILING_MAX_FILES", 200)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._wanted(request) or not _busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler, started = cProfile.Profile(), time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            self._save(request, response, profiler, time.perf_counter() - started)
+        finally:
+            _busy.release()
+        return response
+
+    async def __acall__(self, request):
+        if HEADER in request.META and not self._token_matches(request):
+            # The session and user are loaded with sync queries.
+            wanted = await sync_to_async(self._wanted)(request)
+        else:
+            wanted = self._wanted(request)
+        if not wanted or not _busy.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            profiler, started = cProfile.Profile(), time.perf_counter()
+            profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+            self._save(request, response, profiler, time.perf_counter() - started)
+        finally:
+            _busy.release()
+        return response
+
+    def _token_matches(self, request) -> bool:
+        requested = request.META.get(HEADER, "")
+        return bool(self.token) and hmac.compare_digest(requested.encode(), self.token.encode())
+
+    def _wanted(self, request) -> bool:
+        if HEADER not in request.META:
+            return self.sample_rate > 0 and random.random() < self.sample_rate
+        if self._token_matches(request):
+            return True
+        # Only evaluated for requests asking to be profiled: loads the session.
+        user = getattr(request, "user", None)
+        return bool(user is not None and user.is_staff)
+
+    def _save(self, request, response, profiler: cProfile.Profile, duration: float) -> None:
+        request_id = _UNSAFE.sub("_", str(getattr(request, "request_id", "") or "none"))[:64]
+        name = f"{int(time.time() * 1000)}-{self.service}-{request_id}"
+        directory = profile_dir()
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(directory / f"{name}{PROFILE_SUFFIX}")
+            meta = {
+                "name": name,
+                "service": self.service,
+                "request_id": getattr(request, "request_id", None),
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 3),
+                "created": time.time(),
+            }
+            (directory / f"{name}.json").write_text(json.dumps(meta))
+            _prune(directory, self.max_files)
+        except OSError:
+            logger.warning("Could not store request profile", exc_info=True)
+            return
+        response["X-Profile-Id"] = name
+
+
+__all__ = ["ProfilingMiddleware", "list_profiles", "profile_dir", "profile_path"]
@@ -0,0 +1,161 @@
+"""Per-request accounting of SQL queries.
+
+Every database connection gets one permanent ``execute_wrapper``
+(:func:`install`, run from the ``connection_created`` signal).  It counts
+and times queries into the :class:`QueryAccount` that
+:class:`QueryAccountingMiddleware` opens for the current request, found
+through a context variable.  Connections are per thread while context
+variables follow a request into ``sync_to_async`` threads, so async views
+are accounted as well; a ``connection.execute_wrapper`` block entered by the
+middleware would miss every query that runs off the event loop thread.  The
+totals are recorded per service and route in the ``db_queries_per_request``
+and ``db_time_per_request_seconds`` histograms.
+
+Queries slower than ``SLOW_QUERY_THRESHOLD_MS`` are logged, a
+``SLOW_QUERY_SAMPLE_RATE`` fraction of them, with the request id set by
+``RequestIDMiddleware`` so they can be matched to the access log.
+
+Tests can hold an endpoint to a query budget with :func:`assert_query_budget`,
+which reads the totals the middleware leaves on the request.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import DB_QUERIES, DB_TIME, endpoint_label, method_label
+
+logger = logging.getLogger(__name__)
+
+# Longest SQL text included in a slow query log record.
+MAX_LOGGED_SQL = 2000
+
+
+class QueryAccount:
+    """``execute_wrapper`` callable counting and timing the queries of one request."""
+
+    __slots__ = ("request", "count", "duration", "threshold", "sample_rate")
+
+    def __init__(self, request, threshold: float, sample_rate: float) -> None:
+        self.request = request
+        self.count = 0
+        self.duration = 0.0
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if elapsed >= self.threshold and random.random() < self.sample_rate:
+                self._log_slow(sql, many, context, elapsed)
+
+    def _log_slow(self, sql: str, many: bool, context, elapsed: float) -> None:
+        logger.warning(
+            "Slow query",
+            extra={
+                "request_id": getattr(self.request, "request_id", None),
+                "path": self.request.path,
+                "alias": context["connection"].alias,
+                "duration_ms": round(elapsed * 1000, 3),
+                "executemany": many,
+                "sql": sql[:MAX_LOGGED_SQL],
+            },
+        )
+
+
+_current: ContextVar[Optional[QueryAccount]] = ContextVar("query_account", default=None)
+
+
+def _account_query(execute, sql, params, many, context):
+    account = _current.get()
+    if account is None:
+        return execute(sql, params, many, context)
+    return account(execute, sql, params, many, context)
+
+
+def install(connection) -> None:
+    """Add the accounting wrapper to ``connection`` (a ``DatabaseWrapper``) once."""
+
+    if _account_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_account_query)
+
+
+class QueryAccountingMiddleware:
+    """Count and time the SQL queries of every request.
+
+    List it right after ``PrometheusMiddleware`` so queries run by later
+    middleware are counted too.  The :class:`QueryAccount` is left on the
+    request as ``request.db_queries``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.service = getattr(settings, "METRICS_SERVICE", "django")
+        self.threshold = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 100) / 1000
+        self.sample_rate = getattr(settings, "SLOW_QUERY_SAMPLE_RATE", 1.0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._end(request)
+        return response
+
+    async def __acall__(self, request):
+        token = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._end(request)
+        return response
+
+    def _begin(self, request):
+        request.db_queries = QueryAccount(request, self.threshold, self.sample_rate)
+        return _current.set(request.db_queries)
+
+    def _end(self, request) -> None:
+        account = request.db_queries
+        labels = (self.service, method_label(request), endpoint_label(request))
+        DB_QUERIES.labels(*labels).observe(account.count)
+        DB_TIME.labels(*labels).observe(account.duration)
+
+
+def assert_query_budget(response, budget: int, message: Optional[str] = None) -> None:
+    """Fail unless the request behind a test client ``response`` ran at most ``budget`` queries.
+
+    Works with ``Client``, ``APIClient`` and ``AsyncClient`` responses of a
+    service that has :class:`QueryAccountingMiddleware` installed.
+    """
+
+    request = getattr(response, "wsgi_request", None) or getattr(response, "asgi_request", None)
+    account = getattr(request, "db_queries", None)
+    if account is None:
+        raise AssertionError("The response carries no query account; is QueryAccountingMiddleware installed?")
+    if account.count > budget:
+        detail = f"{request.method} {request.get_full_path()} ran {account.count} queries, budget is {budget}"
+        raise AssertionError(f"{message}: {detail}" if message else detail)
+
+
+__all__ = ["QueryAccount", "QueryAccountingMiddleware", "assert_query_budget", "install"]
@@ -0,0 +1,145 @@
+"""Sliding-window rate limiting backed by a host-local SQLite file.
+
+DRF's ``SimpleRateThrottle`` keeps a list of request timestamps per client in
+the cache and rewrites it on every request.  :class:`SlidingWindowStore`
+keeps three integers per client instead: the index of the current fixed
+window and the request counts of it and the previous window.  The request
+rate is estimated as ``previous * (1 - elapsed / window) + current``, the
+usual sliding-window counter, which is exact when requests are evenly spread
+and never off by more than the previous window's count otherwise.
+
+Each check is a single ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``
+statement that rotates the windows, decides and counts the request
+atomically, so every worker process on the host sees the same counts.  The
+database runs in WAL mode without fsyncs: throttle state is disposable.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+# Chance that a check also deletes rows of clients idle for two windows.
+PURGE_PROBABILITY = 0.001
+
+_ROTATED_CURRENT = "(CASE WHEN bucket = :bucket THEN current ELSE 0 END)"
+_ROTATED_PREVIOUS = "(CASE WHEN bucket = :bucket THEN previous WHEN bucket = :bucket - 1 THEN current ELSE 0 END)"
+_ALLOWED = f"({_ROTATED_PREVIOUS} * :weight + {_ROTATED_CURRENT} < :limit)"
+# Every expression in SET sees the row as it was before the update.
+_HIT_SQL = f"""
+INSERT INTO throttle (key, bucket, current, previous, allowed, expires)
+VALUES (:key, :bucket, 1, 0, 1, :expires)
+ON CONFLICT (key) DO UPDATE SET
+    bucket = :bucket,
+    previous = {_ROTATED_PREVIOUS},
+    current = {_ROTATED_CURRENT} + {_ALLOWED},
+    allowed = {_ALLOWED},
+    expires = :expires
+RETURNING current, previous, allowed
+"""
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS throttle (
+    key TEXT PRIMARY KEY,
+    bucket INTEGER NOT NULL,
+    current INTEGER NOT NULL,
+    previous INTEGER NOT NULL,
+    allowed INTEGER NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class Decision:
+    allowed: bool
+    # Seconds until a request would be allowed again; 0 when allowed.
+    wait: float
+
+
+class SlidingWindowStore:
+    """Per-client sliding-window counters in a SQLite database at ``path``."""
+
+    def __init__(self, path: str, busy_timeout: float = 1.0) -> None:
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork.
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute(_SCHEMA)
+        self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def hit(self, key: str, limit: int, duration: float, now: Optional[float] = None) -> Decision:
+        """Count one request for ``key`` if it is within ``limit`` per ``duration`` seconds."""
+
+        now = time.time() if now is None else now
+        window = int(now // duration)
+        elapsed = now - window * duration
+        if limit <= 0:
+            return Decision(False, duration - elapsed)
+        connection = self._connection()
+        current, previous, allowed = connection.execute(
+            _HIT_SQL,
+            {
+                "key": key,
+                "bucket": window,
+                "weight": 1 - elapsed / duration,
+                "limit": limit,
+                "expires": (window + 2) * duration,
+            },
+        ).fetchone()
+        if random.random() < PURGE_PROBABILITY:
+            connection.execute("DELETE FROM throttle WHERE expires < ?", (now,))
+        if allowed:
+            return Decision(True, 0.0)
+        return Decision(False, _wait(current, previous, limit, duration, elapsed))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM throttle")
+
+
+def _wait(current: int, previous: int, limit: int, duration: float, elapsed: float) -> float:
+    """Time until ``previous * weight + current`` drops below ``limit``."""
+
+    if current < limit:
+        # The previous window's share decays within this window.
+        weight = (limit - current) / previous
+        return max(duration * (1 - weight) - elapsed, 0.0)
+    # This window is full: wait for it to become the previous one and decay.
+    return duration - elapsed + duration * (1 - limit / current)
+
+
+_store: Optional[SlidingWindowStore] = None
+_store_lock = threading.Lock()
+
+
+def get_throttle_store() -> SlidingWindowStore:
+    """Return the process-wide store at ``THROTTLE_DB_PATH``."""
+
+    global _store
+    path = getattr(settings, "THROTTLE_DB_PATH", "throttle.sqlite3")
+    store = _store
+    if store is not None and store.path == path:
+        return store
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = SlidingWindowStore(path)
+        return _store
+
+
+__all__ = ["Decision", "SlidingWindowStore", "get_throttle_store"]
@@ -2,11 +2,18 @@
 
 from __future__ import annotations
 
+import heapq
+from contextlib import nullcontext
+from itertools import islice
 from dataclasses import dataclass
-from typing import List, Sequence
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db.models import QuerySet
 
+from . import timing, vectorized
 from .models import Number
 
 
@@ -17,7 +24,7 @@ class RankedNumber:
     cost: int
     distance: int
     similarity_score: float
-    created_at: "datetime"
+    created_at: datetime
 
     @property
     def full_number(self) -> str:
@@ -46,6 +53,109 @@ def levenshtein_distance(a: str, b: str) -> int:
     return previous_row[-1]
 
 
+class LevenshteinPattern:
+    """Pre-compiled query for the bit-parallel (Myers/Hyyrö) edit distance.
+
+    The per-character match bitmasks are computed once, after which every
+    candidate costs a few integer operations per character instead of a DP
+    row allocation.  Phone numbers are at most ten digits, so the bit-vectors
+    always fit in a machine word.
+    """
+
+    __slots__ = ("pattern", "_masks", "_all", "_high")
+
+    def __init__(self, pattern: str) -> None:
+        self.pattern = pattern
+        masks: Dict[str, int] = {}
+        for position, char in enumerate(pattern):
+            masks[char] = masks.get(char, 0) | (1 << position)
+        self._masks = masks
+        self._all = (1 << len(pattern)) - 1
+        self._high = 1 << (len(pattern) - 1) if pattern else 0
+
+    def distance(self, text: str, max_distance: Optional[int] = None) -> int:
+        """Return the edit distance to ``text``.
+
+        With ``max_distance`` the scan stops as soon as the result is known to
+        exceed the bound and ``max_distance + 1`` is returned instead.
+        """
+
+        score = len(self.pattern)
+        if max_distance is not None and abs(score - len(text)) > max_distance:
+            return max_distance + 1
+        if not score:
+            return len(text)
+        masks, full, high = self._masks, self._all, self._high
+        positive, negative = full, 0
+        remaining = len(text)
+        for char in text:
+            remaining -= 1
+            match = masks.get(char, 0)
+            vertical = match | negative
+            horizontal = (((match & positive) + positive) ^ positive) | match
+            plus = negative | ~(horizontal | positive)
+            minus = positive & horizontal
+            if plus & high:
+                score += 1
+            elif minus & high:
+                score -= 1
+            if max_distance is not None and score - remaining > max_distance:
+                # Each remaining column changes the score by at most one.
+                return max_distance + 1
+            plus = ((plus << 1) | 1) & full
+            minus = (minus << 1) & full
+            positive = (minus | ~(vertical | plus)) & full
+            negative = plus & vertical
+        return score
+
+    def substring_distance(self, text: str) -> int:
+        """Return the smallest edit distance to any substring of ``text``."""
+
+        return self.substring_match(text)[0]
+
+    def substring_match(self, text: str) -> Tuple[int, int]:
+        """Return the smallest edit distance to any substring of ``text`` and where the last such substring ends.
+
+        The same recurrence in search mode: the top row of the table is all
+        zeros, so no carry is shifted in and a match may start anywhere.  Run
+        on both strings reversed, the end gives the earliest start instead.
+        """
+
+        score = best = len(self.pattern)
+        end = len(text)
+        if not score:
+            return 0, end
+        masks, full, high = self._masks, self._all, self._high
+        positive, negative = full, 0
+        for column, char in enumerate(text, start=1):
+            match = masks.get(char, 0)
+            vertical = match | negative
+            horizontal = (((match & positive) + positive) ^ positive) | match
+            plus = negative | ~(horizontal | positive)
+            minus = positive & horizontal
+            if plus & high:
+                score += 1
+            elif minus & high:
+                score -= 1
+            if score <= best:
+                best, end = score, column
+            plus = (plus << 1) & full
+            minus = (minus << 1) & full
+            positive = (minus | ~(vertical | plus)) & full
+            negative = plus & vertical
+        return best, end
+
+
+def levenshtein_bitparallel(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """Drop-in bit-parallel alternative to :func:`levenshtein_distance`.
+
+    Compile a :class:`LevenshteinPattern` directly when scoring many
+    candidates against the same query.
+    """
+
+    return LevenshteinPattern(a).distance(b, max_distance)
+
+
 def trigram_set(value: str) -> set[str]:
     return {value[i : i + 3] for i in range(len(value) - 2)} if len(value) >= 3 else {value}
 
@@ -60,33 +170,285 @@ def trigram_jaccard(a: str, b: str) -> float:
     return intersection / union
 
 
-def _prepare_candidates(
+# Trigram bitset of every four-digit window: its two trigrams.
+_WINDOW_BITSETS = [(1 << (window // 10)) | (1 << (window % 1000)) for window in range(10_000)]
+
+
+def trigram_bitset(value: str) -> int:
+    """Encode the digit trigrams of ``value`` as bits of a 1000-bit integer.
+
+    Bit ``n`` is set when the three-digit run ``n`` occurs in ``value``.  For
+    digit strings of three or more characters :func:`bitset_jaccard` on two
+    bitsets equals :func:`trigram_jaccard` on the strings.  The bits are
+    looked up per overlapping four-digit window, so a ten-digit number takes
+    four table reads instead of eight substring conversions.
+    """
+
+    if len(value) < 3:
+        raise ValueError("Trigram bitsets require at least three digits.")
+    if len(value) == 3:
+        return 1 << int(value)
+    bits = _WINDOW_BITSETS[int(value[-4:])]
+    for start in range(0, len(value) - 4, 2):
+        bits |= _WINDOW_BITSETS[int(value[start : start + 4])]
+    return bits
+
+
+def bitset_jaccard(a: int, b: int) -> float:
+    """Return Jaccard similarity of two trigram bitsets."""
+
+    return (a & b).bit_count() / ((a | b).bit_count() or 1)
+
+
+def ranking_key(distance: int, similarity: float, cost: int, created_ts: float) -> Tuple[int, float, int, float]:
+    """Sort key shared by every ranking implementation.
+
+    Closer numbers first, then higher trigram similarity, cheaper cost and
+    finally the most recently created number.
+    """
+
+    return (distance, -similarity, cost, -created_ts)
+
+
+def result_payload(area_code: str, phone_number: str, cost: int, distance: int, similarity: float) -> dict:
+    return {
+        "area_code": area_code,
+        "phone_number": phone_number,
+        "full_number": f"{area_code}{phone_number}",
+        "cost": cost,
+        "distance": distance,
+        "similarity_score": round(similarity, 6),
+    }
+
+
+CandidateRow = Tuple[str, str, int, datetime]
+CANDIDATE_FIELDS = ("area_code", "phone_number", "cost", "created_at")
+
+
+def _iter_candidates(
     queryset: QuerySet[Number],
     query_area_code: str,
     query_phone_number: str,
     limit: int = 10,
-) -> Sequence[Number]:
-    full_number = f"{query_area_code}{query_phone_number}"
-    candidates: List[Number] = list(
-        queryset.with_area_code(query_area_code).exclude(area_code=query_area_code, phone_number=query_phone_number)
+    chunk_size: int = 2000,
+) -> Iterator[CandidateRow]:
+    """Yield candidate rows as value tuples without building model instances.
+
+    Every number in the query's area code is a candidate.  When that yields
+    fewer than ``limit`` rows, numbers from other area codes sharing the last
+    four digits are added, capped at ``limit * 5`` candidates in total.
+    """
+
+    primary = (
+        queryset.with_area_code(query_area_code)
+        .exclude(area_code=query_area_code, phone_number=query_phone_number)
+        .values_list(*CANDIDATE_FIELDS)
     )
+    produced = 0
+    for row in _timed_rows(primary.iterator(chunk_size=chunk_size), chunk_size, "area_code"):
+        produced += 1
+        yield row
 
-    if len(candidates) >= limit:
-        return candidates
+    if produced < limit:
+        yield from _fallback_candidates(queryset, query_area_code, query_phone_number, limit * 5 - produced, chunk_size)
+
+
+def _fallback_candidates(
+    queryset: QuerySet[Number],
+    query_area_code: str,
+    query_phone_number: str,
+    remaining: int,
+    chunk_size: int = 2000,
+) -> Iterator[CandidateRow]:
+    """Yield up to ``remaining`` numbers from other area codes sharing the last four digits."""
+
+    if remaining <= 0:
+        return
+    # Same-area-code matches are already part of the primary candidates.
+    extra = (
+        queryset.exclude(area_code=query_area_code)
+        .with_last_four(query_phone_number[-4:])
+        .values_list(*CANDIDATE_FIELDS)
+    )
+    yield from _timed_rows(islice(extra.iterator(chunk_size=chunk_size), remaining), chunk_size, "fallback")
+
+
+def _timed_rows(rows: Iterator[CandidateRow], chunk_size: int, source: str) -> Iterator[CandidateRow]:
+    """Yield ``rows``, charging the time spent reading them to the ``query_<source>`` stage.
+
+    Rows are pulled ``chunk_size`` at a time so the clock is read once per
+    chunk rather than once per row.
+    """
+
+    produced = 0
+    try:
+        while True:
+            with timing.stage(f"query_{source}"):
+                chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            produced += len(chunk)
+            yield from chunk
+    finally:
+        timing.count(source, produced)
+
+
+async def _aiterate(queryset: QuerySet, chunk_size: int, source: Optional[str] = None) -> AsyncIterator[tuple]:
+    """Stream a ``values_list`` queryset from async code, ``chunk_size`` rows per hop.
+
+    Django 4.2's ``QuerySet.aiterator`` executes ``values_list`` queries on the
+    event loop (their iterables are not generators) and fails with
+    ``SynchronousOnlyOperation``, so the sync iterator is advanced in a
+    thread-sensitive worker instead, exactly as ``aiterator`` intends.
+
+    With ``source`` the rows are timed and counted as in :func:`_timed_rows`.
+    """
+
+    rows = queryset.iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    produced = 0
+    try:
+        while True:
+            with timing.stage(f"query_{source}") if source else nullcontext():
+                chunk = await next_chunk()
+            if not chunk:
+                return
+            produced += len(chunk)
+            for row in chunk:
+                yield row
+    finally:
+        if source:
+            timing.count(source, produced)
+
+
+async def _aiter_candidates(
+    queryset: QuerySet[Number],
+    query_area_code: str,
+    query_phone_number: str,
+    limit: int = 10,
+    chunk_size: int = 2000,
+) -> AsyncIterator[CandidateRow]:
+    """Async counterpart of :func:`_iter_candidates`."""
+
+    primary = (
+        queryset.with_area_code(query_area_code)
+        .exclude(area_code=query_area_code, phone_number=query_phone_number)
+        .values_list(*CANDIDATE_FIELDS)
+    )
+    produced = 0
+    async for row in _aiterate(primary, chunk_size, "area_code"):
+        produced += 1
+        yield row
+
+    remaining = limit * 5 - produced
+    if produced < limit and remaining > 0:
+        extra = (
+            queryset.exclude(area_code=query_area_code)
+            .with_last_four(query_phone_number[-4:])
+            .values_list(*CANDIDATE_FIELDS)
+        )
+        async for row in _aiterate(extra[:remaining], chunk_size, "fallback"):
+            yield row
 
-    last_four = query_phone_number[-4:]
-    extra = queryset.exclude(area_code=query_area_code, phone_number=query_phone_number).with_last_four(last_four)
-    seen_ids = {c.id for c in candidates}
-    for candidate in extra:
-        if candidate.id in seen_ids:
-            continue
-        candidates.append(candidate)
-        seen_ids.add(candidate.id)
-        if len(candidates) >= limit * 5:
-            # avoid overly large in-memory sets; scoring will trim to limit
-            break
 
-    return candidates
+def _chunked(rows: Iterable[CandidateRow], size: int) -> Iterator[List[CandidateRow]]:
+    chunk: List[CandidateRow] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _TopK:
+    """Bounded heap holding the best ``limit`` ranked numbers seen so far.
+
+    The heap is ordered by the negated ranking key so its root is the current
+    worst entry; the arrival sequence breaks exact ties the same way a stable
+    sort of the full candidate list would.
+    """
+
+    __slots__ = ("limit", "_heap")
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._heap: List[tuple] = []
+
+    def distance_bound(self) -> Optional[int]:
+        """Largest distance that can still enter the heap, or ``None`` while not full."""
+
+        if len(self._heap) < self.limit:
+            return None
+        return -self._heap[0][0][0]
+
+    def push(self, key: Tuple[int, float, int, float], sequence: int, item: RankedNumber) -> None:
+        entry = (tuple(-part for part in key) + (-sequence,), item)
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[RankedNumber]:
+        return [item for _, item in self.entries()]
+
+    def entries(self) -> List[Tuple[int, RankedNumber]]:
+        """Return ``(sequence, item)`` pairs, best first, for merging partial results."""
+
+        ordered = sorted(self._heap, key=lambda entry: entry[0], reverse=True)
+        return [(-order[-1], item) for order, item in ordered]
+
+
+def _score_chunk(
+    top: _TopK,
+    chunk: Sequence[CandidateRow],
+    offset: int,
+    query_area_code: str,
+    query_phone_number: str,
+    pattern: LevenshteinPattern,
+    vectorize_threshold: Optional[int] = None,
+) -> None:
+    if vectorize_threshold is None:
+        vectorize_threshold = getattr(settings, "SEARCH_VECTORIZE_THRESHOLD", 256)
+    if vectorized.AVAILABLE and len(chunk) >= vectorize_threshold:
+        area_codes, phone_numbers, costs, created = zip(*chunk)
+        try:
+            rows = vectorized.rank_rows(
+                query_area_code,
+                query_phone_number,
+                area_codes,
+                phone_numbers,
+                costs,
+                [value.timestamp() for value in created],
+                top.limit,
+            )
+        except ValueError:
+            # Non-uniform lengths cannot be packed into a matrix; score row by row.
+            pass
+        else:
+            for row, distance, similarity in rows:
+                area_code, phone_number, cost, created_at = chunk[row]
+                top.push(
+                    ranking_key(distance, similarity, cost, created_at.timestamp()),
+                    offset + row,
+                    RankedNumber(area_code, phone_number, cost, distance, similarity, created_at),
+                )
+            return
+
+    query_bits = trigram_bitset(f"{query_area_code}{query_phone_number}")
+    for sequence, (area_code, phone_number, cost, created_at) in enumerate(chunk, start=offset):
+        bound = top.distance_bound()
+        distance = pattern.distance(phone_number, bound)
+        if bound is not None and distance > bound:
+            # Cannot beat the current k-th result; skip the similarity work.
+            continue
+        similarity = bitset_jaccard(query_bits, trigram_bitset(f"{area_code}{phone_number}"))
+        top.push(
+            ranking_key(distance, similarity, cost, created_at.timestamp()),
+            sequence,
+            RankedNumber(area_code, phone_number, cost, distance, similarity, created_at),
+        )
 
 
 def rank_related_numbers(
@@ -98,52 +460,209 @@ def rank_related_numbers(
     """Return related numbers ranked by similarity.
 
     This is the default Python implementation that works on SQLite and Postgres.
+    Candidates are streamed in chunks and only the best ``limit`` are kept, so
+    memory stays proportional to ``limit`` rather than to the area code size.
+    Area codes above ``SEARCH_PARALLEL_THRESHOLD`` rows are scored across a
+    process pool when ``SEARCH_PARALLEL_WORKERS`` is set (see
+    :mod:`shared.core.parallel`).
+    """
+
+    if limit <= 0:
+        return []
+    if getattr(settings, "SEARCH_PARALLEL_WORKERS", 0) > 0:
+        from . import parallel
+
+        with timing.stage("parallel"):
+            ranked = parallel.rank_sharded(queryset, query_area_code, query_phone_number, limit=limit)
+        if ranked is not None:
+            return ranked
+    chunk_size = getattr(settings, "SEARCH_CHUNK_SIZE", 2000)
+    candidates = _iter_candidates(queryset, query_area_code, query_phone_number, limit, chunk_size)
+    return rank_candidates(candidates, query_area_code, query_phone_number, limit=limit)
+
+
+def rank_candidates(
+    candidates: Iterable[CandidateRow],
+    query_area_code: str,
+    query_phone_number: str,
+    limit: int = 10,
+) -> List[dict]:
+    """Score an already selected stream of candidate rows and return the top ``limit``.
+
+    Exact ties keep the order in which candidates arrive.
+    """
+
+    if limit <= 0:
+        return []
+    chunk_size = getattr(settings, "SEARCH_CHUNK_SIZE", 2000)
+    pattern = LevenshteinPattern(query_phone_number)
+    top = _TopK(limit)
+
+    offset = 0
+    for chunk in _chunked(candidates, chunk_size):
+        with timing.stage("score"):
+            _score_chunk(top, chunk, offset, query_area_code, query_phone_number, pattern)
+        offset += len(chunk)
+
+    return _payloads(top)
+
+
+async def arank_related_numbers(
+    queryset: QuerySet[Number],
+    query_area_code: str,
+    query_phone_number: str,
+    limit: int = 10,
+) -> List[dict]:
+    """Async :func:`rank_related_numbers` for ASGI views.
+
+    Candidate chunks are fetched with the async ORM and each chunk is scored
+    in a thread outside the event loop, so the loop keeps serving other
+    requests both while the database works and while a dense area code is
+    scored.  Scoring holds no database connection and needs no particular
+    thread, so it does not queue behind the thread-sensitive worker.
+    """
+
+    if limit <= 0:
+        return []
+    chunk_size = getattr(settings, "SEARCH_CHUNK_SIZE", 2000)
+    pattern = LevenshteinPattern(query_phone_number)
+    top = _TopK(limit)
+    score = sync_to_async(_score_chunk, thread_sensitive=False)
+
+    offset = 0
+    chunk: List[CandidateRow] = []
+    async for row in _aiter_candidates(queryset, query_area_code, query_phone_number, limit, chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            with timing.stage("score"):
+                await score(top, chunk, offset, query_area_code, query_phone_number, pattern)
+            offset += len(chunk)
+            chunk = []
+    if chunk:
+        with timing.stage("score"):
+            await score(top, chunk, offset, query_area_code, query_phone_number, pattern)
+
+    return _payloads(top)
+
+
+def rank_within_distance(
+    query_area_code: str,
+    query_phone_number: str,
+    max_distance: int,
+    limit: int = 10,
+    offset: int = 0,
+) -> Tuple[List[dict], int]:
+    """Return one page of every number within ``max_distance`` edits, and the total.
+
+    Unlike :func:`rank_related_numbers` the search spans all area codes.  The
+    distance is measured on the local number, as everywhere else, and
+    candidates come from the position x digit bitmaps of
+    :func:`shared.core.patterns.get_pattern_index`, which rule out most rows
+    with a few bitwise operations per segment before any distance is
+    computed (see :meth:`~shared.core.patterns.PatternIndex.within_distance`).
+    Matches are ordered by :func:`ranking_key` with
+    ``(area_code, phone_number)`` breaking exact ties, which keeps pages
+    stable; only the distance groups overlapping the requested page are scored.
     """
 
-    candidates = _prepare_candidates(queryset, query_area_code, query_phone_number, limit)
-    query_full = f"{query_area_code}{query_phone_number}"
-
-    ranked: List[RankedNumber] = []
-    for candidate in candidates:
-        distance = levenshtein_distance(query_phone_number, candidate.phone_number)
-        similarity = trigram_jaccard(query_full, candidate.full_number)
-        ranked.append(
-            RankedNumber(
-                area_code=candidate.area_code,
-                phone_number=candidate.phone_number,
-                cost=candidate.cost,
-                distance=distance,
-                similarity_score=similarity,
-                created_at=candidate.created_at,
+    from .patterns import get_pattern_index
+
+    matches: Dict[int, List[tuple]] = {}
+    total = 0
+    for distance, row in get_pattern_index().within_distance(query_phone_number, max_distance):
+        if row[0] == query_area_code and row[1] == query_phone_number:
+            continue
+        matches.setdefault(distance, []).append(row)
+        total += 1
+
+    query_bits = trigram_bitset(f"{query_area_code}{query_phone_number}")
+    page: List[dict] = []
+    start = 0
+    for distance in sorted(matches):
+        group = matches[distance]
+        end = start + len(group)
+        if end > offset and start < offset + limit:
+            scored = sorted(
+                (
+                    ranking_key(distance, similarity, cost, created_ts) + (area_code, phone_number),
+                    similarity,
+                )
+                for area_code, phone_number, cost, created_ts in group
+                for similarity in (bitset_jaccard(query_bits, trigram_bitset(f"{area_code}{phone_number}")),)
             )
-        )
+            for key, similarity in scored[max(offset - start, 0) : offset + limit - start]:
+                page.append(result_payload(key[4], key[5], key[2], distance, similarity))
+        start = end
+        if start >= offset + limit:
+            break
+    return page, total
 
-    ranked.sort(
-        key=lambda item: (
-            item.distance,
-            -item.similarity_score,
-            item.cost,
-            -item.created_at.timestamp(),
-        )
-    )
 
-    results = []
-    for item in ranked[:limit]:
-        results.append(
-            {
-                "area_code": item.area_code,
-                "phone_number": item.phone_number,
-                "full_number": item.full_number,
-                "cost": item.cost,
-                "distance": item.distance,
-                "similarity_score": round(item.similarity_score, 6),
-            }
-        )
-    return results
+def rank_related_numbers_batch(
+    queryset: QuerySet[Number],
+    queries: Sequence[Tuple[str, str]],
+    limit: int = 10,
+) -> List[List[dict]]:
+    """Rank several ``(area_code, phone_number)`` queries at once.
+
+    Queries are grouped by area code and each area code's candidates are read
+    from the database once, then scored against every query in the group.
+    Results are returned in input order and match :func:`rank_related_numbers`
+    for each query.
+    """
+
+    unique = list(dict.fromkeys(queries))
+    if limit <= 0:
+        return [[] for _ in queries]
+    chunk_size = getattr(settings, "SEARCH_CHUNK_SIZE", 2000)
+    tops = {query: _TopK(limit) for query in unique}
+    patterns = {query: LevenshteinPattern(query[1]) for query in unique}
+    produced = dict.fromkeys(unique, 0)
+
+    by_area: Dict[str, List[Tuple[str, str]]] = {}
+    for query in unique:
+        by_area.setdefault(query[0], []).append(query)
+
+    for area_code, group in by_area.items():
+        rows = queryset.with_area_code(area_code).values_list(*CANDIDATE_FIELDS)
+        for chunk in _chunked(rows.iterator(chunk_size=chunk_size), chunk_size):
+            for query in group:
+                own = [row for row in chunk if row[1] != query[1]]
+                _score_chunk(tops[query], own, produced[query], area_code, query[1], patterns[query])
+                produced[query] += len(own)
+        for query in group:
+            if produced[query] >= limit:
+                continue
+            fallback = _fallback_candidates(queryset, area_code, query[1], limit * 5 - produced[query], chunk_size)
+            offset = produced[query]
+            for chunk in _chunked(fallback, chunk_size):
+                _score_chunk(tops[query], chunk, offset, area_code, query[1], patterns[query])
+                offset += len(chunk)
+
+    results = {query: _payloads(top) for query, top in tops.items()}
+    return [results[query] for query in queries]
+
+
+def _payloads(top: _TopK) -> List[dict]:
+    return [
+        result_payload(item.area_code, item.phone_number, item.cost, item.distance, item.similarity_score)
+        for item in top.items()
+    ]
 
 
 __all__ = [
+    "CandidateRow",
+    "arank_related_numbers",
+    "rank_candidates",
     "rank_related_numbers",
+    "rank_related_numbers_batch",
+    "rank_within_distance",
+    "ranking_key",
+    "result_payload",
     "levenshtein_distance",
+    "levenshtein_bitparallel",
+    "LevenshteinPattern",
     "trigram_jaccard",
+    "trigram_bitset",
+    "bitset_jaccard",
 ]
@@ -0,0 +1,257 @@
+"""Versioned cache for related-number search results.
+
+A cached result is keyed by the query and by two data versions: one for the
+query's area code and one for its last four digits (the fallback reads other
+area codes by last four).  Every write to ``Number`` replaces both versions
+for the old and the new values of the row once the transaction commits, so a
+result is never served after the data it was computed from has changed and
+no TTL has to be guessed.
+
+A third, dataset-wide version changes with every write.  It is what
+conditional requests for whole-inventory listings such as ``/v1/prefixes``
+are validated against, without a database query.
+
+Versions are random tokens rather than counters: the file-based cache has no
+atomic increment, and a token can never collide with an earlier version, not
+even after the version entry itself has been culled.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .backends import get_backend
+from .caching import CacheEntry, Fetched, aget_or_refresh, get_or_refresh
+from .models import Number
+
+NumberKey = Tuple[str, str]
+
+DATASET_VERSION_KEY = "search:v:dataset"
+
+_local = threading.local()
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters for this process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+stats = CacheStats()
+
+
+def _cache():
+    return caches[getattr(settings, "SEARCH_CACHE_ALIAS", "search")]
+
+
+def _version_keys(area_code: str, phone_number: str) -> Tuple[str, str]:
+    return f"search:v:area:{area_code}", f"search:v:last4:{phone_number[-4:]}"
+
+
+def _result_key(area_code: str, phone_number: str, limit: int, versions: Dict[str, str]) -> str:
+    area_version, last_four_version = (versions[key] for key in _version_keys(area_code, phone_number))
+    return f"search:r:{area_code}:{phone_number}:{limit}:{area_version}:{last_four_version}"
+
+
+def _current_versions(keys: Sequence[str]) -> Dict[str, str]:
+    cache = _cache()
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+async def _acurrent_versions(keys: Sequence[str]) -> Dict[str, str]:
+    cache = _cache()
+    versions = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+        versions.update(await cache.aget_many(missing))
+    return versions
+
+
+def bump_versions(numbers: Iterable[NumberKey]) -> None:
+    """Invalidate cached results that may depend on the given numbers.
+
+    Inside :func:`deferred_version_bumps` the numbers are only collected.
+    Otherwise the versions are replaced when the current transaction commits,
+    so no reader can cache pre-commit data under the new versions.
+    """
+
+    pending: Optional[Set[NumberKey]] = getattr(_local, "pending", None)
+    if pending is not None:
+        pending.update(numbers)
+        return
+    keys = {key for number in numbers for key in _version_keys(*number)}
+    if keys:
+        _bump_on_commit(keys | {DATASET_VERSION_KEY})
+
+
+def bump_dataset_version() -> None:
+    """Replace only the dataset-wide version once the current transaction commits.
+
+    For writes that change derived data such as ``AreaCodeStats`` without
+    touching a number.
+    """
+
+    _bump_on_commit({DATASET_VERSION_KEY})
+
+
+def _bump_on_commit(keys: Set[str]) -> None:
+    def apply() -> None:
+        token = uuid.uuid4().hex
+        _cache().set_many({key: token for key in keys}, timeout=None)
+
+    transaction.on_commit(apply)
+
+
+def dataset_version() -> str:
+    """Return the current dataset-wide version token."""
+
+    return _current_versions([DATASET_VERSION_KEY])[DATASET_VERSION_KEY]
+
+
+async def adataset_version() -> str:
+    """Async :func:`dataset_version`."""
+
+    return (await _acurrent_versions([DATASET_VERSION_KEY]))[DATASET_VERSION_KEY]
+
+
+@contextmanager
+def deferred_version_bumps() -> Iterator[None]:
+    """Coalesce the version bumps made inside the block into a single write.
+
+    Used by bulk paths such as the admin upload, which would otherwise bump
+    once per saved row.
+    """
+
+    if getattr(_local, "pending", None) is not None:
+        yield
+        return
+    _local.pending = set()
+    try:
+        yield
+    finally:
+        pending, _local.pending = _local.pending, None
+        bump_versions(pending)
+
+
+def _timeout() -> int:
+    return getattr(settings, "SEARCH_CACHE_TIMEOUT", 86400)
+
+
+def _record(fetched: Fetched) -> None:
+    computed = fetched.status == "miss"
+    stats.record(hits=int(not computed), misses=int(computed))
+
+
+def search_related(area_code: str, phone_number: str, limit: int = 10) -> List[dict]:
+    """Cached equivalent of ``get_backend().rank(Number.objects.all(), ...)``.
+
+    Concurrent misses for the same query are computed once (see
+    :func:`shared.core.caching.get_or_refresh`).  The versions are part of
+    the key, so an entry is never served stale.
+    """
+
+    backend = get_backend()
+    queryset = Number.objects.all()
+    if not backend.cacheable:
+        return backend.rank(queryset, area_code, phone_number, limit=limit)
+    key = _result_key(area_code, phone_number, limit, _current_versions(_version_keys(area_code, phone_number)))
+    fetched = get_or_refresh(
+        _cache(),
+        key,
+        lambda: backend.rank(queryset, area_code, phone_number, limit=limit),
+        timeout=_timeout(),
+        stale_timeout=0,
+    )
+    _record(fetched)
+    return fetched.value
+
+
+def search_related_many(queries: Sequence[NumberKey], limit: int = 10) -> List[List[dict]]:
+    """Cached equivalent of ``get_backend().rank_many(Number.objects.all(), ...)``."""
+
+    backend = get_backend()
+    if not backend.cacheable:
+        return backend.rank_many(Number.objects.all(), queries, limit=limit)
+    cache = _cache()
+    unique = list(dict.fromkeys(queries))
+    versions = _current_versions(sorted({key for query in unique for key in _version_keys(*query)}))
+    result_keys = {query: _result_key(*query, limit, versions) for query in unique}
+
+    results = {
+        key: entry.value
+        for key, entry in cache.get_many(list(result_keys.values())).items()
+        if isinstance(entry, CacheEntry)
+    }
+    missing = [query for query in unique if result_keys[query] not in results]
+    stats.record(hits=len(unique) - len(missing), misses=len(missing))
+    if missing:
+        computed = backend.rank_many(Number.objects.all(), missing, limit=limit)
+        fresh = {result_keys[query]: ranked for query, ranked in zip(missing, computed)}
+        fresh_until = time.time() + _timeout()
+        cache.set_many(
+            {key: CacheEntry(value=ranked, version="", fresh_until=fresh_until) for key, ranked in fresh.items()},
+            timeout=_timeout(),
+        )
+        results.update(fresh)
+    return [results[result_keys[query]] for query in queries]
+
+
+async def asearch_related(area_code: str, phone_number: str, limit: int = 10) -> List[dict]:
+    """Async :func:`search_related` for ASGI views."""
+
+    backend = get_backend()
+    queryset = Number.objects.all()
+    if not backend.cacheable:
+        return await backend.arank(queryset, area_code, phone_number, limit=limit)
+    key = _result_key(area_code, phone_number, limit, await _acurrent_versions(_version_keys(area_code, phone_number)))
+    fetched = await aget_or_refresh(
+        _cache(),
+        key,
+        lambda: backend.arank(queryset, area_code, phone_number, limit=limit),
+        timeout=_timeout(),
+        stale_timeout=0,
+    )
+    _record(fetched)
+    return fetched.value
+
+
+__all__ = [
+    "DATASET_VERSION_KEY",
+    "adataset_version",
+    "asearch_related",
+    "bump_dataset_version",
+    "bump_versions",
+    "dataset_version",
+    "deferred_version_bumps",
+    "search_related",
+    "search_related_many",
+    "stats",
+]
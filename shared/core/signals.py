@@ -0,0 +1,68 @@
+"""Signal handlers keeping derived search structures in sync with ``Number``."""
+
+from __future__ import annotations
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .index import invalidate_number_index
+from .models import Number
+from .patterns import invalidate_pattern_index
+from .querylog import install as install_query_accounting
+from .search import levenshtein_bitparallel, trigram_jaccard
+from .search_cache import bump_versions
+from .snapshot import record_tombstones
+from .stats import record_number_change
+from .vanity import invalidate_vanity_index
+
+
+@receiver(post_save, sender=Number, dispatch_uid="core.number_saved")
+@receiver(post_delete, sender=Number, dispatch_uid="core.number_deleted")
+def number_changed(sender, instance: Number, signal, **kwargs) -> None:
+    invalidate_number_index()
+    invalidate_pattern_index()
+    invalidate_vanity_index()
+    current = (instance.area_code, instance.phone_number)
+    loaded = getattr(instance, "_loaded_key", None)
+    removed = set()
+    if signal is post_delete:
+        removed.add(current)
+    if loaded is not None and loaded != current:
+        # Re-keyed (or deleted after an unsaved re-key): the stored key is gone too.
+        removed.add(loaded)
+    record_tombstones(removed)
+    _record_stats(instance, signal, kwargs.get("created", False))
+    instance._loaded_key = current
+    instance._loaded_cost = instance.cost
+    bump_versions({current} | removed)
+
+
+def _record_stats(instance: Number, signal, created: bool) -> None:
+    loaded_key = getattr(instance, "_loaded_key", None)
+    loaded_cost = getattr(instance, "_loaded_cost", None)
+    stored = (loaded_key[0], loaded_cost) if loaded_key is not None and loaded_cost is not None else None
+    if signal is post_delete:
+        record_number_change(removed=stored or (instance.area_code, instance.cost))
+    elif created:
+        record_number_change(added=(instance.area_code, instance.cost))
+    elif stored is None:
+        # Saved without having been loaded: the previous row is unknown.
+        record_number_change(stale=[instance.area_code])
+    elif stored != (instance.area_code, instance.cost):
+        record_number_change(added=(instance.area_code, instance.cost), removed=stored)
+
+
+@receiver(connection_created, dispatch_uid="core.sqlite_search_functions")
+def register_sqlite_functions(sender, connection, **kwargs) -> None:
+    """Expose the ranking primitives to SQL for the ``sqlite`` search backend."""
+
+    if connection.vendor != "sqlite":
+        return
+    connection.connection.create_function("levenshtein", 2, levenshtein_bitparallel, deterministic=True)
+    connection.connection.create_function("core_trigram_jaccard", 2, trigram_jaccard, deterministic=True)
+
+
+@receiver(connection_created, dispatch_uid="core.query_accounting")
+def account_queries(sender, connection, **kwargs) -> None:
+    install_query_accounting(connection)
@@ -0,0 +1,319 @@
+"""Read-optimised, incrementally refreshed snapshot of the ``Number`` table.
+
+The inventory changes a few times a minute but is read on every request.
+:class:`NumberSnapshot` keeps all numbers in memory as compact column arrays
+grouped by area code, which is enough to answer related-number search and
+prefix counts without touching the database.
+
+The data of a snapshot is immutable.  A refresh reads the rows whose
+``updated_at`` moved past the snapshot's watermark plus the
+:class:`~shared.core.models.NumberTombstone` rows recorded for deletes,
+copies only the affected area codes and publishes the new snapshot with a
+single reference swap, so readers never observe a half-applied refresh.  A
+poll that finds nothing new only advances the snapshot's ``polled_at``.
+Polls run in a background thread (see :mod:`shared.core.background`), never
+on the request path once the first snapshot exists.  Local numbers are
+stored as integers, so the snapshot relies on the seven-digit validation
+applied to ``Number``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+from .background import BackgroundIndex
+from .models import Number, NumberTombstone
+from .search import CandidateRow, rank_candidates
+
+_SUFFIX = 10_000
+_LOCAL = 10_000_000
+
+
+def _local_number(value: int) -> str:
+    return f"{value:07d}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(dt_timezone.utc)
+
+
+def _created_at(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+class AreaColumns:
+    """Numbers of one area code as parallel arrays sorted by local number.
+
+    ``by_suffix`` holds ``last_four * 10**7 + local_number`` for every row,
+    sorted, so numbers sharing their last four digits form a contiguous run.
+    """
+
+    __slots__ = ("numbers", "costs", "created", "by_suffix")
+
+    def __init__(self, rows: Iterable[Tuple[int, int, float]]) -> None:
+        ordered = sorted(rows)
+        self.numbers = array("I", (row[0] for row in ordered))
+        self.costs = array("I", (row[1] for row in ordered))
+        self.created = array("d", (row[2] for row in ordered))
+        self.by_suffix = array("Q", sorted((number % _SUFFIX) * _LOCAL + number for number in self.numbers))
+
+    @classmethod
+    def from_buffers(cls, numbers, costs, created, by_suffix) -> "AreaColumns":
+        """Wrap existing column buffers (e.g. memoryviews over a mapped file) without copying."""
+
+        columns = cls.__new__(cls)
+        columns.numbers, columns.costs, columns.created, columns.by_suffix = numbers, costs, created, by_suffix
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def __contains__(self, number: int) -> bool:
+        position = bisect_left(self.numbers, number)
+        return position < len(self.numbers) and self.numbers[position] == number
+
+    def rows(self) -> Iterator[Tuple[int, int, float]]:
+        return zip(self.numbers, self.costs, self.created)
+
+    def with_suffix(self, last_four: int) -> Iterator[int]:
+        """Yield local numbers ending in ``last_four``, in ascending order."""
+
+        position = bisect_left(self.by_suffix, last_four * _LOCAL)
+        while position < len(self.by_suffix) and self.by_suffix[position] // _LOCAL == last_four:
+            yield self.by_suffix[position] % _LOCAL
+            position += 1
+
+    def row(self, number: int) -> Tuple[int, float]:
+        position = bisect_left(self.numbers, number)
+        return self.costs[position], self.created[position]
+
+    def merged(self, upserts: Dict[int, Tuple[int, float]], removals: Set[int]) -> "AreaColumns":
+        """Return a copy with ``removals`` dropped and ``upserts`` applied."""
+
+        rows = {number: (cost, created) for number, cost, created in self.rows() if number not in removals}
+        rows.update(upserts)
+        return AreaColumns((number, cost, created) for number, (cost, created) in rows.items())
+
+
+class NumberSnapshot:
+    """Immutable view of the whole inventory as of ``watermark``.
+
+    ``polled_at`` is the one mutable field: the poller advances it when a
+    poll finds no change, so the snapshot and every index built from it
+    stay in use.
+    """
+
+    def __init__(
+        self, areas: Dict[str, AreaColumns], watermark: Optional[datetime], polled_at: Optional[datetime] = None
+    ) -> None:
+        self.areas = areas
+        self.watermark = watermark
+        # Wall-clock start of the last successful poll.  Tombstone retention is
+        # measured from here: the watermark only moves when the data does.
+        self.polled_at = polled_at
+        self._area_codes = sorted(areas)
+        self._prefix_counts: Optional[List[Tuple[str, int]]] = None
+        self._prefix_version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return sum(len(columns) for columns in self.areas.values())
+
+    @classmethod
+    def build(cls) -> "NumberSnapshot":
+        polled_at = _utcnow()
+        grouped: Dict[str, List[Tuple[int, int, float]]] = {}
+        watermark = None
+        rows = Number.objects.order_by().values_list("area_code", "phone_number", "cost", "created_at", "updated_at")
+        for area_code, phone_number, cost, created_at, updated_at in rows.iterator(chunk_size=5000):
+            grouped.setdefault(area_code, []).append((int(phone_number), cost, created_at.timestamp()))
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+        latest_tombstone = NumberTombstone.objects.order_by("-deleted_at").values_list("deleted_at", flat=True).first()
+        if latest_tombstone is not None and (watermark is None or latest_tombstone > watermark):
+            watermark = latest_tombstone
+        return cls({area_code: AreaColumns(rows) for area_code, rows in grouped.items()}, watermark, polled_at)
+
+    def refreshed(self) -> "NumberSnapshot":
+        """Return a snapshot including every change since this one's watermark.
+
+        The poll reaches ``SEARCH_SNAPSHOT_OVERLAP`` seconds behind the
+        watermark so rows committed after their ``updated_at`` was stamped are
+        not missed.  ``updated_at`` is stamped when a row is saved, not when its
+        transaction commits, so the overlap must cover the longest write
+        transaction (a bulk upload holds one transaction for the whole file).
+
+        Re-read rows that match what the snapshot already holds are ignored,
+        so a poll that finds nothing new returns this snapshot itself.
+        """
+
+        polled_at = _utcnow()
+        if self.watermark is None or self.polled_at is None:
+            return self.build()
+        retention = timedelta(seconds=getattr(settings, "SEARCH_TOMBSTONE_RETENTION", 86400))
+        if polled_at - self.polled_at > retention:
+            # Deletes since the last poll may only be in tombstones pruned since.
+            return self.build()
+
+        since = self.watermark - timedelta(seconds=getattr(settings, "SEARCH_SNAPSHOT_OVERLAP", 60))
+        watermark = self.watermark
+        removals: Dict[str, Set[int]] = {}
+        for area_code, phone_number, deleted_at in NumberTombstone.objects.filter(deleted_at__gt=since).values_list(
+            "area_code", "phone_number", "deleted_at"
+        ):
+            removals.setdefault(area_code, set()).add(int(phone_number))
+            watermark = max(watermark, deleted_at)
+        upserts: Dict[str, Dict[int, Tuple[int, float]]] = {}
+        for area_code, phone_number, cost, created_at, updated_at in Number.objects.filter(
+            updated_at__gt=since
+        ).values_list("area_code", "phone_number", "cost", "created_at", "updated_at"):
+            upserts.setdefault(area_code, {})[int(phone_number)] = (cost, created_at.timestamp())
+            watermark = max(watermark, updated_at)
+
+        areas = dict(self.areas)
+        changed = False
+        for area_code in removals.keys() | upserts.keys():
+            current = areas.get(area_code) or AreaColumns(())
+            area_upserts = upserts.get(area_code, {})
+            area_removals = removals.get(area_code, set()) - area_upserts.keys()
+            if all(number in current and current.row(number) == row for number, row in area_upserts.items()) and not any(
+                number in current for number in area_removals
+            ):
+                continue
+            changed = True
+            columns = current.merged(area_upserts, area_removals)
+            if len(columns):
+                areas[area_code] = columns
+            else:
+                areas.pop(area_code, None)
+        if not changed:
+            self.polled_at = polled_at
+            return self
+        return NumberSnapshot(areas, watermark, polled_at)
+
+    def rows(self) -> Iterator[Tuple[str, str, int, float]]:
+        """Yield ``(area_code, phone_number, cost, created_at timestamp)`` in key order."""
+
+        for area_code in self._area_codes:
+            for number, cost, created in self.areas[area_code].rows():
+                yield area_code, _local_number(number), cost, created
+
+    def candidates(self, query_area_code: str, query_phone_number: str, limit: int = 10) -> Iterator[CandidateRow]:
+        """Yield the same candidate rows, in the same order, as the database path."""
+
+        produced = 0
+        columns = self.areas.get(query_area_code)
+        if columns is not None:
+            for number, cost, created in columns.rows():
+                phone_number = _local_number(number)
+                if phone_number == query_phone_number:
+                    continue
+                produced += 1
+                yield query_area_code, phone_number, cost, _created_at(created)
+        if produced >= limit:
+            return
+
+        remaining = limit * 5 - produced
+        last_four = int(query_phone_number[-4:])
+        for area_code in self._area_codes:
+            if area_code == query_area_code:
+                continue
+            other = self.areas[area_code]
+            for number in other.with_suffix(last_four):
+                if remaining <= 0:
+                    return
+                cost, created = other.row(number)
+                remaining -= 1
+                yield area_code, _local_number(number), cost, _created_at(created)
+
+    def rank(self, query_area_code: str, query_phone_number: str, limit: int = 10) -> List[dict]:
+        """Rank related numbers exactly like :func:`shared.core.search.rank_related_numbers`."""
+
+        return rank_candidates(
+            self.candidates(query_area_code, query_phone_number, limit),
+            query_area_code,
+            query_phone_number,
+            limit=limit,
+        )
+
+    def prefix_counts(self, query: Optional[str] = None) -> List[Tuple[str, int]]:
+        """Return ``(area_code, count)`` pairs ordered by count desc, then area code."""
+
+        if self._prefix_counts is None:
+            self._prefix_counts = sorted(
+                ((area_code, len(columns)) for area_code, columns in self.areas.items()),
+                key=lambda item: (-item[1], item[0]),
+            )
+        if not query:
+            return self._prefix_counts
+        return [item for item in self._prefix_counts if item[0].startswith(query)]
+
+    def prefix_version(self) -> str:
+        """Return a digest of :meth:`prefix_counts`, equal across processes holding the same counts."""
+
+        if self._prefix_version is None:
+            self._prefix_version = hashlib.blake2b(repr(self.prefix_counts()).encode(), digest_size=16).hexdigest()
+        return self._prefix_version
+
+
+class _SnapshotHolder(BackgroundIndex[NumberSnapshot]):
+    """Holds the process-wide snapshot; ``build`` derives the next snapshot from the current one."""
+
+    def ttl(self) -> float:
+        return getattr(settings, "SEARCH_SNAPSHOT_INTERVAL", 5)
+
+    def _rebuilt(self) -> NumberSnapshot:
+        return NumberSnapshot.build() if self._value is None else self._build(self._value)
+
+
+_holder = _SnapshotHolder("snapshot", NumberSnapshot.refreshed)
+
+
+def get_number_snapshot() -> NumberSnapshot:
+    """Return the process-wide snapshot, polled for changes every ``SEARCH_SNAPSHOT_INTERVAL`` seconds.
+
+    Only the very first build blocks; later polls run in a background thread
+    while readers keep the previous snapshot.
+    """
+
+    return _holder.get()
+
+
+def refresh_number_snapshot() -> NumberSnapshot:
+    """Poll for changes now, waiting for a poll already in progress, and return the snapshot."""
+
+    return _holder.refresh()
+
+
+def reset_number_snapshot() -> None:
+    """Drop the snapshot so the next read rebuilds it from scratch."""
+
+    _holder.reset()
+
+
+def record_tombstones(keys: Iterable[Tuple[str, str]]) -> None:
+    """Record removed ``(area_code, phone_number)`` keys and prune expired tombstones."""
+
+    keys = list(keys)
+    if not keys:
+        return
+    NumberTombstone.objects.bulk_create(
+        [NumberTombstone(area_code=area_code, phone_number=phone_number) for area_code, phone_number in keys]
+    )
+    retention = timedelta(seconds=getattr(settings, "SEARCH_TOMBSTONE_RETENTION", 86400))
+    NumberTombstone.objects.filter(deleted_at__lt=_utcnow() - retention).delete()
+
+
+__all__ = [
+    "AreaColumns",
+    "NumberSnapshot",
+    "get_number_snapshot",
+    "record_tombstones",
+    "refresh_number_snapshot",
+    "reset_number_snapshot",
+]
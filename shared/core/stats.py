@@ -0,0 +1,165 @@
+"""Incremental maintenance of :class:`~shared.core.models.AreaCodeStats`.
+
+Every write to ``Number`` is turned into a per-area-code delta by the signal
+handlers and applied to that area code's row under a row lock, in the
+writer's transaction.  Counts and cost totals are exact deltas; the cost
+extremes only need an aggregate over the area code when a removed cost was
+the stored minimum or maximum.  Writes whose previous state is unknown mark
+their area code for an exact recount instead.
+
+Bulk paths wrap their writes in :func:`deferred_stats_updates` so each area
+code is updated once, and ``bulk_create`` callers (which send no signals)
+call :func:`refresh_area_code_stats`.  ``manage.py reconcile_area_code_stats``
+repairs any drift.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from .models import AreaCodeStats, Number
+
+CostEntry = Tuple[str, int]
+
+_local = threading.local()
+
+
+@dataclass(slots=True)
+class _Delta:
+    count: int = 0
+    total: int = 0
+    low: Optional[int] = None
+    high: Optional[int] = None
+    removed: Set[int] = field(default_factory=set)
+    stale: bool = False
+
+    def add(self, cost: int) -> None:
+        self.count += 1
+        self.total += cost
+        self.low = cost if self.low is None else min(self.low, cost)
+        self.high = cost if self.high is None else max(self.high, cost)
+
+    def remove(self, cost: int) -> None:
+        self.count -= 1
+        self.total -= cost
+        self.removed.add(cost)
+
+
+def record_number_change(
+    added: Optional[CostEntry] = None,
+    removed: Optional[CostEntry] = None,
+    stale: Iterable[str] = (),
+) -> None:
+    """Account for one number write.
+
+    ``added`` and ``removed`` are ``(area_code, cost)`` pairs of the row
+    after and before the write; ``stale`` lists area codes to recount.
+    """
+
+    pending: Optional[Dict[str, _Delta]] = getattr(_local, "pending", None)
+    deltas = pending if pending is not None else {}
+    if removed is not None:
+        deltas.setdefault(removed[0], _Delta()).remove(removed[1])
+    if added is not None:
+        deltas.setdefault(added[0], _Delta()).add(added[1])
+    for area_code in stale:
+        deltas.setdefault(area_code, _Delta()).stale = True
+    if pending is None:
+        _apply(deltas)
+
+
+@contextmanager
+def deferred_stats_updates() -> Iterator[None]:
+    """Collect the changes made inside the block and apply them once per area code.
+
+    Must be entered inside the transaction doing the writes.  Nothing is
+    applied when that transaction is already marked for rollback (e.g. a
+    dry-run upload).
+    """
+
+    if getattr(_local, "pending", None) is not None:
+        yield
+        return
+    _local.pending = {}
+    try:
+        yield
+    finally:
+        pending, _local.pending = _local.pending, None
+    if not transaction.get_rollback():
+        _apply(pending)
+
+
+def _apply(deltas: Dict[str, _Delta]) -> None:
+    stale = [area_code for area_code, delta in deltas.items() if delta.stale]
+    with transaction.atomic():
+        for area_code in sorted(deltas):
+            delta = deltas[area_code]
+            if delta.stale:
+                continue
+            AreaCodeStats.objects.get_or_create(area_code=area_code)
+            stats = AreaCodeStats.objects.select_for_update().get(area_code=area_code)
+            stats.count += delta.count
+            stats.total_cost += delta.total
+            if stats.count <= 0 or stats.total_cost < 0:
+                if stats.count < 0 or stats.total_cost < 0:
+                    # The row had drifted; recount instead of storing nonsense.
+                    stale.append(area_code)
+                else:
+                    stats.delete()
+                continue
+            if stats.min_cost in delta.removed or stats.max_cost in delta.removed:
+                extremes = Number.objects.filter(area_code=area_code).aggregate(low=Min("cost"), high=Max("cost"))
+                stats.min_cost, stats.max_cost = extremes["low"], extremes["high"]
+            elif delta.low is not None:
+                stats.min_cost = delta.low if stats.min_cost is None else min(stats.min_cost, delta.low)
+                stats.max_cost = delta.high if stats.max_cost is None else max(stats.max_cost, delta.high)
+            stats.save()
+        if stale:
+            refresh_area_code_stats(stale)
+
+
+def refresh_area_code_stats(area_codes: Optional[Iterable[str]] = None) -> List[str]:
+    """Recompute stats from ``Number`` and return the area codes whose row changed.
+
+    ``None`` recomputes every area code, which is what the reconcile command
+    does.
+    """
+
+    numbers = Number.objects.order_by()
+    existing = AreaCodeStats.objects.all()
+    if area_codes is not None:
+        area_codes = sorted(set(area_codes))
+        numbers = numbers.filter(area_code__in=area_codes)
+        existing = existing.filter(area_code__in=area_codes)
+    fields = ("count", "total_cost", "min_cost", "max_cost")
+    changed = []
+    with transaction.atomic():
+        stored = {stats.area_code: stats for stats in existing.select_for_update()}
+        actual = {
+            row["area_code"]: row
+            for row in numbers.values("area_code").annotate(
+                count=Count("id"), total_cost=Sum("cost"), min_cost=Min("cost"), max_cost=Max("cost")
+            )
+        }
+        for area_code, stats in stored.items():
+            if area_code not in actual:
+                stats.delete()
+                changed.append(area_code)
+        for area_code, row in actual.items():
+            stats = stored.get(area_code)
+            if stats is not None and all(getattr(stats, name) == row[name] for name in fields):
+                continue
+            AreaCodeStats.objects.update_or_create(
+                area_code=area_code, defaults={name: row[name] for name in fields}
+            )
+            changed.append(area_code)
+    return sorted(changed)
+
+
+__all__ = ["deferred_stats_updates", "record_number_change", "refresh_area_code_stats"]
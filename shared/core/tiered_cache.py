@@ -0,0 +1,274 @@
+"""Two-tier Django cache backend: an in-process LRU (L1) in front of a shared cache (L2).
+
+Reads from the file-based cache cost a file open, an unpickle and, on
+writes, sometimes a cull of the whole directory.  :class:`TieredCache` keeps
+recently read entries in a bounded, per-process LRU for at most
+``L1_TIMEOUT`` seconds and only goes to L2 on an L1 miss.  Writes always go
+straight to L2.
+
+Workers on the same host learn about each other's writes through a version
+broadcast: a small memory-mapped file of counters shared by every process
+using the same L2.  Each key hashes to one counter, every write bumps it,
+and an L1 entry is only served while its counter still has the value read
+before the entry was fetched from L2.  A hash collision costs an extra L2
+read, never a stale value.  Processes on other hosts do not share the file;
+for them ``L1_TIMEOUT`` bounds how long a stale entry can be served.
+
+Two consequences of the L1 timeout are deliberate:
+
+* L2 misses are cached too, so a key that is absent from L2 is reported
+  missing for up to ``L1_TIMEOUT`` seconds after another host sets it
+  (writers on this host drop the miss through the broadcast as usual).
+* An L1 entry lives for ``L1_TIMEOUT`` seconds regardless of the L2 entry's
+  own timeout, which generic backends do not expose on reads.  An entry
+  whose L2 timeout ends sooner can still be served from L1 until then, so
+  keys that must expire on time should be read through ``TieredCache.l2``
+  or given timeouts well above ``L1_TIMEOUT``.
+
+Configure it in ``CACHES`` around any other backend::
+
+    "default": {
+        "BACKEND": "shared.core.tiered_cache.TieredCache",
+        "OPTIONS": {
+            "L2": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/var/cache/app"},
+            "L1_MAX_ENTRIES": 1000,
+            "L1_TIMEOUT": 5,
+        },
+    }
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+BROADCAST_SLOTS = 4096
+_SLOT_SIZE = 8
+_MISSING = object()
+
+
+class VersionBroadcast:
+    """Per-key write counters in a memory-mapped file shared by every process on the host.
+
+    Increments are not atomic across processes, but two racing writers can
+    only merge their bumps into one, and any change is all a reader checks.
+    """
+
+    def __init__(self, path: str, slots: int = BROADCAST_SLOTS) -> None:
+        self.path = path
+        self.slots = slots
+        size = slots * _SLOT_SIZE
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._counters = memoryview(self._map).cast("Q")
+
+    def slot(self, key: str) -> int:
+        return zlib.crc32(key.encode()) % self.slots
+
+    def read(self, slot: int) -> int:
+        return self._counters[slot]
+
+    def bump(self, slot: int) -> None:
+        self._counters[slot] = (self._counters[slot] + 1) & 0xFFFFFFFFFFFFFFFF
+
+    def bump_all(self) -> None:
+        for slot in range(self.slots):
+            self.bump(slot)
+
+
+class TierStats:
+    """Thread-safe L1/L2 hit and miss counters for this process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts = {"l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0}
+
+    def record(self, name: str, count: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += count
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        for tier in ("l1", "l2"):
+            lookups = counts[f"{tier}_hits"] + counts[f"{tier}_misses"]
+            counts[f"{tier}_hit_ratio"] = counts[f"{tier}_hits"] / lookups if lookups else 0.0
+        return counts
+
+
+class TieredCache(BaseCache):
+    """Drop-in ``CACHES`` backend serving reads from an in-process LRU before ``OPTIONS["L2"]``."""
+
+    def __init__(self, location: str, params: Dict[str, Any]) -> None:
+        options = dict(params.get("OPTIONS") or {})
+        l2_params = dict(options.pop("L2"))
+        self.l1_max_entries = int(options.pop("L1_MAX_ENTRIES", 1000))
+        self.l1_timeout = float(options.pop("L1_TIMEOUT", 5))
+        broadcast_path = options.pop("BROADCAST_PATH", None)
+        super().__init__({**params, "OPTIONS": options})
+
+        l2_backend = import_string(l2_params.pop("BACKEND"))
+        l2_location = l2_params.pop("LOCATION", "")
+        l2_params.setdefault("TIMEOUT", params.get("TIMEOUT", 300))
+        self.l2: BaseCache = l2_backend(l2_location, l2_params)
+
+        if broadcast_path is None:
+            # Anything sharing the L2 shares the broadcast: inside a cache
+            # directory, or in the temp dir keyed by the L2 location.
+            if l2_location and os.path.isdir(l2_location):
+                broadcast_path = os.path.join(l2_location, "l1-broadcast.bin")
+            else:
+                digest = zlib.crc32(f"{l2_backend}:{l2_location}".encode())
+                broadcast_path = os.path.join(tempfile.gettempdir(), f"l1-broadcast-{digest:08x}.bin")
+        self.broadcast = VersionBroadcast(broadcast_path)
+        self.stats = TierStats()
+        # key -> (pickled value or _MISSING, expires_at, slot, counter at fetch)
+        self._l1: "OrderedDict[str, Tuple[Any, float, int, int]]" = OrderedDict()
+        self._l1_lock = threading.Lock()
+
+    # L1 ----------------------------------------------------------------
+
+    def _l1_get(self, full_key: str) -> Any:
+        with self._l1_lock:
+            entry = self._l1.get(full_key)
+            if entry is None:
+                return None
+            _, expires_at, slot, counter = entry
+            if time.monotonic() >= expires_at or self.broadcast.read(slot) != counter:
+                del self._l1[full_key]
+                return None
+            self._l1.move_to_end(full_key)
+        return entry
+
+    def _l1_set(self, full_key: str, value: Any, slot: int, counter: int) -> None:
+        pickled = _MISSING if value is _MISSING else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._l1_lock:
+            self._l1[full_key] = (pickled, time.monotonic() + self.l1_timeout, slot, counter)
+            self._l1.move_to_end(full_key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _invalidate(self, key: str, version: Optional[int]) -> None:
+        full_key = self.l2.make_key(key, version)
+        self.broadcast.bump(self.broadcast.slot(full_key))
+        with self._l1_lock:
+            self._l1.pop(full_key, None)
+
+    def _lookup(self, key: str, version: Optional[int]) -> Tuple[str, Any]:
+        """Return the L2 key and the L1 entry for ``key``, or ``None`` on an L1 miss."""
+
+        full_key = self.l2.make_key(key, version)
+        entry = self._l1_get(full_key)
+        self.stats.record("l1_misses" if entry is None else "l1_hits")
+        return full_key, entry
+
+    # Reads -------------------------------------------------------------
+
+    def _fetch(self, full_key: str, key: str, default: Any, version: Optional[int]) -> Any:
+        # Read the counter first: a write landing after it invalidates this fill.
+        slot = self.broadcast.slot(full_key)
+        counter = self.broadcast.read(slot)
+        value = self.l2.get(key, _MISSING, version=version)
+        self.stats.record("l2_misses" if value is _MISSING else "l2_hits")
+        self._l1_set(full_key, value, slot, counter)
+        return default if value is _MISSING else value
+
+    def get(self, key, default=None, version=None):
+        full_key, entry = self._lookup(key, version)
+        if entry is not None:
+            return default if entry[0] is _MISSING else pickle.loads(entry[0])
+        return self._fetch(full_key, key, default, version)
+
+    async def aget(self, key, default=None, version=None):
+        # L1 hits are answered on the event loop; only L2 reads go to a thread.
+        full_key, entry = self._lookup(key, version)
+        if entry is not None:
+            return default if entry[0] is _MISSING else pickle.loads(entry[0])
+        return await sync_to_async(self._fetch, thread_sensitive=True)(full_key, key, default, version)
+
+    def get_many(self, keys: Iterable[str], version=None) -> Dict[str, Any]:
+        found: Dict[str, Any] = {}
+        missing: Dict[str, Tuple[str, int, int]] = {}
+        for key in keys:
+            full_key, entry = self._lookup(key, version)
+            if entry is None:
+                slot = self.broadcast.slot(full_key)
+                missing[key] = (full_key, slot, self.broadcast.read(slot))
+            elif entry[0] is not _MISSING:
+                found[key] = pickle.loads(entry[0])
+        if missing:
+            fetched = self.l2.get_many(list(missing), version=version)
+            self.stats.record("l2_hits", len(fetched))
+            self.stats.record("l2_misses", len(missing) - len(fetched))
+            for key, (full_key, slot, counter) in missing.items():
+                self._l1_set(full_key, fetched.get(key, _MISSING), slot, counter)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None) -> bool:
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    # Writes ------------------------------------------------------------
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None) -> bool:
+        added = self.l2.add(key, value, timeout=timeout, version=version)
+        if added:
+            self._invalidate(key, version)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None) -> None:
+        self.l2.set(key, value, timeout=timeout, version=version)
+        self._invalidate(key, version)
+
+    def set_many(self, data: Dict[str, Any], timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout=timeout, version=version)
+        for key in data:
+            self._invalidate(key, version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None) -> bool:
+        return self.l2.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None) -> bool:
+        deleted = self.l2.delete(key, version=version)
+        self._invalidate(key, version)
+        return deleted
+
+    def delete_many(self, keys: Iterable[str], version=None) -> None:
+        keys = list(keys)
+        self.l2.delete_many(keys, version=version)
+        for key in keys:
+            self._invalidate(key, version)
+
+    def incr(self, key, delta=1, version=None) -> int:
+        value = self.l2.incr(key, delta, version=version)
+        self._invalidate(key, version)
+        return value
+
+    def clear(self) -> None:
+        self.l2.clear()
+        self.broadcast.bump_all()
+        with self._l1_lock:
+            self._l1.clear()
+
+    def close(self, **kwargs) -> None:
+        self.l2.close(**kwargs)
+
+
+__all__ = ["TierStats", "TieredCache", "VersionBroadcast"]
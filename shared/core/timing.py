@@ -0,0 +1,104 @@
+"""Per-stage timings of a request.
+
+A view opens a :func:`collect` block; code it calls wraps its stages in
+:func:`stage` and reports row counts with :func:`count`.  Stage times add up
+when a stage runs several times (the candidate queries are read chunk by
+chunk, interleaved with scoring), and nested stages are reported on their
+own as well as inside their parent.
+
+The collected :class:`Timings` render as a ``Server-Timing`` header and as a
+plain dict for debug payloads, and are recorded in the
+``search_stage_duration_seconds`` and ``search_candidates`` histograms when
+the block ends.  Outside a :func:`collect` block :func:`stage` and
+:func:`count` do nothing.
+
+The active :class:`Timings` lives in a context variable, so it follows the
+request into ``sync_to_async`` threads and tasks started from it.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Dict, Iterator, Optional
+
+from .metrics import SEARCH_CANDIDATES, SEARCH_STAGE_SECONDS
+
+
+class Timings:
+    """Seconds per stage and row counts per source, in first-seen order."""
+
+    __slots__ = ("stages", "candidates")
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self.candidates: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, source: str, rows: int) -> None:
+        self.candidates[source] = self.candidates.get(source, 0) + rows
+
+    def server_timing(self) -> str:
+        """Value of a ``Server-Timing`` header; durations are in milliseconds."""
+
+        return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items())
+
+    def explain(self) -> dict:
+        return {
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            "candidates": dict(self.candidates),
+        }
+
+    def observe(self) -> None:
+        for name, seconds in self.stages.items():
+            SEARCH_STAGE_SECONDS.labels(name).observe(seconds)
+        for source, rows in self.candidates.items():
+            SEARCH_CANDIDATES.labels(source).observe(rows)
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """Collect the stages run inside the block and record them when it ends."""
+
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+        timings.observe()
+
+
+@contextmanager
+def _timed(timings: Timings, name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Charge the time spent in the block to stage ``name``."""
+
+    timings = _current.get()
+    if timings is None:
+        return nullcontext()
+    return _timed(timings, name)
+
+
+def count(source: str, rows: int) -> None:
+    """Report ``rows`` candidates read from ``source``."""
+
+    timings = _current.get()
+    if timings is not None:
+        timings.count(source, rows)
+
+
+__all__ = ["Timings", "collect", "count", "stage"]
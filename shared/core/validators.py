@@ -4,6 +4,8 @@ from django.core.validators import RegexValidator
 
 AREA_CODE_REGEX = r"^\d{3}$"
 PHONE_NUMBER_REGEX = r"^\d{7}$"
+# Ten digit-or-"?" positions, optionally grouped as 3-3-4 with dashes or spaces.
+NUMBER_PATTERN_REGEX = r"^[\d?]{3}[-\s]?[\d?]{3}[-\s]?[\d?]{4}$"
 
 area_code_validator = RegexValidator(
     regex=AREA_CODE_REGEX,
@@ -20,4 +22,5 @@ __all__ = [
     "phone_number_validator",
     "AREA_CODE_REGEX",
     "PHONE_NUMBER_REGEX",
+    "NUMBER_PATTERN_REGEX",
 ]
@@ -0,0 +1,205 @@
+"""Vanity (keypad word) search over local numbers.
+
+A word such as ``FLOWERS`` is mapped to its keypad digits (``3569377``) and
+every number whose local part contains them, at any offset, is returned.
+:class:`VanityIndex` keeps a posting list of rows per digit trigram, so
+candidates come from the lists of the word's trigrams instead of a scan:
+
+* exact matches must contain every trigram of the word, so the posting
+  lists are intersected, rarest first, and the survivors checked with ``in``;
+* a match within ``k`` edits preserves all but at most ``k * 3`` of the
+  word's ``len(word) - 2`` trigram positions (the q-gram lemma), so rows
+  are counted across the lists and only those reaching that bound are
+  verified with the bit-parallel
+  :meth:`~shared.core.search.LevenshteinPattern.substring_distance`.
+
+The per-row counts double as the trigram intersection, so similarity is
+computed from them and the stored trigram count of each row.
+
+The count filter only prunes when the bound is positive, which is why
+:func:`max_fuzzy_distance` limits fuzziness by word length.
+
+The process-wide index is rebuilt from the inventory snapshot in the
+background (see :mod:`shared.core.background`).
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db.models import QuerySet
+
+from .background import BackgroundIndex
+from .models import Number
+from .search import LevenshteinPattern, ranking_key, result_payload
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .snapshot import NumberSnapshot
+
+GRAM = 3
+KEYPAD = {
+    **dict.fromkeys("ABC", "2"),
+    **dict.fromkeys("DEF", "3"),
+    **dict.fromkeys("GHI", "4"),
+    **dict.fromkeys("JKL", "5"),
+    **dict.fromkeys("MNO", "6"),
+    **dict.fromkeys("PQRS", "7"),
+    **dict.fromkeys("TUV", "8"),
+    **dict.fromkeys("WXYZ", "9"),
+}
+
+
+def keypad_digits(word: str) -> str:
+    """Map letters to keypad digits; digits are kept as they are."""
+
+    try:
+        return "".join(char if char.isdigit() else KEYPAD[char] for char in word.upper())
+    except KeyError as exc:
+        raise ValueError(f"'{word}' contains characters that are not on a phone keypad.") from exc
+
+
+def max_fuzzy_distance(length: int) -> int:
+    """Largest edit distance the trigram count filter can prune for a word of ``length`` digits."""
+
+    return max((length - GRAM) // GRAM, 0)
+
+
+class VanityIndex:
+    """Digit-trigram posting lists over every local number."""
+
+    def __init__(self, rows: Iterable[Tuple[str, str, int, float]] = ()) -> None:
+        self._rows: List[Tuple[str, str, int, float]] = []
+        # Distinct trigrams per row, so similarity needs no string work.
+        self._gram_counts = array("B")
+        self._postings: List[array] = [array("I") for _ in range(10**GRAM)]
+        for row in rows:
+            position = len(self._rows)
+            self._rows.append(row)
+            codes = _grams(row[1])
+            self._gram_counts.append(len(codes))
+            for code in codes:
+                self._postings[code].append(position)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @classmethod
+    def from_queryset(cls, queryset: QuerySet[Number], chunk_size: int = 5000) -> "VanityIndex":
+        rows = queryset.order_by().values_list("area_code", "phone_number", "cost", "created_at")
+        return cls(
+            (area_code, phone_number, cost, created_at.timestamp())
+            for area_code, phone_number, cost, created_at in rows.iterator(chunk_size=chunk_size)
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "NumberSnapshot") -> "VanityIndex":
+        return cls(snapshot.rows())
+
+    def _candidates(self, digits: str, max_distance: int) -> Dict[int, int]:
+        """Map candidate rows to the number of distinct word trigrams they contain."""
+
+        codes = _grams(digits)
+        if not max_distance:
+            lists = sorted((self._postings[code] for code in codes), key=len)
+            candidates = set(lists[0])
+            for postings in lists[1:]:
+                candidates.intersection_update(postings)
+            return dict.fromkeys(candidates, len(codes))
+        shared: Counter = Counter()
+        for code in codes:
+            shared.update(self._postings[code])
+        # Counting distinct trigrams loses at most the repeated positions.
+        positions = len(digits) - GRAM + 1
+        required = positions - max_distance * GRAM - (positions - len(codes))
+        return {position: count for position, count in shared.items() if count >= required}
+
+    def search(
+        self,
+        word: str,
+        max_distance: int = 0,
+        area_code: Optional[str] = None,
+        limit: int = 10,
+        offset: int = 0,
+    ) -> Tuple[List[dict], int]:
+        """Return one page of numbers containing ``word`` and the number of matches.
+
+        Matches are ordered by :func:`shared.core.search.ranking_key`, where
+        the distance is the edit distance between the word's digits and the
+        closest substring of the local number, and the similarity is the
+        trigram similarity of the two.  ``(area_code, phone_number)`` breaks
+        exact ties.
+        """
+
+        digits = keypad_digits(word)
+        if len(digits) < GRAM:
+            raise ValueError(f"Vanity words need at least {GRAM} characters.")
+        if max_distance > max_fuzzy_distance(len(digits)):
+            raise ValueError(
+                f"A {len(digits)}-character word supports max_distance {max_fuzzy_distance(len(digits))} at most."
+            )
+
+        word_grams = len(_grams(digits))
+        pattern = LevenshteinPattern(digits)
+        scored = []
+        for position, shared in self._candidates(digits, max_distance).items():
+            row_area_code, phone_number, cost, created_ts = self._rows[position]
+            if area_code is not None and row_area_code != area_code:
+                continue
+            if max_distance:
+                distance = pattern.substring_distance(phone_number)
+                if distance > max_distance:
+                    continue
+            elif digits in phone_number:
+                distance = 0
+            else:
+                continue
+            similarity = shared / (word_grams + self._gram_counts[position] - shared)
+            scored.append(
+                (ranking_key(distance, similarity, cost, created_ts) + (row_area_code, phone_number), similarity)
+            )
+        scored.sort(key=lambda item: item[0])
+
+        page = []
+        reversed_pattern = LevenshteinPattern(digits[::-1])
+        for key, similarity in scored[offset : offset + limit]:
+            row_area_code, phone_number, cost, distance = key[4], key[5], key[2], key[0]
+            payload = result_payload(row_area_code, phone_number, cost, distance, similarity)
+            if distance == 0:
+                payload["match_offset"] = phone_number.find(digits)
+            else:
+                # The last best match of the reversed strings is the first one here.
+                payload["match_offset"] = len(phone_number) - reversed_pattern.substring_match(phone_number[::-1])[1]
+            page.append(payload)
+        return page, len(scored)
+
+
+def _grams(value: str) -> Set[int]:
+    return {int(value[start : start + GRAM]) for start in range(len(value) - GRAM + 1)}
+
+
+_holder: BackgroundIndex[VanityIndex] = BackgroundIndex("vanity", VanityIndex.from_snapshot)
+
+
+def get_vanity_index() -> VanityIndex:
+    """Return the process-wide vanity index.
+
+    Maintained like :func:`shared.core.index.get_number_index`: rebuilt in
+    the background after local writes or every ``SEARCH_INDEX_TTL`` seconds.
+    """
+
+    return _holder.get()
+
+
+def invalidate_vanity_index() -> None:
+    _holder.invalidate()
+
+
+__all__ = [
+    "VanityIndex",
+    "get_vanity_index",
+    "invalidate_vanity_index",
+    "keypad_digits",
+    "max_fuzzy_distance",
+]
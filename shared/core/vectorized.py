@@ -0,0 +1,147 @@
+"""NumPy batch scoring for fixed-length digit strings.
+
+Every stored number is the same shape (three area-code digits plus seven
+local digits), so a whole candidate set can be encoded as a ``uint8`` matrix
+and scored with a handful of array passes instead of one Python DP per row.
+NumPy is an optional dependency; check :data:`AVAILABLE` before calling in.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+try:  # pragma: no cover - exercised implicitly by the import
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional extra
+    np = None
+
+AVAILABLE = np is not None
+
+
+def encode_digits(values: Sequence[str]) -> "np.ndarray":
+    """Encode equal-length digit strings as an ``(n, length)`` ``uint8`` matrix."""
+
+    if not values:
+        return np.zeros((0, 0), dtype=np.uint8)
+    length = len(values[0])
+    buffer = "".join(values).encode("ascii")
+    if len(buffer) != length * len(values):
+        raise ValueError("All values must have the same length.")
+    return (np.frombuffer(buffer, dtype=np.uint8) - ord("0")).reshape(len(values), length)
+
+
+def batch_levenshtein(query: str, candidates: "np.ndarray") -> "np.ndarray":
+    """Return the Levenshtein distance from ``query`` to every row of ``candidates``.
+
+    The DP table is walked one cell at a time as usual, but every cell is a
+    vector holding that cell for all candidates at once.
+    """
+
+    count, length = candidates.shape
+    if count == 0:
+        return np.zeros(0, dtype=np.int16)
+    pattern = (np.frombuffer(query.encode("ascii"), dtype=np.uint8) - ord("0")).tolist()
+    columns = np.ascontiguousarray(candidates.T)
+
+    previous = [np.full(count, j, dtype=np.int16) for j in range(len(pattern) + 1)]
+    for i in range(length):
+        column = columns[i]
+        current = [np.full(count, i + 1, dtype=np.int16)]
+        for j, digit in enumerate(pattern, start=1):
+            cell = previous[j - 1] + (column != digit)
+            np.minimum(cell, previous[j] + 1, out=cell)
+            np.minimum(cell, current[j - 1] + 1, out=cell)
+            current.append(cell)
+        previous = current
+    return previous[-1]
+
+
+def trigram_codes(digits: "np.ndarray") -> "np.ndarray":
+    """Map every digit trigram of each row to an integer in ``[0, 1000)``."""
+
+    wide = digits.astype(np.int16)
+    return wide[:, :-2] * 100 + wide[:, 1:-1] * 10 + wide[:, 2:]
+
+
+def batch_trigram_jaccard(query: str, candidates: "np.ndarray") -> "np.ndarray":
+    """Vectorized equivalent of :func:`shared.core.search.trigram_jaccard`."""
+
+    if candidates.shape[1] < 3 or len(query) < 3:
+        raise ValueError("Trigram scoring requires values of at least three digits.")
+    in_query = np.zeros(1000, dtype=bool)
+    query_codes = trigram_codes(encode_digits([query]))[0]
+    in_query[query_codes] = True
+    query_size = int(in_query.sum())
+
+    columns = np.ascontiguousarray(trigram_codes(candidates).T)
+    distinct = np.zeros(len(candidates), dtype=np.int16)
+    intersection = np.zeros(len(candidates), dtype=np.int16)
+    for k, column in enumerate(columns):
+        # Count each trigram only at its first occurrence within the row.
+        first = np.ones(len(candidates), dtype=bool)
+        for earlier in columns[:k]:
+            first &= column != earlier
+        distinct += first
+        intersection += first & in_query[column]
+    union = distinct + query_size - intersection
+    return intersection / np.maximum(union, 1)
+
+
+def top_k_order(
+    distance: "np.ndarray",
+    similarity: "np.ndarray",
+    cost: "np.ndarray",
+    created_ts: "np.ndarray",
+    limit: int,
+) -> "np.ndarray":
+    """Return indices of the best ``limit`` rows in ranking order.
+
+    Mirrors :func:`shared.core.search.ranking_key`; only rows at or below the
+    k-th smallest distance take part in the final (stable) lexicographic sort.
+    """
+
+    if len(distance) == 0 or limit <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if len(distance) > limit:
+        boundary = np.partition(distance, limit - 1)[limit - 1]
+        pool = np.flatnonzero(distance <= boundary)
+    else:
+        pool = np.arange(len(distance))
+    order = np.lexsort((-created_ts[pool], cost[pool], -similarity[pool], distance[pool]))
+    return pool[order[:limit]]
+
+
+def rank_rows(
+    query_area_code: str,
+    query_phone_number: str,
+    area_codes: Sequence[str],
+    phone_numbers: Sequence[str],
+    costs: Sequence[int],
+    created_ts: Sequence[float],
+    limit: int,
+) -> list[tuple[int, int, float]]:
+    """Score candidate columns and return ``(row, distance, similarity)`` for the top rows."""
+
+    local_digits = encode_digits(phone_numbers)
+    full_digits = np.hstack([encode_digits(area_codes), local_digits])
+    distance = batch_levenshtein(query_phone_number, local_digits)
+    similarity = batch_trigram_jaccard(f"{query_area_code}{query_phone_number}", full_digits)
+    order = top_k_order(
+        distance,
+        similarity,
+        np.asarray(costs, dtype=np.int64),
+        np.asarray(created_ts, dtype=np.float64),
+        limit,
+    )
+    return [(int(row), int(distance[row]), float(similarity[row])) for row in order]
+
+
+__all__ = [
+    "AVAILABLE",
+    "batch_levenshtein",
+    "batch_trigram_jaccard",
+    "encode_digits",
+    "rank_rows",
+    "top_k_order",
+    "trigram_codes",
+]